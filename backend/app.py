@@ -1,19 +1,126 @@
-from flask import Flask, request, jsonify, render_template_string
+from flask import Flask, Response, g, has_request_context, request, jsonify, render_template_string
 from flask_cors import CORS
 from models.crop_model import CropYieldPredictor
+from models.model_reloader import ModelReloader
+from models.online import ObservationBuffer
+from models.optimizer import CLIMATE_FEATURES, YieldOptimizer
+from models.region_forecast import RegionForecaster
+from utils.metrics import MetricsRegistry
+from utils.profiling import SamplingProfiler
+from utils.request_logging import BodySampler, setup_logging, summarize_batch
+from utils.field_store import FieldStore
+from utils.validation import InputValidator, REQUIRED_FIELDS, grid_size, interval_level, is_iso_date, numeric_column
+from utils import json_codec
 from config import Config
+from contextlib import contextmanager
+import numpy as np
 import logging
+import time
+import io
 
 app = Flask(__name__)
 app.config.from_object(Config)
 CORS(app)
+json_codec.install(app, Config.JSON_CODEC)
+# NumPy-aware encoder returning bytes, for array payloads built by hand
+_, dump_json = json_codec.make_codec(json_codec.available_codec(Config.JSON_CODEC))
 
 # Initialize the predictor
-predictor = CropYieldPredictor()
+predictor = CropYieldPredictor(
+    cache_size=Config.PREDICTION_CACHE_SIZE,
+    cache_precision=Config.PREDICTION_CACHE_PRECISION,
+    model_dir=Config.MODEL_DIR,
+    pinned_version=Config.MODEL_VERSION,
+    allow_pickle=Config.MODEL_ALLOW_PICKLE
+)
+reloader = ModelReloader(predictor, poll_interval=Config.MODEL_WATCH_INTERVAL)
+# Observed yields from /observe; the buffer (and its schedule) is per process
+observations = ObservationBuffer(max_rows=Config.OBSERVE_MAX_BUFFER)
+optimizer = YieldOptimizer(
+    predictor,
+    min_area=Config.MIN_AREA,
+    max_rate=Config.FEATURE_RANGES['fertilizer']['max'],
+    area_steps=Config.OPTIMIZER_AREA_STEPS,
+    rate_steps=Config.OPTIMIZER_RATE_STEPS,
+    time_limit=Config.OPTIMIZER_TIME_LIMIT_MS / 1000
+)
+field_store = FieldStore(Config.FIELD_STORE_PATH, cell_degrees=Config.FIELD_GRID_DEGREES)
+forecaster = RegionForecaster(predictor, field_store, max_fields=Config.MAX_REGION_FIELDS)
 
-# Set up logging
-logging.basicConfig(level=logging.INFO)
+# Set up logging (a background writer thread unless LOG_ASYNC is off)
+setup_logging(app.config)
 logger = logging.getLogger(__name__)
+body_sampler = BodySampler(Config.LOG_BODY_SAMPLE_RATE)
+
+# Per-stage latency histograms and the opt-in sampling profiler
+metrics = MetricsRegistry()
+profiler = SamplingProfiler(app.config)
+
+def record_stage(stage, seconds):
+    """Record a hot-path stage in the histograms and the request's Server-Timing"""
+    metrics.histogram('stage_seconds', 'Time spent in each request stage', stage=stage).observe(seconds)
+    if has_request_context() and 'timings' in g:
+        g.timings.append((stage, seconds))
+
+predictor.on_stage = record_stage
+
+@contextmanager
+def timed(stage):
+    """Time a block of request handling as `stage`"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_stage(stage, time.perf_counter() - started)
+
+def _cache_stats():
+    stats = predictor.cache.stats()
+    return {(('result', 'hit'),): stats['hits'], (('result', 'miss'),): stats['misses']}
+
+def _model_durations():
+    bundle = predictor.bundle
+    if not bundle:
+        return None
+    return {(('operation', op),): bundle.metadata[key]
+            for op, key in (('load', 'load_seconds'), ('train', 'train_seconds'))
+            if key in bundle.metadata}
+
+metrics.gauge('prediction_cache_lookups', 'Prediction cache lookups by result', _cache_stats)
+metrics.gauge('prediction_cache_entries', 'Entries in the prediction cache',
+              lambda: predictor.cache.stats()['size'])
+metrics.gauge('model_operation_seconds', 'Duration of the last model load/train', _model_durations)
+metrics.gauge('model_version', 'In-process version of the serving model',
+              lambda: predictor.bundle.metadata['version'] if predictor.bundle else None)
+metrics.gauge('profiler_sampled_requests', 'Requests profiled since the last reset',
+              lambda: profiler.sampled)
+
+@app.before_request
+def start_request_timer():
+    g.started = time.perf_counter()
+    g.timings = []
+    g.profile = profiler.start()
+
+@app.after_request
+def finish_request_timer(response):
+    if 'started' not in g:
+        return response
+    elapsed = time.perf_counter() - g.started
+    endpoint = request.endpoint or 'unknown'
+    metrics.counter('requests_total', 'HTTP requests by endpoint and status',
+                    endpoint=endpoint, status=response.status_code).inc()
+    metrics.histogram('request_seconds', 'End-to-end request latency', endpoint=endpoint).observe(elapsed)
+    
+    if app.config['SERVER_TIMING']:
+        entries = [f'{stage};dur={seconds * 1000:.3f}' for stage, seconds in g.timings]
+        entries.append(f'total;dur={elapsed * 1000:.3f}')
+        response.headers['Server-Timing'] = ', '.join(entries)
+    return response
+
+@app.teardown_request
+def stop_request_profiler(exc):
+    profile = g.pop('profile', None)
+    if profile:
+        profiler.stop(profile)
 
 # Simple HTML template for testing the API
 HTML_TEMPLATE = '''
@@ -132,34 +239,43 @@ HTML_TEMPLATE = '''
 </html>
 '''
 
+# Validation rules compiled once at startup
+validator = InputValidator.from_config(Config)
+
 def validate_input_data(data):
     """Validate input data against configured ranges"""
-    errors = []
-    
-    # Check required fields
-    required_fields = ['crop_type', 'temperature', 'rainfall', 'humidity', 'soil_ph', 'fertilizer', 'area']
-    for field in required_fields:
-        if field not in data:
-            errors.append(f"Missing required field: {field}")
-    
-    if errors:
-        return errors
+    return validator.validate(data)
+
+def validate_batch_data(df, strict=True):
+    """Validate a batch of records column-wise against configured ranges.
     
-    # Validate ranges
-    ranges = app.config['FEATURE_RANGES']
-    for field, limits in ranges.items():
-        if field in data:
-            value = data[field]
-            if not isinstance(value, (int, float)):
-                errors.append(f"{field} must be a number")
-            elif value < limits['min'] or value > limits['max']:
-                errors.append(f"{field} must be between {limits['min']} and {limits['max']}")
+    Returns a dict mapping row index -> list of errors for the rows that
+    failed; the messages match validate_input_data.
+    """
+    return validator.validate_columns(df, strict)
+
+def parse_batch_request():
+    """Parse a JSON array, CSV or NDJSON request body into a DataFrame.
     
-    # Validate crop type
-    if data.get('crop_type', '').lower() not in [c.lower() for c in app.config['SUPPORTED_CROPS']]:
-        errors.append(f"Supported crops: {', '.join(app.config['SUPPORTED_CROPS'])}")
+    Returns the DataFrame and whether numeric fields must be real numbers.
+    """
+    # Only batch requests need pandas; importing it here keeps it off cold start
+    import pandas as pd
+    mimetype = request.mimetype
+    if mimetype in ('text/csv', 'application/csv'):
+        return pd.read_csv(io.BytesIO(request.get_data()), skipinitialspace=True), False
+    if mimetype in ('application/x-ndjson', 'application/jsonl', 'application/x-jsonlines'):
+        body = request.get_data()
+        if not body.strip():
+            return pd.DataFrame(), True
+        return pd.read_json(io.BytesIO(body), lines=True, dtype=False), True
     
-    return errors
+    data = request.get_json(silent=True)
+    if isinstance(data, dict):
+        data = data.get('records')
+    if not isinstance(data, list) or not all(isinstance(row, dict) for row in data):
+        raise ValueError('Expected a JSON array of records')
+    return pd.DataFrame.from_records(data), True
 
 @app.route('/', methods=['GET'])
 def home():
@@ -171,15 +287,27 @@ def predict_yield():
     """Predict crop yield based on input parameters"""
     try:
         # Get JSON data from request
-        data = request.get_json()
+        with timed('parse'):
+            data = request.get_json()
         
         if not data:
             return jsonify({'error': 'No data provided'}), 400
         
-        logger.info(f"Received prediction request: {data}")
+        # Bodies are only logged for a sample of requests, and only
+        # formatted on the logging thread
+        log_body = body_sampler.sample()
+        with timed('logging'):
+            if log_body:
+                logger.info("Received prediction request: %s", data, extra={'event': 'predict_request'})
         
         # Validate input data
-        validation_errors = validate_input_data(data)
+        with timed('validation'):
+            validation_errors = validate_input_data(data)
+            # Non-object bodies already failed validate_input_data
+            interval, interval_error = interval_level(data.get('interval', app.config['PREDICTION_INTERVAL_LEVEL'])
+                                                      if isinstance(data, dict) else None)
+            if interval_error:
+                validation_errors.append(interval_error)
         if validation_errors:
             return jsonify({'error': 'Validation failed', 'details': validation_errors}), 400
         
@@ -191,16 +319,386 @@ def predict_yield():
             humidity=float(data['humidity']),
             soil_ph=float(data['soil_ph']),
             fertilizer=float(data['fertilizer']),
-            area=float(data['area'])
+            area=float(data['area']),
+            interval=interval
         )
         
-        logger.info(f"Prediction result: {result}")
-        return jsonify(result)
+        with timed('logging'):
+            if log_body:
+                logger.info("Prediction result: %s", result, extra={'event': 'predict_result'})
+        with timed('serialization'):
+            response = jsonify(result)
+        return response
         
     except Exception as e:
-        logger.error(f"Prediction error: {str(e)}")
+        logger.error("Prediction error: %s", e, extra={'event': 'predict_error'})
         return jsonify({'error': f'Prediction failed: {str(e)}'}), 500
 
+@app.route('/predict/batch', methods=['POST'])
+def predict_batch():
+    """Predict crop yields for many fields in one request
+    
+    The prediction-interval level is the "interval" query parameter
+    (e.g. ?interval=0.8, or ?interval=none), since CSV and NDJSON bodies
+    have nowhere else to carry it.
+    """
+    try:
+        try:
+            with timed('parse'):
+                df, strict = parse_batch_request()
+        except ValueError as e:
+            return jsonify({'error': f'Invalid batch payload: {str(e)}'}), 400
+        interval, interval_error = interval_level(request.args.get('interval', app.config['PREDICTION_INTERVAL_LEVEL']))
+        if interval_error:
+            return jsonify({'error': 'Validation failed', 'details': [interval_error]}), 400
+        
+        if df.empty:
+            return jsonify({'error': 'No data provided'}), 400
+        if len(df) > app.config['MAX_BATCH_SIZE']:
+            return jsonify({'error': f"Batch too large: at most {app.config['MAX_BATCH_SIZE']} records"}), 413
+        
+        logger.info("Received batch prediction request: %d records", len(df),
+                    extra={'event': 'predict_batch_request', 'count': len(df)})
+        
+        # Validate input data; invalid rows are reported, not fatal
+        with timed('validation'):
+            validation_errors = validate_batch_data(df, strict)
+        valid = np.ones(len(df), dtype=bool)
+        valid[list(validation_errors)] = False
+        
+        predictions = [None] * len(df)
+        result = None
+        if valid.any():
+            valid_df = df[valid]
+            records = {'crop_type': valid_df['crop_type'].astype(str)}
+            for field in REQUIRED_FIELDS[1:]:
+                records[field] = numeric_column(valid_df[field], strict=False)[0]
+            result = predictor.predict_batch(records, interval)
+            
+            rows = zip(result['total_yield'].tolist(), result['yield_per_hectare'].tolist(),
+                       result['crop_type'].tolist(), result['area'].tolist())
+            for i, (total_yield, yield_per_hectare, crop_type, area) in zip(np.flatnonzero(valid).tolist(), rows):
+                predictions[i] = {
+                    'total_yield': total_yield,
+                    'yield_per_hectare': yield_per_hectare,
+                    'crop_type': crop_type,
+                    'area': area
+                }
+            if 'lower_bound' in result:
+                bounds = zip(result['lower_bound'].tolist(), result['upper_bound'].tolist())
+                for i, (lower, upper) in zip(np.flatnonzero(valid).tolist(), bounds):
+                    predictions[i].update(lower_bound=lower, upper_bound=upper)
+        
+        # Summary stats instead of every record
+        with timed('logging'):
+            if logger.isEnabledFor(logging.INFO):
+                summary = summarize_batch(result['crop_type'], result['total_yield']) if result else {}
+                logger.info("Batch prediction done: %d succeeded, %d failed",
+                            int(valid.sum()), len(validation_errors),
+                            extra=dict(summary, event='predict_batch_result', count=len(df),
+                                       succeeded=int(valid.sum()), failed=len(validation_errors)))
+        with timed('serialization'):
+            response = jsonify({
+                'count': len(df),
+                'succeeded': int(valid.sum()),
+                'failed': len(validation_errors),
+                'interval_level': interval if result and 'lower_bound' in result else None,
+                'predictions': predictions,
+                'errors': [{'index': i, 'error': 'Validation failed', 'details': details}
+                           for i, details in validation_errors.items()]
+            })
+        return response
+        
+    except Exception as e:
+        logger.error("Batch prediction error: %s", e, extra={'event': 'predict_batch_error'})
+        return jsonify({'error': f'Batch prediction failed: {str(e)}'}), 500
+
+@app.route('/predict/grid', methods=['POST'])
+def predict_grid():
+    """Predict yield over a grid of feature values for what-if analysis
+    
+    Request: {"crop_type": "wheat",
+              "axes": {"temperature": {"min": 10, "max": 35, "steps": 26},
+                       "fertilizer": {"min": 0, "max": 300, "steps": 31}},
+              "fixed": {"rainfall": 500, "humidity": 60, "soil_ph": 6.5, "area": 10},
+              "metric": "total_yield" | "yield_per_hectare", "stream": false}
+    
+    The response lists each axis's values and the grid's shape, with the
+    predictions as one flat row-major array (the last axis varies
+    fastest). Large grids, or any with "stream": true, are streamed.
+    """
+    try:
+        data = request.get_json(silent=True)
+        if not data or not isinstance(data, dict):
+            return jsonify({'error': 'No data provided'}), 400
+        
+        size = grid_size(data.get('axes'))
+        if size > app.config['MAX_GRID_POINTS']:
+            return jsonify({'error': f"Grid too large: {size} points, at most {app.config['MAX_GRID_POINTS']}"}), 413
+        
+        with timed('validation'):
+            axes, validation_errors = validator.validate_grid(data)
+            metric = data.get('metric', 'total_yield')
+            if metric not in ('total_yield', 'yield_per_hectare'):
+                validation_errors.append("metric must be total_yield or yield_per_hectare")
+        if validation_errors:
+            return jsonify({'error': 'Validation failed', 'details': validation_errors}), 400
+        
+        shape = [len(values) for values in axes.values()]
+        crop_type = data['crop_type'].lower()
+        fixed = {field: value for field, value in (data.get('fixed') or {}).items() if field not in axes}
+        header = {
+            'crop_type': crop_type,
+            'metric': metric,
+            'dims': list(axes),
+            'coords': axes,
+            'shape': shape,
+            'fixed': fixed
+        }
+        logger.info("Received grid prediction request: %s, %d points", list(axes), size,
+                    extra={'event': 'predict_grid_request', 'count': size})
+        
+        chunk_size = app.config['GRID_CHUNK_SIZE']
+        per_hectare = metric == 'yield_per_hectare'
+        if data.get('stream') or size > app.config['GRID_STREAM_THRESHOLD']:
+            # The same document, written a chunk at a time
+            def generate():
+                yield dump_json(header)[:-1] + b',"values":['
+                for start, predictions in predictor.iter_grid(crop_type, axes, fixed, chunk_size, per_hectare):
+                    chunk = dump_json(np.round(predictions, 2))[1:-1]
+                    yield chunk if start == 0 else b',' + chunk
+                yield b']}'
+            return Response(generate(), mimetype='application/json')
+        
+        grid = predictor.predict_grid(crop_type, axes, fixed, chunk_size, per_hectare)
+        with timed('serialization'):
+            header['values'] = np.round(grid.ravel(), 2)
+            return Response(dump_json(header), mimetype='application/json')
+        
+    except Exception as e:
+        logger.error("Grid prediction error: %s", e, extra={'event': 'predict_grid_error'})
+        return jsonify({'error': f'Grid prediction failed: {str(e)}'}), 500
+
+@app.route('/optimize', methods=['POST'])
+def optimize():
+    """Crop mix and fertilizer rates that maximize predicted total yield
+    
+    Request: {"temperature": 22, "rainfall": 600, "humidity": 65, "soil_ph": 6.5,
+              "total_area": 20, "fertilizer_budget": 2000, "crops": ["wheat", "corn"]}
+    ("crops" is optional; every supported crop is considered by default)
+    """
+    try:
+        data = request.get_json(silent=True)
+        if not data or not isinstance(data, dict):
+            return jsonify({'error': 'No data provided'}), 400
+        
+        with timed('validation'):
+            # Climate uses the same rules as /predict
+            validation_errors = validator.validate_fields(data, CLIMATE_FEATURES)
+            total_area, budget, crops = data.get('total_area'), data.get('fertilizer_budget'), data.get('crops')
+            if not isinstance(total_area, (int, float)) or not app.config['MIN_AREA'] <= total_area <= app.config['MAX_AREA']:
+                validation_errors.append(f"total_area must be between {app.config['MIN_AREA']} and {app.config['MAX_AREA']}")
+            if not isinstance(budget, (int, float)) or budget < 0:
+                validation_errors.append("fertilizer_budget must be a non-negative number")
+            if crops is not None and (not isinstance(crops, list) or not all(validator.is_supported_crop(c) for c in crops)):
+                validation_errors.append(validator.crop_message)
+        if validation_errors:
+            return jsonify({'error': 'Validation failed', 'details': validation_errors}), 400
+        
+        with timed('model'):
+            result = optimizer.optimize(data, total_area, budget, crops)
+        logger.info("Optimized allocation: %s in %.1f ms", result['method'], result['solve_seconds'] * 1000,
+                    extra={'event': 'optimize', 'method': result['method'], 'solve_seconds': result['solve_seconds']})
+        return jsonify(result)
+        
+    except Exception as e:
+        logger.error("Optimization error: %s", e, extra={'event': 'optimize_error'})
+        return jsonify({'error': f'Optimization failed: {str(e)}'}), 500
+
+FIELD_RECORD_FIELDS = ('crop_type', 'latitude', 'longitude', 'fertilizer', 'area')
+FEED_FIELDS = {
+    'weather': ('date', 'temperature', 'rainfall', 'humidity'),
+    'soil': ('date', 'soil_ph')
+}
+
+def feed_errors(feeds):
+    """Validation details for {feed name: records}; empty if all are valid"""
+    details = []
+    for name, (records, fields) in feeds.items():
+        errors, message = validator.validate_records(records, fields)
+        if message:
+            details.append(f"{name}: {message}")
+        details += [{'feed': name, 'index': i, 'details': record_errors} for i, record_errors in errors.items()]
+    return details
+
+@app.route('/fields', methods=['GET', 'POST'])
+def fields():
+    """Register fields for /forecast/region, or report what the registry holds
+    
+    Request: {"fields": [{"field_id": "f-001", "crop_type": "wheat", "region": "north",
+                          "latitude": 52.1, "longitude": 5.3, "area": 12, "fertilizer": 120}]}
+    Fields already registered are updated. Nothing is stored unless
+    every record is valid.
+    """
+    try:
+        if request.method == 'GET':
+            return jsonify(field_store.stats())
+        
+        data = request.get_json(silent=True)
+        if not data or not isinstance(data, dict) or not data.get('fields'):
+            return jsonify({'error': 'No data provided'}), 400
+        with timed('validation'):
+            validation_errors = feed_errors({'fields': (data['fields'], FIELD_RECORD_FIELDS)})
+        if validation_errors:
+            return jsonify({'error': 'Validation failed', 'details': validation_errors}), 400
+        
+        revision = field_store.upsert_fields(data['fields'])
+        logger.info("Registered %d fields", len(data['fields']),
+                    extra={'event': 'fields_upsert', 'count': len(data['fields'])})
+        return jsonify({'count': len(data['fields']), 'revision': revision})
+        
+    except Exception as e:
+        logger.error("Field registry error: %s", e, extra={'event': 'fields_error'})
+        return jsonify({'error': f'Field registry update failed: {str(e)}'}), 500
+
+@app.route('/fields/observations', methods=['POST'])
+def field_observations():
+    """Add dated weather and soil observations from the feeds
+    
+    Request: {"weather": [{"field_id": "f-001", "date": "2026-05-01", "temperature": 18,
+                           "rainfall": 420, "humidity": 65}],
+              "soil": [{"field_id": "f-001", "date": "2026-04-15", "soil_ph": 6.4}]}
+    Forecasts use each field's latest observation of each kind.
+    """
+    try:
+        data = request.get_json(silent=True)
+        if not data or not isinstance(data, dict) or not (data.get('weather') or data.get('soil')):
+            return jsonify({'error': 'No data provided'}), 400
+        weather, soil = data.get('weather') or [], data.get('soil') or []
+        with timed('validation'):
+            validation_errors = feed_errors({'weather': (weather, FEED_FIELDS['weather']),
+                                             'soil': (soil, FEED_FIELDS['soil'])})
+        if validation_errors:
+            return jsonify({'error': 'Validation failed', 'details': validation_errors}), 400
+        
+        revision = field_store.add_observations(weather, soil)
+        logger.info("Recorded %d weather and %d soil observations", len(weather), len(soil),
+                    extra={'event': 'field_observations', 'count': len(weather) + len(soil)})
+        return jsonify({'weather': len(weather), 'soil': len(soil), 'revision': revision})
+        
+    except Exception as e:
+        logger.error("Field observation error: %s", e, extra={'event': 'field_observations_error'})
+        return jsonify({'error': f'Recording observations failed: {str(e)}'}), 500
+
+@app.route('/forecast/region', methods=['POST'])
+def forecast_region():
+    """Forecast every registered field in a bounding box
+    
+    Request: {"bbox": [min_longitude, min_latitude, max_longitude, max_latitude],
+              "as_of": "2026-06-01", "crops": ["wheat"], "include_fields": false}
+    ("as_of", "crops" and "include_fields" are optional.) Totals are
+    reported per region and crop; a repeat query only re-scores the
+    fields whose inputs changed since the last one.
+    """
+    try:
+        data = request.get_json(silent=True)
+        if not data or not isinstance(data, dict):
+            return jsonify({'error': 'No data provided'}), 400
+        
+        with timed('validation'):
+            validation_errors = []
+            bbox, as_of, crops = data.get('bbox'), data.get('as_of'), data.get('crops')
+            if not (isinstance(bbox, list) and len(bbox) == 4 and all(isinstance(v, (int, float)) for v in bbox)
+                    and bbox[0] <= bbox[2] and bbox[1] <= bbox[3]):
+                validation_errors.append("bbox must be [min_longitude, min_latitude, max_longitude, max_latitude]")
+            if as_of is not None and not is_iso_date(as_of):
+                validation_errors.append("as_of must be an ISO date (YYYY-MM-DD)")
+            if crops is not None and (not isinstance(crops, list) or not all(validator.is_supported_crop(c) for c in crops)):
+                validation_errors.append(validator.crop_message)
+        if validation_errors:
+            return jsonify({'error': 'Validation failed', 'details': validation_errors}), 400
+        
+        try:
+            with timed('model'):
+                result = forecaster.forecast(bbox, as_of, crops, bool(data.get('include_fields')))
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 413
+        logger.info("Region forecast: %d fields, %d re-scored in %.1f ms", result['fields'], result['rescored'],
+                    result['seconds'] * 1000, extra={'event': 'forecast_region', 'count': result['fields'],
+                                                     'rescored': result['rescored']})
+        return jsonify(result)
+        
+    except Exception as e:
+        logger.error("Region forecast error: %s", e, extra={'event': 'forecast_region_error'})
+        return jsonify({'error': f'Region forecast failed: {str(e)}'}), 500
+
+@app.route('/observe', methods=['POST'])
+def observe():
+    """Record observed harvest yields for incremental model updates
+    
+    Takes the /predict/batch payloads (JSON array, CSV or NDJSON) with an
+    observed "yield" (total, like total_yield) on every record. Valid rows
+    are buffered and folded into the served model every
+    OBSERVE_PUBLISH_INTERVAL seconds; ?flush=1 applies them right away.
+    Only linear and per-crop models can be updated this way; for any
+    other current model the rows are refused with 409.
+    """
+    if not admin_authorized():
+        return jsonify({'error': 'Unauthorized'}), 401
+    try:
+        if not predictor.can_update():
+            return jsonify({'error': "The current model can't be updated incrementally; "
+                                     "retrain a linear or per-crop model first"}), 409
+        
+        try:
+            with timed('parse'):
+                df, strict = parse_batch_request()
+        except ValueError as e:
+            return jsonify({'error': f'Invalid batch payload: {str(e)}'}), 400
+        if df.empty:
+            return jsonify({'error': 'No data provided'}), 400
+        if len(df) > app.config['MAX_BATCH_SIZE']:
+            return jsonify({'error': f"Batch too large: at most {app.config['MAX_BATCH_SIZE']} records"}), 413
+        
+        with timed('validation'):
+            validation_errors = validate_batch_data(df, strict)
+            observed, has_yield = numeric_column(df['yield'], strict) if 'yield' in df.columns \
+                else (np.zeros(len(df)), np.zeros(len(df), dtype=bool))
+            for i in np.flatnonzero(~(has_yield & (observed >= 0))).tolist():
+                validation_errors.setdefault(i, []).append("yield must be a non-negative number")
+        valid = np.ones(len(df), dtype=bool)
+        valid[list(validation_errors)] = False
+        
+        if valid.any():
+            valid_df = df[valid]
+            columns = {'crop_type': valid_df['crop_type'].astype(str).to_numpy()}
+            for field in REQUIRED_FIELDS[1:]:
+                columns[field] = numeric_column(valid_df[field], strict=False)[0]
+            columns['yield'] = observed[valid]
+            observations.add(columns)
+            reloader.start_updates(observations, app.config['OBSERVE_PUBLISH_INTERVAL'],
+                                   app.config['OBSERVE_FORGETTING'], app.config['OBSERVE_MIN_ROWS'])
+        
+        flushing = request.args.get('flush', '').lower() in ('1', 'true', 'yes') and len(observations) > 0
+        if flushing and not reloader.update_async(app.config['OBSERVE_FORGETTING']):
+            flushing = False
+        logger.info("Buffered %d observed yields", int(valid.sum()),
+                    extra={'event': 'observe', 'count': len(df), 'succeeded': int(valid.sum())})
+        return jsonify({
+            'count': len(df),
+            'buffered': int(valid.sum()),
+            'failed': len(validation_errors),
+            'pending': len(observations),
+            'dropped': observations.dropped,
+            'updating': flushing,
+            'errors': [{'index': i, 'error': 'Validation failed', 'details': details}
+                       for i, details in sorted(validation_errors.items())]
+        }), 202
+        
+    except Exception as e:
+        logger.error("Observation error: %s", e, extra={'event': 'observe_error'})
+        return jsonify({'error': f'Recording observations failed: {str(e)}'}), 500
+
 @app.route('/model-info', methods=['GET'])
 def model_info():
     """Get information about the model"""
@@ -209,11 +707,139 @@ def model_info():
         return jsonify({
             'supported_crops': app.config['SUPPORTED_CROPS'],
             'feature_ranges': app.config['FEATURE_RANGES'],
-            'feature_importance': importance
+            'feature_importance': importance,
+            'prediction_cache': predictor.cache.stats(),
+            'model': dict(predictor.bundle.metadata) if predictor.bundle else None
         })
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+def admin_authorized():
+    """Check the admin token; without one configured, only allow DEBUG mode"""
+    token = app.config['ADMIN_TOKEN']
+    if not token:
+        return app.debug
+    return request.headers.get('X-Admin-Token') == token
+
+def training_options(search=None):
+    """Keyword arguments for predictor.train_model() from the config"""
+    if search is None:
+        search = app.config['MODEL_SEARCH']
+    options = {'chunksize': app.config['TRAINING_CHUNK_SIZE'],
+               'family': app.config['MODEL_FAMILY'],
+               'family_jobs': app.config['MODEL_FAMILY_JOBS']}
+    if search:
+        options.update(search=True,
+                       n_splits=app.config['MODEL_SEARCH_FOLDS'],
+                       n_jobs=app.config['MODEL_SEARCH_JOBS'],
+                       max_rows=app.config['MODEL_SEARCH_MAX_ROWS'],
+                       latency_budget_ms=app.config['MODEL_LATENCY_BUDGET_MS'])
+    return options
+
+@app.route('/admin/reload', methods=['POST'])
+def admin_reload():
+    """Reload the persisted model in the background"""
+    if not admin_authorized():
+        return jsonify({'error': 'Unauthorized'}), 401
+    if not reloader.reload_async():
+        return jsonify({'error': 'A model job is already running', 'status': reloader.status()}), 409
+    logger.info("Model reload started")
+    return jsonify({'message': 'Model reload started', 'status': reloader.status()}), 202
+
+@app.route('/admin/retrain', methods=['POST'])
+def admin_retrain():
+    """Retrain the model in the background; predictions keep using the old one
+    
+    Send {"search": true} to run the model search instead of a plain fit.
+    """
+    if not admin_authorized():
+        return jsonify({'error': 'Unauthorized'}), 401
+    search = (request.get_json(silent=True) or {}).get('search')
+    if not reloader.retrain_async(**training_options(search)):
+        return jsonify({'error': 'A model job is already running', 'status': reloader.status()}), 409
+    logger.info("Model retraining started")
+    return jsonify({'message': 'Model retraining started', 'status': reloader.status()}), 202
+
+@app.route('/admin/models', methods=['GET'])
+def admin_models():
+    """List published model versions and the one being served"""
+    if not admin_authorized():
+        return jsonify({'error': 'Unauthorized'}), 401
+    summary = predictor.registry.summary()
+    summary['pinned'] = predictor.pinned_version
+    summary['serving'] = predictor.bundle.metadata.get('model_version') if predictor.bundle else None
+    return jsonify(summary)
+
+def activate_version(version):
+    """Load a just-promoted version unless a pinned one is being served"""
+    logger.info("Model %s promoted", version)
+    if predictor.pinned_version:
+        return jsonify({'message': f'{version} promoted; still serving pinned {predictor.pinned_version}'})
+    if not predictor.load_model(version=version):
+        return jsonify({'error': f'Failed to load {version}'}), 500
+    return jsonify({'message': f'Now serving {version}', 'model': dict(predictor.bundle.metadata)})
+
+@app.route('/admin/promote', methods=['POST'])
+def admin_promote():
+    """Serve a published version: {"version": "v0003"}"""
+    if not admin_authorized():
+        return jsonify({'error': 'Unauthorized'}), 401
+    version = (request.get_json(silent=True) or {}).get('version')
+    try:
+        predictor.registry.promote(version)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return activate_version(version)
+
+@app.route('/admin/rollback', methods=['POST'])
+def admin_rollback():
+    """Serve the previously promoted version again"""
+    if not admin_authorized():
+        return jsonify({'error': 'Unauthorized'}), 401
+    try:
+        version = predictor.registry.rollback()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 409
+    return activate_version(version)
+
+@app.route('/admin/status', methods=['GET'])
+def admin_status():
+    """Report the state of background model jobs"""
+    if not admin_authorized():
+        return jsonify({'error': 'Unauthorized'}), 401
+    return jsonify(reloader.status())
+
+@app.route('/admin/profiler', methods=['GET', 'POST'])
+def admin_profiler():
+    """Toggle the sampling profiler at runtime and read its report"""
+    if not admin_authorized():
+        return jsonify({'error': 'Unauthorized'}), 401
+    
+    if request.method == 'POST':
+        settings = request.get_json(silent=True) or {}
+        if 'enabled' in settings:
+            app.config['PROFILER_ENABLED'] = bool(settings['enabled'])
+        if 'sample_rate' in settings:
+            app.config['PROFILER_SAMPLE_RATE'] = max(1, int(settings['sample_rate']))
+        if 'tracemalloc' in settings:
+            app.config['PROFILER_TRACEMALLOC'] = bool(settings['tracemalloc'])
+        if settings.get('reset'):
+            profiler.reset()
+        profiler.sync_tracemalloc()
+        logger.info("Profiler settings updated: %s", settings)
+    
+    return jsonify(profiler.report(limit=int(request.args.get('limit', 25))))
+
+@app.route('/metrics', methods=['GET'])
+def metrics_endpoint():
+    """Prometheus metrics; ?format=json gives p50/p95/p99 summaries instead"""
+    if request.args.get('format') == 'json':
+        return jsonify({
+            'stages': metrics.summaries('stage_seconds'),
+            'requests': metrics.summaries('request_seconds')
+        })
+    return Response(metrics.render_prometheus(), mimetype='text/plain; version=0.0.4')
+
 @app.route('/health', methods=['GET'])
 def health_check():
     """Health check endpoint"""
@@ -223,12 +849,22 @@ if __name__ == '__main__':
     # Load or train model on startup
     print("Starting Crop Yield Predictor API...")
     
-    if not predictor.load_model():
+    try:
+        loaded = predictor.load_model()
+    except ValueError as e:
+        # e.g. only a pickled model exists and MODEL_ALLOW_PICKLE is off
+        print(f"Model not loaded: {e}")
+        loaded = False
+    if not loaded:
         print("Model not found. Training new model...")
-        if not predictor.train_model():
+        if not predictor.train_model(**training_options()):
             print("Failed to train model. Exiting...")
             exit(1)
     
+    if app.config['MODEL_WATCH']:
+        reloader.start_watching()
+        print("Watching the served model version for changes")
+    
     print(f"API running at: http://{app.config['API_HOST']}:{app.config['API_PORT']}")
     print("Test the API by visiting the URL above in your browser")
     
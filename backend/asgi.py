@@ -0,0 +1,113 @@
+"""Asyncio serving path with request micro-batching.
+
+Concurrent POST /predict calls are queued and scored together by
+MicroBatcher (one vectorized model call per window), then answered
+individually with the same JSON contract as the Flask route. Run with any
+ASGI server, e.g.:
+
+    uvicorn asgi:application --workers 4
+
+Also serves GET /health and GET /metrics/batching (queue depth and batch
+sizes). Everything else stays on the Flask app.
+"""
+import logging
+from app import app, predictor, validate_input_data
+from utils.validation import interval_level
+from models.micro_batcher import MicroBatcher
+from utils.json_codec import available_codec, make_codec
+
+logger = logging.getLogger(__name__)
+json_loads, json_dumps = make_codec(available_codec(app.config['JSON_CODEC']))
+
+batcher = MicroBatcher(
+    predictor,
+    max_batch_size=app.config['MICRO_BATCH_MAX_SIZE'],
+    max_wait=app.config['MICRO_BATCH_WAIT_MS'] / 1000
+)
+
+
+async def read_body(receive):
+    body = b''
+    more_body = True
+    while more_body:
+        message = await receive()
+        body += message.get('body', b'')
+        more_body = message.get('more_body', False)
+    return body
+
+
+async def send_json(send, payload, status=200):
+    body = json_dumps(payload)
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': [(b'content-type', b'application/json'),
+                    (b'content-length', str(len(body)).encode())]
+    })
+    await send({'type': 'http.response.body', 'body': body})
+
+
+async def predict_yield(receive, send):
+    """Predict crop yield based on input parameters (micro-batched)"""
+    try:
+        try:
+            data = json_loads(await read_body(receive) or b'null')
+        except ValueError:
+            data = None
+
+        if not data or not isinstance(data, dict):
+            return await send_json(send, {'error': 'No data provided'}, 400)
+
+        # Validate input data
+        validation_errors = validate_input_data(data)
+        interval, interval_error = interval_level(data.get('interval', app.config['PREDICTION_INTERVAL_LEVEL']))
+        if interval_error:
+            validation_errors.append(interval_error)
+        if validation_errors:
+            return await send_json(send, {'error': 'Validation failed', 'details': validation_errors}, 400)
+
+        result = await batcher.predict(dict(data, interval=interval))
+        return await send_json(send, result)
+
+    except Exception as e:
+        logger.error("Prediction error: %s", e)
+        return await send_json(send, {'error': f'Prediction failed: {str(e)}'}, 500)
+
+
+async def lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            # Load once up front; never train on the request path
+            predictor.auto_train = False
+            try:
+                loaded = predictor.load_model()
+            except ValueError as e:
+                await send({'type': 'lifespan.startup.failed', 'message': str(e)})
+                return
+            if not loaded:
+                await send({'type': 'lifespan.startup.failed',
+                            'message': 'No trained model found'})
+                return
+            batcher.start()
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            await batcher.stop()
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+
+async def application(scope, receive, send):
+    if scope['type'] == 'lifespan':
+        return await lifespan(receive, send)
+    if scope['type'] != 'http':
+        return
+
+    route = (scope['method'], scope['path'])
+    if route == ('POST', '/predict'):
+        return await predict_yield(receive, send)
+    if route == ('GET', '/health'):
+        return await send_json(send, {'status': 'healthy', 'message': 'API is running'})
+    if route == ('GET', '/metrics/batching'):
+        return await send_json(send, batcher.stats())
+    return await send_json(send, {'error': 'Not found'}, 404)
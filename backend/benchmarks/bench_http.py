@@ -0,0 +1,99 @@
+"""Throughput/latency benchmark against a running /predict endpoint.
+
+Start the server (e.g. gunicorn -c gunicorn.conf.py wsgi:application),
+then run from the backend directory:
+    python -m benchmarks.bench_http --url http://127.0.0.1:5000 --concurrency 16
+
+Each request draws different inputs (seeded, uniform within
+Config.FEATURE_RANGES), so the server's prediction cache rarely hits and
+the numbers measure model inference rather than cache lookups.
+"""
+import argparse
+import http.client
+import json
+import random
+import threading
+import time
+from urllib.parse import urlparse
+from config import Config
+
+
+def make_payloads(count, seed=0):
+    """`count` distinct /predict bodies, encoded up front so the loop only sends"""
+    rng = random.Random(seed)
+    return [json.dumps(dict(
+        {field: round(rng.uniform(limits['min'], limits['max']), 3)
+         for field, limits in Config.FEATURE_RANGES.items()},
+        crop_type=rng.choice(Config.SUPPORTED_CROPS))).encode() for _ in range(count)]
+
+
+def percentile(sorted_values, q):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return float('nan')
+    index = min(len(sorted_values) - 1, int(round(q / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def worker(url, path, payloads, deadline, latencies, errors):
+    """Send requests over one keep-alive connection until the deadline"""
+    conn = http.client.HTTPConnection(url.hostname, url.port or 80, timeout=10)
+    headers = {'Content-Type': 'application/json'}
+    local = []
+    sent = 0
+    while time.perf_counter() < deadline:
+        payload = payloads[sent % len(payloads)]
+        sent += 1
+        start = time.perf_counter()
+        try:
+            conn.request('POST', path, body=payload, headers=headers)
+            response = conn.getresponse()
+            response.read()
+            if response.status != 200:
+                errors.append(response.status)
+                continue
+        except (OSError, http.client.HTTPException) as e:
+            errors.append(str(e))
+            conn.close()
+            conn = http.client.HTTPConnection(url.hostname, url.port or 80, timeout=10)
+            continue
+        local.append(time.perf_counter() - start)
+    conn.close()
+    latencies.extend(local)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--url', default='http://127.0.0.1:5000')
+    parser.add_argument('--path', default='/predict')
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--duration', type=float, default=10.0, help="seconds")
+    parser.add_argument('--payloads', type=int, default=20000,
+                        help="distinct request bodies per worker, cycled; keep it above PREDICTION_CACHE_SIZE")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    url = urlparse(args.url)
+    # Each worker gets its own draws, so workers don't warm each other's cache entries
+    payloads = [make_payloads(args.payloads, args.seed + i) for i in range(args.concurrency)]
+    latencies, errors = [], []
+    deadline = time.perf_counter() + args.duration
+    threads = [threading.Thread(target=worker, args=(url, args.path, payloads[i], deadline, latencies, errors))
+               for i in range(args.concurrency)]
+
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    print(f"Requests:    {len(latencies)} ok, {len(errors)} failed in {elapsed:.1f}s")
+    print(f"Throughput:  {len(latencies) / elapsed:.0f} req/s")
+    print(f"Latency p50: {percentile(latencies, 50) * 1000:.2f} ms")
+    print(f"Latency p99: {percentile(latencies, 99) * 1000:.2f} ms")
+
+
+if __name__ == '__main__':
+    main()
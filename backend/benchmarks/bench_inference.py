@@ -0,0 +1,64 @@
+"""Micro-benchmark: per-call latency of the compiled vs sklearn inference paths.
+
+Run from the backend directory:
+    python -m benchmarks.bench_inference
+"""
+import timeit
+import warnings
+from models.crop_model import CropYieldPredictor
+from models.inference import LinearModel, SklearnInference
+
+FIELD = ('wheat', 20.0, 500.0, 60.0, 6.5, 100.0, 10.0)
+
+
+def time_per_call(func, number=20000, repeat=5):
+    """Best-of-`repeat` latency of one call, in microseconds"""
+    best = min(timeit.repeat(func, number=number, repeat=repeat))
+    return best / number * 1e6
+
+
+def sklearn_model(model):
+    """A scikit-learn estimator making the same predictions as `model`
+
+    Registry loads give the NumPy-only LinearModel, so a linear model is
+    rebuilt as sklearn's LinearRegression with the same coefficients.
+    Models that already are sklearn estimators (or have no sklearn form,
+    like PerCropLinearRegression) are returned as they are.
+    """
+    if not isinstance(model, LinearModel):
+        return model
+    from sklearn.linear_model import LinearRegression
+    baseline = LinearRegression()
+    baseline.coef_ = model.coef_
+    baseline.intercept_ = model.intercept_
+    baseline.n_features_in_ = model.n_features_in_
+    return baseline
+
+
+def main():
+    predictor = CropYieldPredictor()
+    if not predictor.load_model():
+        predictor.train_model()
+
+    compiled = predictor.inference
+    baseline = sklearn_model(predictor.model)
+    fallback = SklearnInference(baseline, predictor.label_encoder.classes_)
+
+    # sklearn warns about missing feature names on every ndarray call
+    warnings.simplefilter('ignore')
+
+    results = {
+        f'compiled ({type(compiled).__name__})': time_per_call(lambda: compiled.predict_one(*FIELD)),
+        f'{type(baseline).__name__}.predict': time_per_call(lambda: fallback.predict_one(*FIELD), number=2000),
+        'predict_yield (end to end)': time_per_call(lambda: predictor.predict_yield(*FIELD)),
+    }
+
+    print(f"{'path':<40} {'us/call':>10}")
+    for name, latency in results.items():
+        print(f"{name:<40} {latency:>10.2f}")
+
+    print(f"\nCompiled vs sklearn: {compiled.predict_one(*FIELD):.4f} vs {fallback.predict_one(*FIELD):.4f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,84 @@
+"""Benchmark: cold start, from interpreter launch to the first prediction.
+
+Each run is a fresh `python -X importtime` subprocess that imports the
+app, loads the served model and makes one prediction. Reports the median
+time of each phase, the slowest imports (cumulative, from -X importtime)
+and whether pandas/scikit-learn ended up on the serving path.
+
+Run from the backend directory:
+    python -m benchmarks.bench_startup --runs 5
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CHILD = '''
+import json, sys, time
+started = time.perf_counter()
+from app import predictor
+imported = time.perf_counter()
+predictor.load_model()
+loaded = time.perf_counter()
+predictor.predict_yield('wheat', 20, 500, 60, 6.5, 100, 10)
+predicted = time.perf_counter()
+print(json.dumps({
+    'import_app': imported - started,
+    'load_model': loaded - imported,
+    'first_prediction': predicted - loaded,
+    'heavy_modules': [m for m in ('pandas', 'sklearn', 'scipy') if m in sys.modules]
+}))
+'''
+
+
+def parse_importtime(stderr):
+    """{module: cumulative microseconds} from -X importtime output"""
+    cumulative = {}
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _self_us, total_us, name = line[len('import time:'):].split('|')
+        cumulative[name.strip()] = int(total_us)
+    return cumulative
+
+
+def run_once():
+    proc = subprocess.run([sys.executable, '-X', 'importtime', '-c', CHILD],
+                          cwd=BACKEND_DIR, capture_output=True, text=True, check=True)
+    result = json.loads(proc.stdout.strip().splitlines()[-1])
+    result['imports'] = parse_importtime(proc.stderr)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure time to first prediction')
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--top', type=int, default=10, help='slowest imports to list')
+    args = parser.parse_args()
+
+    runs = [run_once() for _ in range(args.runs)]
+
+    print(f"{'phase':<24} {'median ms':>10}")
+    phases = ('import_app', 'load_model', 'first_prediction')
+    for phase in phases:
+        print(f"{phase:<24} {statistics.median(run[phase] for run in runs) * 1000:>10.1f}")
+    total = statistics.median(sum(run[phase] for phase in phases) for run in runs)
+    print(f"{'time to first prediction':<24} {total * 1000:>10.1f}")
+
+    # Top-level packages only, so the list isn't one package's submodules
+    last = runs[-1]['imports']
+    top_level = sorted(((us, name) for name, us in last.items() if '.' not in name), reverse=True)
+    print(f"\n{'slowest imports':<24} {'cumulative ms':>14}")
+    for us, name in top_level[:args.top]:
+        print(f"{name:<24} {us / 1000:>14.1f}")
+
+    heavy = runs[-1]['heavy_modules']
+    print(f"\nHeavy modules on the serving path: {', '.join(heavy) if heavy else 'none'}")
+
+
+if __name__ == '__main__':
+    main()
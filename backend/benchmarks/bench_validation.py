@@ -0,0 +1,77 @@
+"""Benchmark: per-request cost of validation and JSON decoding/encoding.
+
+Compares the original per-request validate_input_data (rebuilding its
+field list and crop list on every call) with the InputValidator compiled
+from Config, and the stdlib json module with the fast codec in use.
+
+Run from the backend directory:
+    python -m benchmarks.bench_validation
+"""
+import json
+import timeit
+from config import Config
+from utils.json_codec import available_codec, make_codec
+from utils.validation import InputValidator
+
+PAYLOAD = {
+    'crop_type': 'wheat', 'temperature': 20.0, 'rainfall': 500.0, 'humidity': 60.0,
+    'soil_ph': 6.5, 'fertilizer': 100.0, 'area': 10.0
+}
+RESULT = {'total_yield': 60.58, 'yield_per_hectare': 6.06, 'crop_type': 'wheat', 'area': 10.0}
+
+
+def legacy_validate(data, config=vars(Config)):
+    """validate_input_data as it was before InputValidator"""
+    errors = []
+    required_fields = ['crop_type', 'temperature', 'rainfall', 'humidity', 'soil_ph', 'fertilizer', 'area']
+    for field in required_fields:
+        if field not in data:
+            errors.append(f"Missing required field: {field}")
+    if errors:
+        return errors
+    ranges = config['FEATURE_RANGES']
+    for field, limits in ranges.items():
+        if field in data:
+            value = data[field]
+            if not isinstance(value, (int, float)):
+                errors.append(f"{field} must be a number")
+            elif value < limits['min'] or value > limits['max']:
+                errors.append(f"{field} must be between {limits['min']} and {limits['max']}")
+    if data.get('crop_type', '').lower() not in [c.lower() for c in config['SUPPORTED_CROPS']]:
+        errors.append(f"Supported crops: {', '.join(config['SUPPORTED_CROPS'])}")
+    return errors
+
+
+def time_per_call(func, number=50000, repeat=5):
+    """Best-of-`repeat` latency of one call, in microseconds"""
+    return min(timeit.repeat(func, number=number, repeat=repeat)) / number * 1e6
+
+
+def main():
+    validator = InputValidator.from_config(Config)
+    invalid = dict(PAYLOAD, humidity=300, crop_type='kiwi')
+    assert validator.validate(PAYLOAD) == legacy_validate(PAYLOAD)
+    assert validator.validate(invalid) == legacy_validate(invalid)
+
+    codec = available_codec(Config.JSON_CODEC)
+    loads, dumps = make_codec(codec, sort_keys=True)
+    body = json.dumps(PAYLOAD).encode()
+
+    rows = [
+        ('validate (legacy)', time_per_call(lambda: legacy_validate(PAYLOAD))),
+        ('validate (compiled)', time_per_call(lambda: validator.validate(PAYLOAD))),
+        ('json parse + dump (stdlib)',
+         time_per_call(lambda: json.dumps(RESULT, sort_keys=True).encode() and json.loads(body))),
+        (f'json parse + dump ({codec})', time_per_call(lambda: dumps(RESULT) and loads(body))),
+    ]
+
+    print(f"{'step':<32} {'us/request':>12}")
+    for name, latency in rows:
+        print(f"{name:<32} {latency:>12.2f}")
+
+    saved = (rows[0][1] - rows[1][1]) + (rows[2][1] - rows[3][1])
+    print(f"\nSaved per request: {saved:.2f} us")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,10 +1,15 @@
 import os
 
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
 class Config:
     SECRET_KEY = os.environ.get('SECRET_KEY') or 'dev-secret-key-change-in-production'
-    MODEL_PATH = 'models/trained_models/crop_yield_model.pkl'
-    ENCODER_PATH = 'models/trained_models/label_encoder.pkl'
-    DATA_PATH = 'data/processed/clean_crop_data.csv'
+    # Absolute, so they resolve the same whatever directory the app starts in
+    MODEL_DIR = os.environ.get('MODEL_DIR') or os.path.join(BASE_DIR, 'models', 'trained_models')
+    MODEL_PATH = os.path.join(MODEL_DIR, 'crop_yield_model.pkl')  # legacy pickle pair
+    ENCODER_PATH = os.path.join(MODEL_DIR, 'label_encoder.pkl')
+    DATA_PATH = os.path.join(BASE_DIR, 'data', 'processed', 'clean_crop_data.csv')
+    DATA_STORE_PATH = os.path.join(BASE_DIR, 'data', 'processed', 'clean_crop_data')  # memory-mapped columnar copy
     
     # API Configuration
     API_HOST = '127.0.0.1'
@@ -15,6 +20,99 @@ class Config:
     SUPPORTED_CROPS = ['wheat', 'rice', 'corn', 'barley', 'soybean', 'potato', 'tomato']
     MAX_AREA = 1000  # hectares
     MIN_AREA = 0.1
+    MAX_BATCH_SIZE = 100000  # records per /predict/batch call
+    # /predict/grid sweeps: largest grid, grid size above which the
+    # response is streamed, and points scored per vectorized pass
+    MAX_GRID_POINTS = 1000000
+    GRID_STREAM_THRESHOLD = 100000
+    GRID_CHUNK_SIZE = 65536
+    JSON_CODEC = os.environ.get('JSON_CODEC', 'auto')  # auto, orjson, msgspec or stdlib
+    
+    # Prediction cache (entries; 0 disables it) and the number of decimals
+    # numeric inputs are rounded to when building cache keys
+    PREDICTION_CACHE_SIZE = int(os.environ.get('PREDICTION_CACHE_SIZE', 4096))
+    PREDICTION_CACHE_PRECISION = 2
+    
+    # Coverage of the prediction interval returned with each prediction
+    # unless a request picks its own ("interval": 0.8, or false for none);
+    # 0 returns intervals only when asked for
+    PREDICTION_INTERVAL_LEVEL = float(os.environ.get('PREDICTION_INTERVAL_LEVEL', 0.9))
+    
+    # Rows per chunk when training streams the CSV; unset loads it whole
+    TRAINING_CHUNK_SIZE = int(os.environ.get('TRAINING_CHUNK_SIZE', 0)) or None
+    
+    # /optimize: area and fertilizer-rate steps of the candidate search
+    # used for non-linear models, and the time it may take
+    OPTIMIZER_AREA_STEPS = 50
+    OPTIMIZER_RATE_STEPS = 26
+    OPTIMIZER_TIME_LIMIT_MS = 200
+    
+    # Model search: train with k-fold CV over several model families in
+    # parallel and ship the most accurate one whose single prediction
+    # (median, through the /predict inference path) fits the latency budget
+    MODEL_SEARCH = os.environ.get('MODEL_SEARCH', '').lower() in ('1', 'true', 'yes')
+    MODEL_SEARCH_FOLDS = 5
+    MODEL_SEARCH_JOBS = -1  # joblib workers; -1 uses every core
+    MODEL_SEARCH_MAX_ROWS = 200000  # CV runs on a sample of this size
+    MODEL_LATENCY_BUDGET_MS = float(os.environ.get('MODEL_LATENCY_BUDGET_MS', 1.0))
+    
+    # Model family trained without search: 'linear', or 'per_crop' for one
+    # yield-per-hectare model per crop. The per-crop fits are tiny least-
+    # squares solves, so they run in-process; MODEL_FAMILY_JOBS > 1 (or -1
+    # for every core) fits them in a process pool, which only pays off for
+    # large crop vocabularies
+    MODEL_FAMILY = os.environ.get('MODEL_FAMILY', 'linear')
+    MODEL_FAMILY_JOBS = int(os.environ.get('MODEL_FAMILY_JOBS', 1))
+    
+    # Model registry (MODEL_DIR/registry): serve this version instead of the
+    # promoted one, and whether pickled artifacts (the legacy .pkl pair and
+    # model families without an array format) may be loaded at all. Linear
+    # and per-crop models are stored as JSON, so pickles are off by default
+    MODEL_VERSION = os.environ.get('MODEL_VERSION') or None
+    MODEL_ALLOW_PICKLE = os.environ.get('MODEL_ALLOW_PICKLE', '').lower() in ('1', 'true', 'yes')
+    
+    # Field registry for /forecast/region: SQLite file, grid-index cell
+    # size in degrees, and the most fields one forecast may cover
+    FIELD_STORE_PATH = os.environ.get('FIELD_STORE_PATH') or os.path.join(BASE_DIR, 'data', 'fields.sqlite')
+    FIELD_GRID_DEGREES = 0.1
+    MAX_REGION_FIELDS = 500000
+    
+    # Model hot-reload: admin endpoints need this token in X-Admin-Token
+    # (when unset they are only open in DEBUG), and MODEL_WATCH polls the
+    # registry and reloads whenever a different version is promoted
+    ADMIN_TOKEN = os.environ.get('ADMIN_TOKEN')
+    MODEL_WATCH = os.environ.get('MODEL_WATCH', '').lower() in ('1', 'true', 'yes')
+    MODEL_WATCH_INTERVAL = 2.0  # seconds
+    
+    # Online updates from /observe: buffered yields are folded into the
+    # served (linear or per-crop) model every OBSERVE_PUBLISH_INTERVAL
+    # seconds once OBSERVE_MIN_ROWS are waiting. OBSERVE_FORGETTING below
+    # 1 discounts older rows to follow drift; past OBSERVE_MAX_BUFFER rows
+    # the oldest waiting ones are dropped
+    OBSERVE_PUBLISH_INTERVAL = float(os.environ.get('OBSERVE_PUBLISH_INTERVAL', 60))
+    OBSERVE_MIN_ROWS = int(os.environ.get('OBSERVE_MIN_ROWS', 1))
+    OBSERVE_FORGETTING = float(os.environ.get('OBSERVE_FORGETTING', 1.0))
+    OBSERVE_MAX_BUFFER = 100000
+    
+    # Micro-batching window of the asyncio serving path (asgi.py)
+    MICRO_BATCH_MAX_SIZE = 64
+    MICRO_BATCH_WAIT_MS = 2.0
+    
+    # Instrumentation: a Server-Timing header with per-stage durations, and
+    # a sampling profiler (cProfile every Nth request, optional tracemalloc)
+    # that can be toggled on a running app via /admin/profiler
+    SERVER_TIMING = os.environ.get('SERVER_TIMING', '').lower() in ('1', 'true', 'yes')
+    PROFILER_ENABLED = False
+    PROFILER_SAMPLE_RATE = 100
+    PROFILER_TRACEMALLOC = False
+    
+    # Logging: records are written by a background thread (LOG_ASYNC),
+    # as text or JSON lines (LOG_FORMAT), and only this fraction of
+    # /predict requests has its request/response body logged
+    LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO')
+    LOG_FORMAT = os.environ.get('LOG_FORMAT', 'text')
+    LOG_ASYNC = os.environ.get('LOG_ASYNC', '1').lower() in ('1', 'true', 'yes')
+    LOG_BODY_SAMPLE_RATE = float(os.environ.get('LOG_BODY_SAMPLE_RATE', 1.0))
     
     # Feature ranges for validation
     FEATURE_RANGES = {
@@ -1,94 +1,132 @@
 import pandas as pd
 import numpy as np
+import argparse
 import os
+import sys
 
-def generate_sample_data(n_samples=2000):
-    """Generate realistic agricultural data for training"""
-    
-    np.random.seed(42)  # For reproducible results
-    
-    crops = ['wheat', 'rice', 'corn', 'barley', 'soybean', 'potato', 'tomato']
-    
-    # Crop-specific parameters (realistic agricultural data)
-    crop_params = {
-        'wheat': {'temp_opt': 20, 'temp_var': 4, 'rain_opt': 500, 'rain_var': 100, 'base_yield': 3.5},
-        'rice': {'temp_opt': 28, 'temp_var': 3, 'rain_opt': 1200, 'rain_var': 200, 'base_yield': 4.2},
-        'corn': {'temp_opt': 25, 'temp_var': 5, 'rain_opt': 800, 'rain_var': 150, 'base_yield': 9.5},
-        'barley': {'temp_opt': 18, 'temp_var': 4, 'rain_opt': 400, 'rain_var': 80, 'base_yield': 3.0},
-        'soybean': {'temp_opt': 24, 'temp_var': 4, 'rain_opt': 700, 'rain_var': 120, 'base_yield': 2.8},
-        'potato': {'temp_opt': 17, 'temp_var': 3, 'rain_opt': 600, 'rain_var': 100, 'base_yield': 25.0},
-        'tomato': {'temp_opt': 22, 'temp_var': 3, 'rain_opt': 600, 'rain_var': 100, 'base_yield': 50.0}
-    }
-    
-    data = []
-    
-    for _ in range(n_samples):
-        # Randomly select crop
-        crop = np.random.choice(crops)
-        params = crop_params[crop]
-        
-        # Generate environmental conditions based on crop preferences
-        temperature = np.random.normal(params['temp_opt'], params['temp_var'])
-        rainfall = np.random.normal(params['rain_opt'], params['rain_var'])
-        humidity = np.random.normal(65, 10)
-        soil_ph = np.random.normal(6.5, 0.8)
-        fertilizer = np.random.exponential(80)  # Most farmers use moderate amounts
-        area = np.random.exponential(5)  # Most farms are small to medium
-        
-        # Ensure realistic ranges
-        temperature = np.clip(temperature, 5, 45)
-        rainfall = np.clip(rainfall, 100, 2500)
-        humidity = np.clip(humidity, 30, 95)
-        soil_ph = np.clip(soil_ph, 4.0, 9.0)
-        fertilizer = np.clip(fertilizer, 0, 400)
-        area = np.clip(area, 0.5, 100)
-        
-        # Calculate yield with realistic relationships
-        # Temperature factor (optimal curve)
-        temp_factor = 1 - (abs(temperature - params['temp_opt']) / 20) ** 2
-        temp_factor = np.clip(temp_factor, 0.1, 1)
-        
-        # Rainfall factor (diminishing returns)
-        rain_factor = 1 - abs(rainfall - params['rain_opt']) / params['rain_opt']
-        rain_factor = np.clip(rain_factor, 0.2, 1)
-        
-        # Soil pH factor (optimal around 6.5)
-        ph_factor = 1 - abs(soil_ph - 6.5) * 0.15
-        ph_factor = np.clip(ph_factor, 0.3, 1)
-        
-        # Humidity factor (moderate humidity is best)
-        humidity_factor = 1 - abs(humidity - 60) * 0.008
-        humidity_factor = np.clip(humidity_factor, 0.5, 1)
-        
-        # Fertilizer factor (diminishing returns after optimal point)
-        fert_optimal = 120
-        if fertilizer <= fert_optimal:
-            fert_factor = 0.6 + 0.4 * (fertilizer / fert_optimal)
+# Allow running as `python data/sample_data.py` from the backend directory
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils.columnar_store import save_columnar
+from utils.data_preprocessing import remove_outliers, print_report
+
+CROPS = ['wheat', 'rice', 'corn', 'barley', 'soybean', 'potato', 'tomato']
+
+# Crop-specific parameters (realistic agricultural data)
+CROP_PARAMS = {
+    'wheat': {'temp_opt': 20, 'temp_var': 4, 'rain_opt': 500, 'rain_var': 100, 'base_yield': 3.5},
+    'rice': {'temp_opt': 28, 'temp_var': 3, 'rain_opt': 1200, 'rain_var': 200, 'base_yield': 4.2},
+    'corn': {'temp_opt': 25, 'temp_var': 5, 'rain_opt': 800, 'rain_var': 150, 'base_yield': 9.5},
+    'barley': {'temp_opt': 18, 'temp_var': 4, 'rain_opt': 400, 'rain_var': 80, 'base_yield': 3.0},
+    'soybean': {'temp_opt': 24, 'temp_var': 4, 'rain_opt': 700, 'rain_var': 120, 'base_yield': 2.8},
+    'potato': {'temp_opt': 17, 'temp_var': 3, 'rain_opt': 600, 'rain_var': 100, 'base_yield': 25.0},
+    'tomato': {'temp_opt': 22, 'temp_var': 3, 'rain_opt': 600, 'rain_var': 100, 'base_yield': 50.0}
+}
+
+# The same parameters as arrays indexed by crop, for gathering per sample
+PARAM_ARRAYS = {name: np.array([CROP_PARAMS[crop][name] for crop in CROPS], dtype=float)
+                for name in CROP_PARAMS['wheat']}
+
+def generate_sample_data(n_samples=2000, seed=42, rng=None):
+    """Generate realistic agricultural data for training
+    
+    Every column is drawn as a whole array from a numpy Generator, so the
+    cost is a handful of vectorized calls regardless of n_samples. Pass
+    `rng` to continue an existing stream (see iter_sample_chunks).
+    """
+    if rng is None:
+        rng = np.random.default_rng(seed)  # For reproducible results
+    
+    # Randomly select crops and gather their parameters by index
+    crop_idx = rng.integers(len(CROPS), size=n_samples)
+    temp_opt = PARAM_ARRAYS['temp_opt'][crop_idx]
+    rain_opt = PARAM_ARRAYS['rain_opt'][crop_idx]
+    base_yield = PARAM_ARRAYS['base_yield'][crop_idx]
+    
+    # Generate environmental conditions based on crop preferences
+    temperature = rng.normal(temp_opt, PARAM_ARRAYS['temp_var'][crop_idx])
+    rainfall = rng.normal(rain_opt, PARAM_ARRAYS['rain_var'][crop_idx])
+    humidity = rng.normal(65, 10, n_samples)
+    soil_ph = rng.normal(6.5, 0.8, n_samples)
+    fertilizer = rng.exponential(80, n_samples)  # Most farmers use moderate amounts
+    area = rng.exponential(5, n_samples)  # Most farms are small to medium
+    
+    # Ensure realistic ranges
+    temperature = np.clip(temperature, 5, 45)
+    rainfall = np.clip(rainfall, 100, 2500)
+    humidity = np.clip(humidity, 30, 95)
+    soil_ph = np.clip(soil_ph, 4.0, 9.0)
+    fertilizer = np.clip(fertilizer, 0, 400)
+    area = np.clip(area, 0.5, 100)
+    
+    # Calculate yield with realistic relationships
+    # Temperature factor (optimal curve)
+    temp_factor = np.clip(1 - (np.abs(temperature - temp_opt) / 20) ** 2, 0.1, 1)
+    
+    # Rainfall factor (diminishing returns)
+    rain_factor = np.clip(1 - np.abs(rainfall - rain_opt) / rain_opt, 0.2, 1)
+    
+    # Soil pH factor (optimal around 6.5)
+    ph_factor = np.clip(1 - np.abs(soil_ph - 6.5) * 0.15, 0.3, 1)
+    
+    # Humidity factor (moderate humidity is best)
+    humidity_factor = np.clip(1 - np.abs(humidity - 60) * 0.008, 0.5, 1)
+    
+    # Fertilizer factor (diminishing returns after optimal point)
+    fert_optimal = 120
+    fert_factor = np.where(fertilizer <= fert_optimal,
+                           0.6 + 0.4 * (fertilizer / fert_optimal),
+                           1 - (fertilizer - fert_optimal) * 0.001)
+    fert_factor = np.clip(fert_factor, 0.6, 1)
+    
+    # Calculate yield per hectare
+    yield_per_hectare = (base_yield * temp_factor * rain_factor *
+                         ph_factor * humidity_factor * fert_factor *
+                         rng.normal(1, 0.1, n_samples))
+    
+    # Total yield = yield per hectare * area
+    total_yield = np.maximum(yield_per_hectare * area, 0)  # Yield can't be negative
+    
+    return pd.DataFrame({
+        'crop_type': pd.Categorical.from_codes(crop_idx, CROPS),
+        'temperature': np.round(temperature, 1),
+        'rainfall': np.round(rainfall, 1),
+        'humidity': np.round(humidity, 1),
+        'soil_ph': np.round(soil_ph, 1),
+        'fertilizer': np.round(fertilizer, 1),
+        'area': np.round(area, 1),
+        'yield': np.round(total_yield, 2)
+    })
+
+def iter_sample_chunks(n_samples, chunk_size=1_000_000, seed=42):
+    """Yield the sample data as DataFrames of at most chunk_size rows
+    
+    All chunks are drawn from one seeded Generator, so the stream is
+    reproducible for a given seed and chunk_size.
+    """
+    rng = np.random.default_rng(seed)
+    for start in range(0, n_samples, chunk_size):
+        yield generate_sample_data(min(chunk_size, n_samples - start), rng=rng)
+
+def write_sample_parts(out_dir, n_samples, chunk_size=1_000_000, fmt='csv', seed=42):
+    """Stream sample data to part files without holding it all in memory
+    
+    Writes out_dir/part-00000.csv (or .parquet), one file per chunk.
+    Parquet needs pyarrow or fastparquet to be installed.
+    """
+    if fmt not in ('csv', 'parquet'):
+        raise ValueError(f"Unsupported format: {fmt}")
+    
+    os.makedirs(out_dir, exist_ok=True)
+    paths = []
+    for i, chunk in enumerate(iter_sample_chunks(n_samples, chunk_size, seed)):
+        path = os.path.join(out_dir, f'part-{i:05d}.{fmt}')
+        if fmt == 'parquet':
+            chunk.to_parquet(path, index=False)
         else:
-            fert_factor = 1 - (fertilizer - fert_optimal) * 0.001
-        fert_factor = np.clip(fert_factor, 0.6, 1)
-        
-        # Calculate yield per hectare
-        yield_per_hectare = (params['base_yield'] * temp_factor * rain_factor * 
-                           ph_factor * humidity_factor * fert_factor * 
-                           np.random.normal(1, 0.1))
-        
-        # Total yield = yield per hectare * area
-        total_yield = yield_per_hectare * area
-        total_yield = max(0, total_yield)  # Yield can't be negative
-        
-        data.append({
-            'crop_type': crop,
-            'temperature': round(temperature, 1),
-            'rainfall': round(rainfall, 1),
-            'humidity': round(humidity, 1),
-            'soil_ph': round(soil_ph, 1),
-            'fertilizer': round(fertilizer, 1),
-            'area': round(area, 1),
-            'yield': round(total_yield, 2)
-        })
-    
-    return pd.DataFrame(data)
+            chunk.to_csv(path, index=False)
+        paths.append(path)
+        print(f"Wrote {len(chunk)} rows to: {path}")
+    return paths
 
 def save_sample_data():
     """Generate and save sample data"""
@@ -106,22 +144,19 @@ def save_sample_data():
     df.to_csv(raw_path, index=False)
     print(f"Raw data saved to: {raw_path}")
     
-    # Basic data cleaning
-    df_clean = df.copy()
-    
-    # Remove outliers (beyond 3 standard deviations)
-    for column in ['temperature', 'rainfall', 'humidity', 'fertilizer', 'yield']:
-        mean = df_clean[column].mean()
-        std = df_clean[column].std()
-        df_clean = df_clean[
-            (df_clean[column] >= mean - 3*std) & 
-            (df_clean[column] <= mean + 3*std)
-        ]
+    # Remove outliers (beyond 3 standard deviations of each crop's mean)
+    df_clean, report = remove_outliers(df, n_std=3)
+    print_report(report)
     
     # Save cleaned data
     clean_path = 'data/processed/clean_crop_data.csv'
     df_clean.to_csv(clean_path, index=False)
     print(f"Clean data saved to: {clean_path}")
+    
+    # Save a memory-mapped columnar copy for fast training reloads
+    store_path = 'data/processed/clean_crop_data'
+    save_columnar(df_clean, store_path, crops=sorted(CROPS))
+    print(f"Columnar store saved to: {store_path}")
     print(f"Dataset shape: {df_clean.shape}")
     
     # Print basic statistics
@@ -131,4 +166,16 @@ def save_sample_data():
     return df_clean
 
 if __name__ == "__main__":
-    save_sample_data()
+    parser = argparse.ArgumentParser(description="Generate sample agricultural data")
+    parser.add_argument('--samples', type=int, default=None,
+                        help="rows to stream to --out (default: write the 2000-row training set)")
+    parser.add_argument('--out', default='data/raw/parts', help="directory for streamed part files")
+    parser.add_argument('--chunk-size', type=int, default=1_000_000)
+    parser.add_argument('--format', choices=['csv', 'parquet'], default='csv')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+    
+    if args.samples is None:
+        save_sample_data()
+    else:
+        write_sample_parts(args.out, args.samples, args.chunk_size, args.format, args.seed)
@@ -0,0 +1,40 @@
+"""gunicorn settings for serving the API in production.
+
+    gunicorn -c gunicorn.conf.py wsgi:application
+
+WEB_CONCURRENCY, GUNICORN_THREADS and GUNICORN_BIND override the defaults.
+"""
+import gc
+import multiprocessing
+import os
+
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:5000')
+workers = int(os.environ.get('WEB_CONCURRENCY', multiprocessing.cpu_count()))
+threads = int(os.environ.get('GUNICORN_THREADS', 4))
+worker_class = 'gthread'
+
+# Import wsgi.py (and load the model) once in the master, before forking
+preload_app = True
+
+timeout = 30
+keepalive = 5
+accesslog = None  # the app does its own request logging
+
+
+def pre_fork(server, worker):
+    # Move everything allocated so far (the model included) out of the
+    # collector's reach, so GC passes in the workers don't write to these
+    # pages and un-share them
+    gc.freeze()
+
+
+def post_fork(server, worker):
+    # The master's log writer thread didn't survive the fork
+    from utils.request_logging import restart_after_fork
+    restart_after_fork()
+    # Threads don't survive the fork either, so each worker watches the
+    # served model version itself
+    from app import app, reloader
+    if app.config['MODEL_WATCH']:
+        reloader.start_watching()
+    server.log.info("Worker %s ready with preloaded model", worker.pid)
@@ -1,36 +1,112 @@
 import pickle
+import threading
+import time
+from collections import namedtuple
+from types import MappingProxyType
 import numpy as np
-import pandas as pd
-from sklearn.preprocessing import LabelEncoder
-from sklearn.linear_model import LinearRegression
-from sklearn.model_selection import train_test_split
-from sklearn.metrics import mean_squared_error, r2_score
+from models.inference import compile_inference
+from models.prediction_cache import PredictionCache
+from models.registry import ModelRegistry
+from models.uncertainty import compile_intervals
 import os
 
+# Everything a prediction needs, swapped as one object so concurrent
+# requests see either the old model or the new one, never a mix
+ModelBundle = namedtuple('ModelBundle', ['model', 'label_encoder', 'inference', 'intervals', 'metadata'])
+
 class CropYieldPredictor:
-    def __init__(self):
-        self.model = None
-        self.label_encoder = None
+    def __init__(self, cache_size=4096, cache_precision=2, auto_train=True, model_dir=None,
+                 pinned_version=None, allow_pickle=True):
+        self.bundle = None
+        # Production servers turn this off: training must never run inside a request
+        self.auto_train = auto_train
+        # Optional callback(stage, seconds) for per-stage latency instrumentation
+        self.on_stage = None
+        self.cache = PredictionCache(cache_size, cache_precision)
+        self._load_lock = threading.Lock()
+        self._update_lock = threading.Lock()
         self.feature_names = ['crop_type_encoded', 'temperature', 'rainfall', 
                              'humidity', 'soil_ph', 'fertilizer', 'area']
         self.crop_types = ['wheat', 'rice', 'corn', 'barley', 'soybean', 'potato', 'tomato']
+        self._crop_set = frozenset(self.crop_types)
         
         # Get the backend directory path (parent of models folder)
         self.backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        self.model_dir = model_dir or os.path.join(self.backend_dir, 'models', 'trained_models')
         
-    def load_model(self, model_path=None, encoder_path=None):
-        """Load the trained model and label encoder"""
-        if model_path is None:
-            model_path = os.path.join(self.backend_dir, 'models', 'trained_models', 'crop_yield_model.pkl')
-        if encoder_path is None:
-            encoder_path = os.path.join(self.backend_dir, 'models', 'trained_models', 'label_encoder.pkl')
-            
+        # Published versions live in the registry; the single .pkl pair is
+        # only read when nothing has been published yet
+        self.registry = ModelRegistry(os.path.join(self.model_dir, 'registry'), allow_pickle)
+        self.pinned_version = pinned_version
+        self.model_path = os.path.join(self.model_dir, 'crop_yield_model.pkl')
+        self.encoder_path = os.path.join(self.model_dir, 'label_encoder.pkl')
+    
+    @property
+    def watch_path(self):
+        """File that changes whenever a different model should be served"""
+        return self.registry.pointer_path
+    
+    @property
+    def model(self):
+        return self.bundle.model if self.bundle else None
+    
+    @property
+    def label_encoder(self):
+        return self.bundle.label_encoder if self.bundle else None
+    
+    @property
+    def inference(self):
+        return self.bundle.inference if self.bundle else None
+    
+    def _swap_bundle(self, model, label_encoder, uncertainty=None, **metadata):
+        """Compile and publish a new model in a single attribute assignment
+        
+        `uncertainty` is the model's interval spec (see models/uncertainty.py);
+        without one, predictions come without intervals.
+        """
+        previous = self.bundle
+        metadata['version'] = previous.metadata['version'] + 1 if previous else 1
+        metadata['interval_method'] = uncertainty['method'] if uncertainty else None
+        self.bundle = ModelBundle(model, label_encoder,
+                                  compile_inference(model, label_encoder),
+                                  compile_intervals(uncertainty),
+                                  MappingProxyType(metadata))
+        self.cache.clear()
+        
+    def load_model(self, model_path=None, encoder_path=None, version=None):
+        """Load the trained model and label encoder
+        
+        Loads `version` from the registry, or the pinned version, or the
+        current one. Explicit pickle paths (or an empty registry) fall
+        back to the legacy .pkl pair.
+        """
+        started = time.perf_counter()
         try:
+            version = version or self.pinned_version
+            if model_path is None and encoder_path is None and (version or self.registry.current()):
+                model, label_encoder, manifest = self.registry.load(version)
+                self._swap_bundle(model, label_encoder, uncertainty=manifest.get('uncertainty'),
+                                  source='registry', model_version=manifest['version'],
+                                  model_family=manifest['model_type'],
+                                  metrics=manifest['metrics'], data_hash=manifest['data_hash'],
+                                  artifact_bytes=manifest['artifact_bytes'],
+                                  loaded_at=time.time(), load_seconds=time.perf_counter() - started)
+                print(f"Model {manifest['version']} loaded successfully!")
+                return True
+            
+            model_path = model_path or self.model_path
+            encoder_path = encoder_path or self.encoder_path
+            if not self.registry.allow_pickle:
+                raise ValueError(f"{model_path} is a legacy pickle and pickles are disabled")
             with open(model_path, 'rb') as f:
-                self.model = pickle.load(f)
+                model = pickle.load(f)
             
             with open(encoder_path, 'rb') as f:
-                self.label_encoder = pickle.load(f)
+                label_encoder = pickle.load(f)
+            
+            self._swap_bundle(model, label_encoder, source='load', model_path=model_path,
+                              artifact_bytes=os.path.getsize(model_path) + os.path.getsize(encoder_path),
+                              loaded_at=time.time(), load_seconds=time.perf_counter() - started)
             
             print("Model loaded successfully!")
             return True
@@ -39,115 +115,291 @@ class CropYieldPredictor:
             print("Please train the model first by running train_model()")
             return False
     
-    def train_model(self, data_path=None):
-        """Train a new model"""
-        print("Training new model...")
-        
-        if data_path is None:
-            data_path = os.path.join(self.backend_dir, 'data', 'processed', 'clean_crop_data.csv')
+    def train_model(self, data_path=None, chunksize=None, search=False, promote=True, family='linear',
+                    family_jobs=None, **search_options):
+        """Train a new model and publish it to the registry
         
-        # Load data
-        if not os.path.exists(data_path):
-            print(f"Data file not found: {data_path}")
-            print("Please run data/sample_data.py first to generate training data")
-            return False
-        
-        df = pd.read_csv(data_path)
-        print(f"Loaded dataset with {len(df)} samples")
+        See ModelTrainer.train() in models/training.py. The training stack
+        (pandas, scikit-learn) is imported here on first use, so serving a
+        registry model never loads it.
+        """
+        from models.training import ModelTrainer
+        return ModelTrainer(self).train(data_path, chunksize, search, promote, family, family_jobs,
+                                        **search_options)
+    
+    def can_update(self):
+        """True if the registry's current version can take update()"""
+        current = self.registry.current()
+        return bool(current and self.registry.manifest(current).get('normal_equations'))
+    
+    def update(self, records, forgetting=1.0, promote=True):
+        """Fold observed yields into the current model without retraining
         
-        # Encode categorical variables
-        self.label_encoder = LabelEncoder()
-        df['crop_type_encoded'] = self.label_encoder.fit_transform(df['crop_type'])
+        `records` maps 'crop_type', the numeric feature names and the
+        observed 'yield' to equal-length columns, oldest row first. The
+        registry's current version (not necessarily the one this process
+        serves: other workers update and promote too) has its
+        normal-equation statistics given a rank-k update (see
+        models/online.py), optionally forgetting older rows, and the refit
+        model is published as its child. The registry lock is held
+        throughout, so concurrent updates apply one after another. Returns
+        the new version. Raises ValueError if the current model wasn't
+        published with statistics (legacy pickles, non-linear families).
+        """
+        from models.online import OnlineState
+        with self._update_lock:
+            with self.registry.lock():
+                parent = self.registry.current()
+                manifest = self.registry.manifest(parent) if parent else {}
+                if not manifest.get('normal_equations'):
+                    raise ValueError("The current model can't be updated incrementally; "
+                                     "retrain a linear or per-crop model first")
+                state = OnlineState.from_dict(manifest['normal_equations'])
+                bundle = self.bundle
+                if bundle is not None and bundle.metadata.get('model_version') == parent:
+                    label_encoder, inference = bundle.label_encoder, bundle.inference
+                else:
+                    parent_model, label_encoder, _ = self.registry.load(parent)
+                    inference = compile_inference(parent_model, label_encoder)
+                
+                # Observations of crops the model doesn't know are skipped
+                crop_encoded, known = self._encode_crops(records['crop_type'], label_encoder)
+                X = np.column_stack([crop_encoded] + [np.asarray(records[name], dtype=float)
+                                                      for name in self.feature_names[1:]])[known]
+                y = np.asarray(records['yield'], dtype=float)[known]
+                if not len(y):
+                    raise ValueError("No observations of known crops to update with")
+                
+                # Error of the parent model on rows it hasn't seen yet
+                observed_mse = float(np.mean((y - np.maximum(inference.predict(X), 0)) ** 2))
+                state.update(X, y, forgetting)
+                model = state.model(self.feature_names)
+                uncertainty = state.uncertainty(model)
+                metrics = {'observed_mse': observed_mse}
+                
+                version = self.registry.publish(model, label_encoder, self.feature_names, metrics=metrics,
+                                                promote=promote, parent=parent, observations=len(y),
+                                                forgetting=forgetting, normal_equations=state.to_dict(),
+                                                uncertainty=uncertainty)
+            if promote and self.pinned_version is None:
+                self._swap_bundle(model, label_encoder, uncertainty=uncertainty,
+                                  source='update', model_version=version,
+                                  model_family=self.registry.manifest(version)['model_type'],
+                                  parent_version=parent, observations=len(y),
+                                  updated_at=time.time(), metrics=metrics)
+            print(f"Model updated with {len(y)} observations as {version}")
+            return version
+    
+    def _ensure_model(self):
+        """Return the current bundle, loading (or as a last resort training) it first"""
+        bundle = self.bundle
+        if bundle:
+            return bundle
         
-        # Prepare features and target
-        X = df[self.feature_names]
-        y = df['yield']
+        with self._load_lock:
+            if not self.bundle:
+                print("Model not loaded. Loading model...")
+                if not self.load_model():
+                    if not self.auto_train:
+                        raise RuntimeError("Model not loaded and training on demand is disabled")
+                    print("Failed to load model. Training new model...")
+                    if not self.train_model():
+                        raise ValueError("Failed to train model")
+            return self.bundle
+    
+    def _encode_crops(self, crop_types, label_encoder):
+        """Label-encode an array of crop names in one pass.
         
-        # Split data
-        X_train, X_test, y_train, y_test = train_test_split(
-            X, y, test_size=0.2, random_state=42, stratify=df['crop_type']
-        )
+        Unknown crops fall back to 'wheat', like predict_yield does.
+        Returns the encoded column and a mask of the known crops.
+        """
+        crops = np.char.lower(np.asarray(crop_types, dtype=str))
+        classes = np.asarray(label_encoder.classes_, dtype=str)
         
-        # Train model
-        self.model = LinearRegression()
-        self.model.fit(X_train, y_train)
+        # LabelEncoder keeps classes_ sorted, so a binary search is enough
+        idx = np.clip(np.searchsorted(classes, crops), 0, len(classes) - 1)
+        known = classes[idx] == crops
+        fallback = label_encoder.transform(['wheat'])[0]
+        return np.where(known, idx, fallback), known
+    
+    def predict_yield(self, crop_type, temperature, rainfall, humidity, 
+                     soil_ph, fertilizer, area, interval=None):
+        """Make a yield prediction
         
-        # Evaluate
-        y_pred = self.model.predict(X_test)
-        mse = mean_squared_error(y_test, y_pred)
-        r2 = r2_score(y_test, y_pred)
+        With `interval` (a coverage level such as 0.9), the result also
+        holds the bounds of the prediction interval for the total yield,
+        if the served model has interval data.
+        """
+        # Read the cache generation before the model so a concurrent swap
+        # can never leave a stale prediction in the cache
+        generation = self.cache.generation
+        bundle = self._ensure_model()
+        inference = bundle.inference
+        started = time.perf_counter()
         
-        print(f"\nModel Performance:")
-        print(f"Mean Squared Error: {mse:.2f}")
-        print(f"R² Score: {r2:.3f}")
-        print(f"Average Prediction Error: {np.sqrt(mse):.2f} tons")
+        # Validate inputs
+        if crop_type.lower() not in self._crop_set:
+            print(f"Warning: Unknown crop type '{crop_type}'. Using 'wheat' as default.")
+            crop_type = 'wheat'
         
-        # Save model
-        model_dir = os.path.join(self.backend_dir, 'models', 'trained_models')
-        os.makedirs(model_dir, exist_ok=True)
+        # Handle crop types the encoder was not trained on
+        crop_key = crop_type.lower()
+        if crop_key not in inference.crop_codes:
+            crop_key = 'wheat'
+        encoded = time.perf_counter()
         
-        model_path = os.path.join(model_dir, 'crop_yield_model.pkl')
-        encoder_path = os.path.join(model_dir, 'label_encoder.pkl')
+        if self.cache.max_size > 0:
+            key = self.cache.make_key(crop_key, temperature, rainfall, humidity,
+                                      soil_ph, fertilizer, area)
+            cached = self.cache.get(key)
+            if cached is None:
+                # Predict on the quantized inputs so results don't depend on
+                # which nearby request happened to fill the entry
+                cached = self._predict_one(inference, *key)
+                self.cache.put(key, cached, generation)
+            total_yield, yield_per_hectare = cached
+        else:
+            total_yield, yield_per_hectare = self._predict_one(
+                inference, crop_key, temperature, rainfall, humidity, soil_ph, fertilizer, area)
         
-        with open(model_path, 'wb') as f:
-            pickle.dump(self.model, f)
+        result = {
+            'total_yield': total_yield,
+            'yield_per_hectare': yield_per_hectare,
+            'crop_type': crop_type,
+            'area': area
+        }
+        if interval and bundle.intervals:
+            features = np.array([[inference.crop_codes[crop_key], temperature, rainfall, humidity,
+                                  soil_ph, fertilizer, area]], dtype=np.float64)
+            lower, upper = bundle.intervals.bounds(features, np.array([total_yield]), interval)
+            result.update(lower_bound=round(float(lower[0]), 2), upper_bound=round(float(upper[0]), 2),
+                          interval_level=interval)
         
-        with open(encoder_path, 'wb') as f:
-            pickle.dump(self.label_encoder, f)
+        if self.on_stage:
+            self.on_stage('encoding', encoded - started)
+            self.on_stage('model', time.perf_counter() - encoded)
         
-        print("Model saved successfully!")
-        return True
+        return result
     
-    def predict_yield(self, crop_type, temperature, rainfall, humidity, 
+    def _predict_one(self, inference, crop_key, temperature, rainfall, humidity,
                      soil_ph, fertilizer, area):
-        """Make a yield prediction"""
-        if not self.model or not self.label_encoder:
-            print("Model not loaded. Loading model...")
-            if not self.load_model():
-                print("Failed to load model. Training new model...")
-                if not self.train_model():
-                    raise ValueError("Failed to train model")
+        """Rounded (total_yield, yield_per_hectare) for one known crop"""
+        prediction = inference.predict_one(crop_key, temperature, rainfall, humidity,
+                                                soil_ph, fertilizer, area)
         
-        # Validate inputs
-        if crop_type.lower() not in [c.lower() for c in self.crop_types]:
-            print(f"Warning: Unknown crop type '{crop_type}'. Using 'wheat' as default.")
-            crop_type = 'wheat'
+        # Ensure positive yield
+        prediction = max(0, prediction)
         
-        # Encode crop type
-        try:
-            crop_encoded = self.label_encoder.transform([crop_type.lower()])[0]
-        except ValueError:
-            # Handle unknown crop types
-            crop_encoded = self.label_encoder.transform(['wheat'])[0]
+        # Calculate yield per hectare for reference
+        yield_per_hectare = prediction / area if area > 0 else 0
+        
+        return round(prediction, 2), round(yield_per_hectare, 2)
+    
+    def predict_batch(self, records, interval=None):
+        """Make yield predictions for many fields with a single model call.
         
-        # Prepare features
-        features = np.array([[crop_encoded, temperature, rainfall, humidity, 
-                            soil_ph, fertilizer, area]])
+        `records` maps 'crop_type' and the numeric feature names to
+        equal-length columns (a DataFrame or a dict of lists both work).
+        Returns a dict of NumPy arrays aligned with the input rows. With
+        `interval` (one coverage level, or one per row) and a model with
+        interval data, it also holds 'lower_bound' and 'upper_bound',
+        computed for the whole batch at once.
+        """
+        bundle = self._ensure_model()
+        started = time.perf_counter()
         
-        # Make prediction
-        prediction = self.model.predict(features)[0]
+        crop_types = np.asarray(records['crop_type'], dtype=str)
+        crop_encoded, known = self._encode_crops(crop_types, bundle.label_encoder)
         
-        # Ensure positive yield
-        prediction = max(0, prediction)
+        # Prepare the feature matrix column by column
+        columns = [crop_encoded] + [np.asarray(records[name], dtype=float)
+                                    for name in self.feature_names[1:]]
+        features = np.column_stack(columns)
+        encoded = time.perf_counter()
+        
+        # Make predictions, ensuring positive yield
+        predictions = np.maximum(bundle.inference.predict(features), 0)
+        if self.on_stage:
+            self.on_stage('encoding', encoded - started)
+            self.on_stage('model', time.perf_counter() - encoded)
         
         # Calculate yield per hectare for reference
-        yield_per_hectare = prediction / area if area > 0 else 0
+        area = features[:, -1]
+        yield_per_hectare = np.divide(predictions, area,
+                                      out=np.zeros_like(predictions),
+                                      where=area > 0)
         
-        return {
-            'total_yield': round(prediction, 2),
-            'yield_per_hectare': round(yield_per_hectare, 2),
-            'crop_type': crop_type,
+        result = {
+            'total_yield': np.round(predictions, 2),
+            'yield_per_hectare': np.round(yield_per_hectare, 2),
+            'crop_type': np.where(known, crop_types, 'wheat'),
             'area': area
         }
+        if interval is not None and bundle.intervals:
+            lower, upper = bundle.intervals.bounds(features, predictions, interval)
+            result['lower_bound'] = np.round(lower, 2)
+            result['upper_bound'] = np.round(upper, 2)
+        return result
+    
+    def iter_grid(self, crop_type, axes, fixed, chunk_size=65536, per_hectare=False):
+        """Score the Cartesian product of `axes` in chunked vectorized passes.
+        
+        `axes` maps numeric feature names to 1-D arrays of values (the last
+        axis varies fastest); `fixed` holds every other numeric feature.
+        Yields (start, predictions) for consecutive slices of the flattened
+        grid, building only one chunk's feature matrix at a time: each row's
+        grid coordinates come from unravel_index and fixed values are
+        broadcast into their columns. The model is resolved once, so a
+        sweep is scored by a single version even across a reload.
+        """
+        bundle = self._ensure_model()
+        crop_key = crop_type.lower()
+        if crop_key not in bundle.inference.crop_codes:
+            crop_key = 'wheat'
+        
+        names = list(axes)
+        values = [np.asarray(axes[name], dtype=float) for name in names]
+        shape = tuple(len(v) for v in values)
+        total = int(np.prod(shape))
+        
+        for start in range(0, total, chunk_size):
+            stop = min(start + chunk_size, total)
+            index = np.unravel_index(np.arange(start, stop), shape)
+            features = np.empty((stop - start, len(self.feature_names)))
+            features[:, 0] = bundle.inference.crop_codes[crop_key]
+            for column, name in enumerate(self.feature_names[1:], 1):
+                if name in axes:
+                    axis = names.index(name)
+                    features[:, column] = values[axis][index[axis]]
+                else:
+                    features[:, column] = fixed[name]
+            
+            predictions = np.maximum(bundle.inference.predict(features), 0)
+            if per_hectare:
+                area = features[:, -1]
+                predictions = np.divide(predictions, area, out=np.zeros_like(predictions), where=area > 0)
+            yield start, predictions
+    
+    def predict_grid(self, crop_type, axes, fixed, chunk_size=65536, per_hectare=False):
+        """Predictions over the whole grid as an array shaped like `axes`"""
+        started = time.perf_counter()
+        shape = tuple(len(values) for values in axes.values())
+        out = np.empty(int(np.prod(shape)))
+        for start, predictions in self.iter_grid(crop_type, axes, fixed, chunk_size, per_hectare):
+            out[start:start + len(predictions)] = predictions
+        if self.on_stage:
+            self.on_stage('model', time.perf_counter() - started)
+        return out.reshape(shape)
     
     def get_feature_importance(self):
         """Get which factors most affect yield"""
-        if not self.model or not hasattr(self.model, 'coef_'):
+        model = self.model
+        if not model or np.ndim(getattr(model, 'coef_', None)) != 1:
             return None
             
         feature_names_readable = ['Crop Type', 'Temperature', 'Rainfall', 
                                  'Humidity', 'Soil pH', 'Fertilizer', 'Area']
-        importance = dict(zip(feature_names_readable, self.model.coef_))
+        importance = dict(zip(feature_names_readable, model.coef_))
         
         # Sort by absolute importance
         importance_sorted = dict(sorted(importance.items(), 
@@ -0,0 +1,138 @@
+"""Inference core: everything serving a prediction needs, on NumPy alone.
+
+Nothing here imports scikit-learn or pandas, so a server that loads its
+model from the registry never pays their import cost.
+"""
+import numpy as np
+from models.per_crop import PerCropLinearRegression
+
+
+class CropVocabulary:
+    """Stand-in for a fitted LabelEncoder over crop names
+
+    Keeps classes_ sorted like LabelEncoder, so codes are interchangeable.
+    """
+
+    def __init__(self, classes):
+        self.classes_ = np.array(sorted(str(c) for c in classes))
+
+    def transform(self, values):
+        values = np.asarray(values, dtype=str)
+        idx = np.clip(np.searchsorted(self.classes_, values), 0, len(self.classes_) - 1)
+        unknown = self.classes_[idx] != values
+        if unknown.any():
+            raise ValueError(f"y contains previously unseen labels: {values[unknown].tolist()}")
+        return idx
+
+    def inverse_transform(self, codes):
+        return self.classes_[np.asarray(codes, dtype=np.intp)]
+
+
+class LinearModel:
+    """A fitted linear model as plain arrays (what the registry loads)"""
+
+    def __init__(self, coef, intercept, feature_names=None):
+        self.coef_ = np.asarray(coef, dtype=np.float64)
+        self.intercept_ = float(intercept)
+        self.n_features_in_ = len(self.coef_)
+        if feature_names is not None:
+            self.feature_names_in_ = np.array(feature_names, dtype=object)
+
+    def predict(self, X):
+        return np.asarray(X, dtype=np.float64) @ self.coef_ + self.intercept_
+
+
+def is_linear_model(model):
+    """True for single-output linear models: LinearModel or sklearn.linear_model"""
+    if isinstance(model, LinearModel):
+        return True
+    coef = getattr(model, 'coef_', None)
+    return (type(model).__module__.startswith('sklearn.linear_model')
+            and coef is not None and np.ndim(coef) == 1)
+
+
+class LinearInference:
+    """Closed-form inference for linear models.
+
+    The coefficients are pulled out of the fitted estimator once, and the
+    crop term is folded into a per-crop offset, so a single prediction is a
+    dictionary lookup plus a six-term dot product on plain Python floats.
+    """
+    __slots__ = ('coef', 'intercept', 'crop_codes', 'crop_offsets', '_weights')
+
+    def __init__(self, coef, intercept, classes):
+        self.coef = np.array(coef, dtype=np.float64)
+        # Shared copy-on-write between pre-forked workers; never written to
+        self.coef.flags.writeable = False
+        self.intercept = float(intercept)
+        self.crop_codes = {crop: code for code, crop in enumerate(classes)}
+        self.crop_offsets = {crop: self.intercept + float(self.coef[0]) * code
+                             for crop, code in self.crop_codes.items()}
+        self._weights = tuple(float(w) for w in self.coef[1:])
+
+    def predict_one(self, crop, temperature, rainfall, humidity, soil_ph, fertilizer, area):
+        """Predict total yield for one field; `crop` must be a known class"""
+        w = self._weights
+        return (self.crop_offsets[crop] + w[0] * temperature + w[1] * rainfall
+                + w[2] * humidity + w[3] * soil_ph + w[4] * fertilizer + w[5] * area)
+
+    def predict(self, features):
+        """Predict total yield for a (n, 7) feature matrix"""
+        return features @ self.coef + self.intercept
+
+
+class PerCropInference:
+    """Inference for PerCropLinearRegression
+
+    Batches go through the model's own gather-and-einsum; single
+    predictions use each crop's coefficients pre-split into plain floats.
+    """
+    __slots__ = ('model', 'per_hectare', 'crop_codes', '_rows')
+
+    def __init__(self, model, classes):
+        self.model = model
+        self.per_hectare = bool(model.per_hectare)
+        self.crop_codes = {crop: code for code, crop in enumerate(classes)}
+        last = len(model.intercept_) - 1
+        self._rows = {crop: (float(model.intercept_[min(code, last)]),
+                             tuple(float(w) for w in model.coef_[min(code, last)]))
+                      for crop, code in self.crop_codes.items()}
+
+    def predict_one(self, crop, temperature, rainfall, humidity, soil_ph, fertilizer, area):
+        """Predict total yield for one field; `crop` must be a known class"""
+        b, w = self._rows[crop]
+        base = b + w[0] * temperature + w[1] * rainfall + w[2] * humidity + w[3] * soil_ph + w[4] * fertilizer
+        return base * area if self.per_hectare else base + w[5] * area
+
+    def predict(self, features):
+        """Predict total yield for a (n, 7) feature matrix"""
+        return self.model.predict(features)
+
+
+class SklearnInference:
+    """Fallback for models without a closed form (trees, ensembles, ...)"""
+    __slots__ = ('model', 'crop_codes')
+
+    def __init__(self, model, classes):
+        self.model = model
+        self.crop_codes = {crop: code for code, crop in enumerate(classes)}
+
+    def predict_one(self, crop, temperature, rainfall, humidity, soil_ph, fertilizer, area):
+        """Predict total yield for one field; `crop` must be a known class"""
+        features = np.array([[self.crop_codes[crop], temperature, rainfall,
+                              humidity, soil_ph, fertilizer, area]], dtype=np.float64)
+        return float(self.model.predict(features)[0])
+
+    def predict(self, features):
+        """Predict total yield for a (n, 7) feature matrix"""
+        return self.model.predict(features)
+
+
+def compile_inference(model, label_encoder):
+    """Build the fastest inference form available for a fitted model"""
+    classes = [str(c) for c in label_encoder.classes_]
+    if is_linear_model(model):
+        return LinearInference(model.coef_, np.ravel(model.intercept_)[0], classes)
+    if isinstance(model, PerCropLinearRegression):
+        return PerCropInference(model, classes)
+    return SklearnInference(model, classes)
@@ -0,0 +1,93 @@
+import numpy as np
+
+
+class NormalEquations:
+    """Running least-squares sufficient statistics (XᵀX, Xᵀy, yᵀy).
+
+    Rows can be added in any number of chunks; memory stays at
+    O(n_features²) no matter how many rows have been seen. The intercept is
+    handled by an implicit leading column of ones.
+
+    Rows may carry weights, and scale() discounts everything seen so far,
+    so the statistics can also track an exponentially forgetting fit; `n`
+    is then the effective (weighted) row count.
+    """
+
+    def __init__(self, n_features):
+        size = n_features + 1
+        self.xtx = np.zeros((size, size))
+        self.xty = np.zeros(size)
+        self.yty = 0.0
+        self.y_sum = 0.0
+        self.n = 0
+
+    @staticmethod
+    def _design(X):
+        X = np.asarray(X, dtype=np.float64)
+        return np.column_stack([np.ones(len(X)), X])
+
+    def update(self, X, y, weights=None):
+        """Accumulate a chunk of rows (a rank-k update for k rows)"""
+        design = self._design(X)
+        y = np.asarray(y, dtype=np.float64)
+        if weights is None:
+            self.xtx += design.T @ design
+            self.xty += design.T @ y
+            self.yty += float(y @ y)
+            self.y_sum += float(y.sum())
+            self.n += len(y)
+        else:
+            weights = np.asarray(weights, dtype=np.float64)
+            weighted = design * weights[:, None]
+            self.xtx += weighted.T @ design
+            self.xty += weighted.T @ y
+            self.yty += float(weights @ (y * y))
+            self.y_sum += float(weights @ y)
+            self.n += float(weights.sum())
+
+    def scale(self, factor):
+        """Discount every row seen so far by `factor`"""
+        self.xtx *= factor
+        self.xty *= factor
+        self.yty *= factor
+        self.y_sum *= factor
+        self.n *= factor
+
+    def __iadd__(self, other):
+        self.xtx += other.xtx
+        self.xty += other.xty
+        self.yty += other.yty
+        self.y_sum += other.y_sum
+        self.n += other.n
+        return self
+
+    def to_dict(self):
+        return {'xtx': self.xtx.tolist(), 'xty': self.xty.tolist(), 'yty': self.yty,
+                'y_sum': self.y_sum, 'n': self.n}
+
+    @classmethod
+    def from_dict(cls, data):
+        stats = cls(len(data['xty']) - 1)
+        stats.xtx = np.array(data['xtx'], dtype=np.float64)
+        stats.xty = np.array(data['xty'], dtype=np.float64)
+        stats.yty, stats.y_sum, stats.n = float(data['yty']), float(data['y_sum']), data['n']
+        return stats
+
+    def solve(self):
+        """Return (intercept, coef) of the least-squares fit"""
+        try:
+            beta = np.linalg.solve(self.xtx, self.xty)
+        except np.linalg.LinAlgError:
+            # Singular system (e.g. a constant column): minimum-norm solution
+            beta = np.linalg.lstsq(self.xtx, self.xty, rcond=None)[0]
+        return beta[0], beta[1:]
+
+    def sse(self, intercept, coef):
+        """Sum of squared errors of a linear model over the accumulated rows"""
+        beta = np.concatenate([[intercept], coef])
+        return float(self.yty - 2 * beta @ self.xty + beta @ self.xtx @ beta)
+
+    def r2(self, intercept, coef):
+        """R² of a linear model over the accumulated rows"""
+        total = self.yty - self.y_sum ** 2 / self.n
+        return 1 - self.sse(intercept, coef) / total if total > 0 else 0.0
@@ -0,0 +1,129 @@
+import asyncio
+import time
+from collections import Counter
+
+
+class MicroBatcher:
+    """Coalesce concurrent single-field predictions into vectorized calls.
+
+    Callers `await predict(record)`. The first queued request opens a
+    window of `max_wait` seconds (or until `max_batch_size` requests are
+    waiting); everything queued by then is scored with one
+    CropYieldPredictor.predict_batch call and the results are fanned back
+    out to the waiting callers.
+    """
+
+    def __init__(self, predictor, max_batch_size=64, max_wait=0.002):
+        self.predictor = predictor
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self._queue = None
+        self._full = None
+        self._task = None
+
+        # Metrics
+        self.batches = 0
+        self.requests = 0
+        self.max_queue_depth = 0
+        self.batch_sizes = Counter()
+        self.scoring_seconds = 0.0
+
+    def start(self):
+        """Start the batching loop on the running event loop"""
+        if self._task is None or self._task.done():
+            self._queue = asyncio.Queue()
+            self._full = asyncio.Event()
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def predict(self, record):
+        """Predict one validated record; resolves when its batch is scored"""
+        if self._task is None:
+            self.start()
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((record, future))
+        depth = self._queue.qsize()
+        self.max_queue_depth = max(self.max_queue_depth, depth)
+        if depth >= self.max_batch_size - 1:
+            self._full.set()
+        return await future
+
+    async def _collect(self):
+        """Wait for the first request, then gather more until the window closes"""
+        batch = [await self._queue.get()]
+        if self._queue.qsize() < self.max_batch_size - 1:
+            # Hold the window open for stragglers unless the batch fills up
+            self._full.clear()
+            try:
+                await asyncio.wait_for(self._full.wait(), self.max_wait)
+            except asyncio.TimeoutError:
+                pass
+        while len(batch) < self.max_batch_size and not self._queue.empty():
+            batch.append(self._queue.get_nowait())
+        return batch
+
+    async def _run(self):
+        while True:
+            batch = await self._collect()
+            records, futures = zip(*batch)
+            started = time.perf_counter()
+            try:
+                results = self._score(records)
+            except Exception as e:
+                for future in futures:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            finally:
+                self.scoring_seconds += time.perf_counter() - started
+                self.batches += 1
+                self.requests += len(batch)
+                self.batch_sizes[len(batch)] += 1
+
+            for future, result in zip(futures, results):
+                if not future.done():  # the caller may have gone away
+                    future.set_result(result)
+
+    def _score(self, records):
+        """One vectorized model call for the whole batch
+
+        A record's 'interval' is its prediction-interval level (None for
+        none); mixed levels are still scored in the same call.
+        """
+        columns = {name: [record[name] for record in records]
+                   for name in ['crop_type'] + self.predictor.feature_names[1:]}
+        levels = [record.get('interval') or 0 for record in records]
+        scored = self.predictor.predict_batch(columns, levels if any(levels) else None)
+        rows = zip(scored['total_yield'].tolist(), scored['yield_per_hectare'].tolist(),
+                   scored['crop_type'].tolist(), scored['area'].tolist())
+        results = [{'total_yield': total_yield, 'yield_per_hectare': yield_per_hectare,
+                    'crop_type': crop_type, 'area': area}
+                   for total_yield, yield_per_hectare, crop_type, area in rows]
+        if 'lower_bound' in scored:
+            bounds = zip(results, levels, scored['lower_bound'].tolist(), scored['upper_bound'].tolist())
+            for result, level, lower, upper in bounds:
+                if level:
+                    result.update(lower_bound=lower, upper_bound=upper, interval_level=level)
+        return results
+
+    def stats(self):
+        """Queue-depth and batch-size metrics"""
+        return {
+            'queue_depth': self._queue.qsize() if self._queue else 0,
+            'max_queue_depth': self.max_queue_depth,
+            'batches': self.batches,
+            'requests': self.requests,
+            'mean_batch_size': round(self.requests / self.batches, 2) if self.batches else 0.0,
+            'batch_size_histogram': dict(sorted(self.batch_sizes.items())),
+            'mean_scoring_ms': round(self.scoring_seconds / self.batches * 1000, 3) if self.batches else 0.0,
+            'max_batch_size': self.max_batch_size,
+            'max_wait_ms': self.max_wait * 1000
+        }
@@ -0,0 +1,145 @@
+import os
+import threading
+import time
+import traceback
+
+
+class ModelReloader:
+    """Retrain or reload a CropYieldPredictor off the request path.
+
+    Jobs run one at a time on a background thread. The predictor keeps
+    serving its current bundle until the job publishes a new one, so
+    in-flight predictions never wait on training. With `start_watching()`,
+    the registry's current-version pointer is polled and the model is
+    reloaded whenever another process (a cron retrain, a deploy, a
+    rollback) changes it. With `start_updates()`, observed yields waiting
+    in an ObservationBuffer are folded into the model on a schedule.
+    """
+
+    def __init__(self, predictor, poll_interval=2.0):
+        self.predictor = predictor
+        self.poll_interval = poll_interval
+        self.state = 'idle'
+        self.last_job = None
+        self.last_error = None
+        self.last_finished = None
+        self._job_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._watcher = None
+        self._updater = None
+        self.observations = None
+        self._seen_mtime = self._model_mtime()
+
+    def _model_mtime(self):
+        try:
+            return os.stat(self.predictor.watch_path).st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+    def _run(self, name, func, *args, **kwargs):
+        """Run `func` as the current job; the caller must hold _job_lock"""
+        try:
+            if not func(*args, **kwargs):
+                raise RuntimeError(f"{name} did not produce a model")
+            self.last_error = None
+        except Exception as e:
+            self.last_error = f"{name} failed: {e}"
+            print(self.last_error)
+            traceback.print_exc()
+        finally:
+            # Our own writes must not trigger the watcher
+            self._seen_mtime = self._model_mtime()
+            self.last_job = name
+            self.last_finished = time.time()
+            self.state = 'idle'
+            self._job_lock.release()
+
+    def _start(self, name, func, *args, **kwargs):
+        if not self._job_lock.acquire(blocking=False):
+            return False
+        self.state = name
+        thread = threading.Thread(target=self._run, args=(name, func) + args, kwargs=kwargs,
+                                  name=f'model-{name}', daemon=True)
+        thread.start()
+        return True
+
+    def reload_async(self):
+        """Reload the persisted model in the background; False if a job is running"""
+        return self._start('reloading', self.predictor.load_model)
+
+    def retrain_async(self, data_path=None, chunksize=None, **options):
+        """Retrain in the background; False if a job is running
+        
+        Extra `options` (e.g. search=True) are passed to train_model().
+        """
+        return self._start('training', self.predictor.train_model, data_path, chunksize, **options)
+
+    def _apply_observations(self, forgetting):
+        columns = self.observations.drain()
+        if columns is None:
+            return self.predictor.bundle
+        try:
+            return self.predictor.update(columns, forgetting)
+        except ValueError:
+            # The rows can never apply (no updatable model, no known crops);
+            # putting them back would only retry them forever
+            self.observations.discard(columns)
+            raise
+        except Exception:
+            self.observations.restore(columns)
+            raise
+
+    def update_async(self, forgetting=1.0):
+        """Apply the buffered observations now; False if a job is running"""
+        return self._start('updating', self._apply_observations, forgetting)
+
+    def start_updates(self, buffer, interval=60.0, forgetting=1.0, min_rows=1):
+        """Apply `buffer`'s observations every `interval` seconds
+        
+        Each update publishes a new registry version, so the served model
+        changes atomically at most once per interval. Rows that fail to
+        apply go back into the buffer for the next attempt.
+        """
+        self.observations = buffer
+        if self._updater and self._updater.is_alive():
+            return
+        self._updater = threading.Thread(target=self._schedule_updates, args=(interval, forgetting, min_rows),
+                                         name='model-updater', daemon=True)
+        self._updater.start()
+
+    def _schedule_updates(self, interval, forgetting, min_rows):
+        while not self._stop.wait(interval):
+            if len(self.observations) >= min_rows and self.state == 'idle':
+                self.update_async(forgetting)
+
+    def start_watching(self):
+        """Poll the current-version pointer and reload when it changes"""
+        if self._watcher and self._watcher.is_alive():
+            return
+        self._stop.clear()
+        self._watcher = threading.Thread(target=self._watch, name='model-watcher', daemon=True)
+        self._watcher.start()
+
+    def stop_watching(self):
+        self._stop.set()
+
+    def _watch(self):
+        while not self._stop.wait(self.poll_interval):
+            mtime = self._model_mtime()
+            if mtime is not None and mtime != self._seen_mtime and self.state == 'idle':
+                print("Served model version changed on disk. Reloading...")
+                if self.reload_async():
+                    self._seen_mtime = mtime
+
+    def status(self):
+        """Current job state for the admin endpoint"""
+        bundle = self.predictor.bundle
+        return {
+            'state': self.state,
+            'watching': bool(self._watcher and self._watcher.is_alive() and not self._stop.is_set()),
+            'last_job': self.last_job,
+            'last_finished': self.last_finished,
+            'last_error': self.last_error,
+            'pending_observations': len(self.observations) if self.observations is not None else 0,
+            'model': dict(bundle.metadata) if bundle else None
+        }
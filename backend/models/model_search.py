@@ -0,0 +1,161 @@
+"""Parallel model search for train_model(search=True).
+
+Every candidate family is scored with stratified k-fold cross-validation;
+all (candidate, fold) fits run in parallel through joblib. Each candidate
+reports its fit time, R²/MSE across folds and the latency of one
+prediction through the same inference path /predict uses, and the most
+accurate candidate within the latency budget wins.
+
+Run from the backend directory to search and persist the winner:
+    python -m models.model_search --folds 5 --budget-ms 1.0
+"""
+import argparse
+import time
+import numpy as np
+from joblib import Parallel, delayed
+from sklearn.base import clone
+from sklearn.compose import ColumnTransformer
+from sklearn.ensemble import HistGradientBoostingRegressor
+from sklearn.linear_model import LinearRegression, Ridge
+from sklearn.metrics import mean_squared_error, r2_score
+from sklearn.model_selection import StratifiedKFold
+from sklearn.pipeline import make_pipeline
+from sklearn.preprocessing import OneHotEncoder, PolynomialFeatures, StandardScaler
+from models.inference import compile_inference
+from models.per_crop import PerCropLinearRegression
+
+
+def polynomial_model():
+    # Squared terms capture the optimum-temperature/rainfall curves of
+    # sample_data.py; crop one-hots crossed with area give per-crop scale
+    features = ColumnTransformer([
+        ('crop', OneHotEncoder(handle_unknown='ignore', sparse_output=False), [0]),
+        ('numeric', 'passthrough', list(range(1, 7)))
+    ])
+    return make_pipeline(features, PolynomialFeatures(degree=2, include_bias=False),
+                         StandardScaler(), Ridge(alpha=1e-3))
+
+
+CANDIDATES = {
+    'linear': LinearRegression,
+    'per_crop_linear': PerCropLinearRegression,
+    'per_crop_per_hectare': lambda: PerCropLinearRegression(per_hectare=True),
+    'polynomial': polynomial_model,
+    'gradient_boosting': lambda: HistGradientBoostingRegressor(categorical_features=[0], random_state=42)
+}
+
+
+def _fit_fold(name, estimator, X, y, train, test):
+    """Fit one candidate on one fold; runs in a joblib worker"""
+    model = clone(estimator)
+    started = time.perf_counter()
+    model.fit(X[train], y[train])
+    fit_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    y_pred = model.predict(X[test])
+    batch_seconds = time.perf_counter() - started
+
+    return {
+        'name': name,
+        'fit_seconds': fit_seconds,
+        'batch_seconds_per_row': batch_seconds / len(test),
+        'mse': mean_squared_error(y[test], y_pred),
+        'r2': r2_score(y[test], y_pred),
+        'model': model
+    }
+
+
+def single_prediction_latency(model, label_encoder, X, n_calls=200):
+    """Median seconds for one predict_one() call on compiled inference"""
+    inference = compile_inference(model, label_encoder)
+    classes = [str(c) for c in label_encoder.classes_]
+    rows = X[np.arange(n_calls) % len(X)]
+    timings = np.empty(n_calls)
+    for i, row in enumerate(rows):
+        crop = classes[int(row[0])]
+        started = time.perf_counter()
+        inference.predict_one(crop, *row[1:])
+        timings[i] = time.perf_counter() - started
+    return float(np.median(timings))
+
+
+def search_models(X, y, label_encoder, candidates=None, n_splits=5, n_jobs=-1,
+                  latency_budget_ms=1.0, max_rows=None, random_state=42):
+    """Cross-validate the candidate families and pick a winner.
+
+    `X` is the (n, 7) feature matrix with the encoded crop first. With
+    `max_rows`, the search runs on a random subset of that size (the
+    winner is still refit on everything by the caller). Returns
+    (winner_name, results) where results is a list of per-candidate dicts
+    sorted by mean R², best first.
+    """
+    X = np.asarray(X, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    if max_rows and len(y) > max_rows:
+        subset = np.random.default_rng(random_state).choice(len(y), max_rows, replace=False)
+        X, y = X[subset], y[subset]
+
+    candidates = candidates or list(CANDIDATES)
+    estimators = {name: CANDIDATES[name]() for name in candidates}
+    folds = list(StratifiedKFold(n_splits, shuffle=True, random_state=random_state)
+                 .split(X, X[:, 0].astype(int)))
+
+    print(f"Searching {len(candidates)} model families with {n_splits}-fold CV on {len(y)} samples...")
+    fold_results = Parallel(n_jobs=n_jobs)(
+        delayed(_fit_fold)(name, estimators[name], X, y, train, test)
+        for name in candidates for train, test in folds
+    )
+
+    results = []
+    for name in candidates:
+        runs = [run for run in fold_results if run['name'] == name]
+        r2 = np.array([run['r2'] for run in runs])
+        # Timed here, one candidate at a time, so parallel fits don't skew it
+        latency = single_prediction_latency(runs[0]['model'], label_encoder, X)
+        results.append({
+            'name': name,
+            'r2': float(r2.mean()),
+            'r2_std': float(r2.std()),
+            'mse': float(np.mean([run['mse'] for run in runs])),
+            'fit_seconds': float(np.mean([run['fit_seconds'] for run in runs])),
+            'predict_latency_ms': latency * 1000,
+            'batch_rows_per_second': 1 / np.mean([run['batch_seconds_per_row'] for run in runs]),
+            'within_budget': latency * 1000 <= latency_budget_ms
+        })
+    results.sort(key=lambda result: result['r2'], reverse=True)
+
+    eligible = [result for result in results if result['within_budget']]
+    if eligible:
+        winner = eligible[0]['name']
+    else:
+        # Nothing fits the budget: ship the fastest rather than nothing
+        winner = min(results, key=lambda result: result['predict_latency_ms'])['name']
+        print(f"Warning: no model predicts within {latency_budget_ms} ms; using the fastest")
+    return winner, results
+
+
+def print_results(results, winner):
+    print(f"\n{'model':<20} {'R²':>14} {'fit (s)':>9} {'predict (ms)':>13} {'batch rows/s':>13}")
+    for result in results:
+        marker = '*' if result['name'] == winner else ('' if result['within_budget'] else ' (over budget)')
+        print(f"{result['name']:<20} {result['r2']:>7.4f} ±{result['r2_std']:.3f} "
+              f"{result['fit_seconds']:>9.3f} {result['predict_latency_ms']:>13.4f} "
+              f"{result['batch_rows_per_second']:>13,.0f} {marker}")
+
+
+if __name__ == '__main__':
+    from config import Config
+    from models.crop_model import CropYieldPredictor
+
+    parser = argparse.ArgumentParser(description='Search model families and persist the winner')
+    parser.add_argument('--data', default=None, help='CSV file or columnar store to train on')
+    parser.add_argument('--folds', type=int, default=Config.MODEL_SEARCH_FOLDS)
+    parser.add_argument('--jobs', type=int, default=Config.MODEL_SEARCH_JOBS)
+    parser.add_argument('--budget-ms', type=float, default=Config.MODEL_LATENCY_BUDGET_MS)
+    parser.add_argument('--max-rows', type=int, default=Config.MODEL_SEARCH_MAX_ROWS)
+    args = parser.parse_args()
+
+    CropYieldPredictor(cache_size=0).train_model(
+        args.data, search=True, n_splits=args.folds, n_jobs=args.jobs,
+        latency_budget_ms=args.budget_ms, max_rows=args.max_rows)
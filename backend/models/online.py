@@ -0,0 +1,170 @@
+"""Incremental model updates from observed harvest yields.
+
+Linear and per-crop linear models are published with the normal-equation
+statistics they were fit from (manifest key 'normal_equations'): one
+NormalEquations for a linear model, one per crop for a per-crop model.
+Folding in k observed rows is a rank-k update of those statistics plus a
+(p+1)×(p+1) solve, so an update costs O(k·p² + p³) however many rows the
+model was originally trained on.
+
+With a forgetting factor λ < 1, every new row discounts all earlier rows
+by λ (the history is scaled by λᵏ for a batch of k), so the model tracks
+drift with an effective memory of about 1 / (1 - λ) rows.
+
+Observations wait in an ObservationBuffer until ModelReloader applies
+them on its schedule (see CropYieldPredictor.update).
+"""
+import threading
+import numpy as np
+from models.inference import LinearModel, is_linear_model
+from models.linear_stats import NormalEquations
+from models.per_crop import PerCropLinearRegression
+from models.uncertainty import linear_from_stats
+
+
+def fit_statistics(model, X, y):
+    """Normal-equation statistics of a linear or per-crop model's training rows
+
+    Returns the manifest entry as a dict, or None for model families that
+    can't be updated incrementally.
+    """
+    X = np.asarray(X, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    if is_linear_model(model):
+        stats = NormalEquations(X.shape[1])
+        stats.update(X, y)
+        return {'kind': 'linear', 'stats': [stats.to_dict()]}
+    if isinstance(model, PerCropLinearRegression):
+        state = OnlineState('per_crop', [NormalEquations(X.shape[1] - (2 if model.per_hectare else 1))
+                                         for _ in model.intercept_], model.per_hectare)
+        state.update(X, y)
+        return state.to_dict()
+    return None
+
+
+def linear_statistics(stats):
+    """The manifest entry for a linear model fit from `stats` directly"""
+    return {'kind': 'linear', 'stats': [stats.to_dict()]}
+
+
+class OnlineState:
+    """Normal-equation statistics of a served model, updatable in place"""
+
+    def __init__(self, kind, stats, per_hectare=False):
+        self.kind = kind
+        self.stats = stats
+        self.per_hectare = per_hectare
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data['kind'], [NormalEquations.from_dict(s) for s in data['stats']],
+                   data.get('per_hectare', False))
+
+    def to_dict(self):
+        data = {'kind': self.kind, 'stats': [s.to_dict() for s in self.stats]}
+        if self.kind == 'per_crop':
+            data['per_hectare'] = self.per_hectare
+        return data
+
+    def update(self, X, y, forgetting=1.0):
+        """Fold in observed rows, oldest first; a rank-k update for k rows"""
+        X = np.asarray(X, dtype=np.float64)
+        y = np.asarray(y, dtype=np.float64)
+        weights = None
+        if forgetting < 1:
+            weights = forgetting ** np.arange(len(y) - 1, -1, -1, dtype=np.float64)
+            for stats in self.stats:
+                stats.scale(forgetting ** len(y))
+
+        if self.kind == 'linear':
+            self.stats[0].update(X, y, weights)
+            return
+
+        features = X[:, 1:-1] if self.per_hectare else X[:, 1:]
+        if self.per_hectare:
+            y = np.divide(y, X[:, -1], out=np.zeros_like(y), where=X[:, -1] > 0)
+        codes = X[:, 0].astype(np.intp)
+        for code in np.unique(codes):
+            rows = codes == code
+            self.stats[code].update(features[rows], y[rows], None if weights is None else weights[rows])
+
+    def _pooled(self):
+        pooled = NormalEquations(len(self.stats[0].xty) - 1)
+        for stats in self.stats:
+            pooled += stats
+        return pooled
+
+    def _per_crop(self):
+        """Each crop's statistics, or the pooled ones where a crop has too few rows"""
+        pooled = self._pooled()
+        return [stats if stats.n > len(stats.xty) else pooled for stats in self.stats]
+
+    def model(self, feature_names):
+        """The least-squares model for the current statistics"""
+        if self.kind == 'linear':
+            intercept, coef = self.stats[0].solve()
+            return LinearModel(coef, intercept, feature_names)
+        solutions = [stats.solve() for stats in self._per_crop()]
+        model = PerCropLinearRegression(n_crops=len(solutions), per_hectare=self.per_hectare)
+        model.intercept_ = np.array([intercept for intercept, _ in solutions])
+        model.coef_ = np.ascontiguousarray([coef for _, coef in solutions])
+        model.n_features_in_ = len(feature_names)
+        return model
+
+    def uncertainty(self, model):
+        """Interval data for `model` (see models/uncertainty.py)"""
+        if self.kind == 'linear':
+            return linear_from_stats(self.stats[0], model.intercept_, model.coef_)
+        specs = [linear_from_stats(stats, intercept, coef) for stats, intercept, coef
+                 in zip(self._per_crop(), model.intercept_, model.coef_)]
+        return {'method': 'per_crop_linear', 'xtx_inv': [spec['xtx_inv'] for spec in specs],
+                'sigma2': [spec['sigma2'] for spec in specs], 'per_hectare': self.per_hectare}
+
+
+class ObservationBuffer:
+    """Thread-safe holding area for observed rows until the next update
+
+    Rows are kept as column chunks ('crop_type', the numeric features and
+    'yield'). Past `max_rows`, the oldest chunks are dropped.
+    """
+
+    def __init__(self, max_rows=100000):
+        self.max_rows = max_rows
+        self.dropped = 0
+        self._chunks = []
+        self._rows = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return self._rows
+
+    def add(self, columns):
+        """Queue a chunk of rows; returns the number of rows waiting"""
+        chunk = {name: np.asarray(values) for name, values in columns.items()}
+        with self._lock:
+            self._chunks.append(chunk)
+            self._rows += len(chunk['yield'])
+            while self._rows > self.max_rows and len(self._chunks) > 1:
+                dropped = self._chunks.pop(0)
+                self._rows -= len(dropped['yield'])
+                self.dropped += len(dropped['yield'])
+            return self._rows
+
+    def drain(self):
+        """Take every waiting row as one dict of columns, or None if empty"""
+        with self._lock:
+            chunks, self._chunks, self._rows = self._chunks, [], 0
+        if not chunks:
+            return None
+        return {name: np.concatenate([chunk[name] for chunk in chunks]) for name in chunks[0]}
+
+    def discard(self, columns):
+        """Count drained rows that will never apply as dropped"""
+        with self._lock:
+            self.dropped += len(columns['yield'])
+
+    def restore(self, columns):
+        """Put drained rows back in front, e.g. after a failed update"""
+        with self._lock:
+            self._chunks.insert(0, columns)
+            self._rows += len(columns['yield'])
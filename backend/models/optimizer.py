@@ -0,0 +1,221 @@
+"""Crop mix and fertilizer allocation that maximizes predicted total yield.
+
+The planner fixes the climate (temperature, rainfall, humidity, soil_ph),
+the total area and a fertilizer budget in kg. The optimizer splits the
+area into at most one field per crop and picks each field's fertilizer
+rate (kg/ha), maximizing the sum of the fields' predicted yields subject
+to sum(area * rate) <= budget.
+
+Linear models are solved in closed form on yield per hectare (see
+_solve_linear): a pooled linear model adds its intercept and crop offset
+once per field however small, so maximizing its raw sum would split the
+land into slivers. Any other model is solved by
+scoring every (crop, area step, rate step) candidate in one batch
+prediction, then searching that table with a Lagrangian relaxation of
+the budget plus a dynamic program over crops, bisecting the multiplier
+until the budget holds or the time limit is reached.
+
+Either way the plan is checked against per-hectare scoring: when its
+fields' predicted yields add up to noticeably more than each field's
+share of its crop's whole-farm prediction, per-field fixed terms are
+doing the work and the plan is marked unreliable.
+"""
+import time
+import numpy as np
+from models.inference import LinearInference
+
+CLIMATE_FEATURES = ('temperature', 'rainfall', 'humidity', 'soil_ph')
+
+# How far a plan's total may exceed its per-hectare-consistent total
+FIXED_TERM_TOLERANCE = 0.1
+
+
+class YieldOptimizer:
+    def __init__(self, predictor, min_area=0.1, max_rate=500, area_steps=50, rate_steps=26,
+                 time_limit=0.2, max_iterations=40):
+        self.predictor = predictor
+        self.min_area = min_area          # smallest field worth planting, hectares
+        self.max_rate = max_rate          # kg/hectare
+        self.area_steps = area_steps      # area resolution of the search
+        self.rate_steps = rate_steps      # fertilizer-rate resolution of the search
+        self.time_limit = time_limit      # seconds the search may take
+        self.max_iterations = max_iterations
+
+    def optimize(self, climate, total_area, fertilizer_budget, crops=None):
+        """Best allocation for one farm
+
+        `climate` maps the four CLIMATE_FEATURES to values; `crops`
+        optionally restricts the crops that may be planted. Returns a dict
+        with the fields, totals, the method used and the solve time.
+        """
+        started = time.perf_counter()
+        inference = self.predictor._ensure_model().inference
+        crops = [crop.lower() for crop in crops] if crops else list(inference.crop_codes)
+        crops = [crop for crop in dict.fromkeys(crops) if crop in inference.crop_codes]
+        if not crops:
+            raise ValueError("No supported crops to plant")
+
+        climate = [float(climate[name]) for name in CLIMATE_FEATURES]
+
+        if isinstance(inference, LinearInference):
+            fields, details = self._solve_linear(inference, crops, climate, total_area, fertilizer_budget)
+            method = 'closed_form'
+        else:
+            fields, details = self._solve_search(inference, crops, climate, total_area,
+                                                 fertilizer_budget, started)
+            method = 'lagrangian_search'
+
+        # Crops the plan leaves out would still score their fixed terms
+        fields = [field for field in fields if field[1] > 0]
+        yields = self._score(inference, fields, climate)
+        # Each field's share of what its crop would yield on the whole farm
+        planted = [(crop, total_area, rate) for crop, _, rate in fields]
+        shares = self._score(inference, planted, climate) * [area / total_area for _, area, _ in fields]
+        reliable = bool(yields.sum() <= shares.sum() * (1 + FIXED_TERM_TOLERANCE) + 1e-9)
+        if not reliable:
+            details['warning'] = ("Per-field fixed terms of the model dominate this plan; its predicted "
+                                  "total isn't proportional to field areas")
+        allocation = [{
+            'crop_type': crop,
+            'area': round(area, 4),
+            'fertilizer': round(rate, 2),
+            'fertilizer_kg': round(area * rate, 2),
+            'predicted_yield': round(float(y), 2)
+        } for (crop, area, rate), y in zip(fields, yields)]
+
+        return dict({
+            'allocation': allocation,
+            'total_yield': round(float(yields.sum()), 2),
+            'total_area': round(sum(area for _, area, _ in fields), 4),
+            'fertilizer_used': round(sum(area * rate for _, area, rate in fields), 2),
+            'fertilizer_budget': fertilizer_budget,
+            'method': method,
+            'reliable': reliable,
+            'solve_seconds': round(time.perf_counter() - started, 6)
+        }, **details)
+
+    def _features(self, crop_codes, climate, rates, areas):
+        features = np.empty((len(crop_codes), 7))
+        features[:, 0] = crop_codes
+        features[:, 1:5] = climate
+        features[:, 5] = rates
+        features[:, 6] = areas
+        return features
+
+    def _score(self, inference, fields, climate):
+        if not fields:
+            return np.zeros(0)
+        crops, areas, rates = zip(*fields)
+        codes = [inference.crop_codes[crop] for crop in crops]
+        return np.maximum(inference.predict(self._features(codes, climate, rates, areas)), 0)
+
+    def _solve_linear(self, inference, crops, climate, total_area, budget):
+        """Exact per-hectare optimum of an additive linear model
+
+        A field of crop c yields k_c + w_f * rate + w_a * area, with k_c
+        counted once per field whatever its size. Each field is valued
+        instead at its share of the crop's whole-farm prediction,
+        area / A * (k_c + w_f * rate + w_a * A), which is linear in the
+        field's area and in its fertilizer kilograms (w_f * kg / A). The
+        optimum plants the crop with the largest k_c on all the land and,
+        when fertilizer pays (w_f > 0), spreads the budget evenly over it.
+        """
+        coef = inference.coef
+        w_fertilizer = float(coef[5])
+        constants = np.array([inference.crop_offsets[crop] for crop in crops]) + np.dot(coef[1:5], climate)
+        crop = crops[int(np.argmax(constants))]
+        rate = min(self.max_rate, budget / total_area) if w_fertilizer > 0 else 0.0
+        return [(crop, total_area, rate)], {'fertilizer_value_per_kg_ha': round(w_fertilizer, 6)}
+
+    def _solve_search(self, inference, crops, climate, total_area, budget, started):
+        """Lagrangian/DP search over a table of batch-scored candidates"""
+        n_crops, n_area, n_rate = len(crops), self.area_steps, self.rate_steps
+        unit = total_area / n_area
+        areas = np.arange(n_area + 1) * unit
+        rates = np.linspace(0, self.max_rate, n_rate)
+
+        # Every (crop, area step, rate step) candidate in one model call
+        codes = np.array([inference.crop_codes[crop] for crop in crops])
+        grid = np.stack(np.meshgrid(codes, areas[1:], rates, indexing='ij'), axis=-1).reshape(-1, 3)
+        features = self._features(grid[:, 0], climate, grid[:, 2], grid[:, 1])
+        table = np.zeros((n_crops, n_area + 1, n_rate))
+        table[:, 1:, :] = np.maximum(inference.predict(features), 0).reshape(n_crops, n_area, n_rate)
+        # Fields below min_area can't be planted
+        table[:, 1:, :][:, areas[1:] < self.min_area - 1e-9, :] = -np.inf
+        cost = areas[:, None] * rates[None, :]
+
+        def solve(multiplier):
+            """Best plan for yield - multiplier * fertilizer, using all the land"""
+            value = table - multiplier * cost
+            rate_choice = value.argmax(axis=2)
+            gain = np.take_along_axis(value, rate_choice[:, :, None], axis=2)[:, :, 0]
+
+            # best[j]: best value using exactly j area units over crops so far
+            best = np.full(n_area + 1, -np.inf)
+            best[0] = 0
+            choices = []
+            j = np.arange(n_area + 1)
+            for c in range(n_crops):
+                used = j[:, None] - j[None, :]  # units before this crop, per (j, k)
+                candidates = np.where(used >= 0, best[np.clip(used, 0, None)] + gain[c][None, :], -np.inf)
+                choices.append(candidates.argmax(axis=1))
+                best = candidates.max(axis=1)
+
+            picks, remaining = [], n_area
+            for c in reversed(range(n_crops)):
+                k = int(choices[c][remaining])
+                picks.append([c, k, int(rate_choice[c, k])])
+                remaining -= k
+            return picks, sum(cost[k, m] for _, k, m in picks), sum(table[c, k, m] for c, k, m in picks)
+
+        # Unconstrained optimum first; bisect the multiplier only if it overspends
+        picks, spent, total = solve(0.0)
+        iterations, time_limited = 1, False
+        if spent > budget + 1e-9:
+            best_picks, best_total, low, high = None, -np.inf, 0.0, 1.0
+            while iterations < self.max_iterations:
+                picks, spent, total = solve(high)
+                iterations += 1
+                if spent <= budget + 1e-9:
+                    best_picks, best_total = picks, total
+                    break
+                low, high = high, high * 4
+            while iterations < self.max_iterations and high - low > 1e-9 * max(1.0, high):
+                if time.perf_counter() - started > self.time_limit:
+                    time_limited = True
+                    break
+                middle = (low + high) / 2
+                picks, spent, total = solve(middle)
+                iterations += 1
+                if spent <= budget + 1e-9:
+                    high = middle
+                    if total > best_total:
+                        best_picks, best_total = picks, total
+                else:
+                    low = middle
+            picks = best_picks or [[c, 0, 0] for c in range(n_crops)]
+            self._spend_leftover(picks, table, cost, budget)
+
+        plan = [(crops[c], float(areas[k]), float(rates[m])) for c, k, m in reversed(picks)]
+        return plan, {
+            'iterations': iterations,
+            'time_limited': time_limited,
+            'resolution': {'area_step': round(unit, 6), 'rate_step': float(rates[1] - rates[0]) if n_rate > 1 else 0.0}
+        }
+
+    @staticmethod
+    def _spend_leftover(picks, table, cost, budget):
+        """Greedily raise field rates with budget the relaxation left unspent"""
+        while True:
+            leftover = budget - sum(cost[k, m] for _, k, m in picks)
+            best_gain, best_pick, best_rate = 1e-12, None, None
+            for pick in picks:
+                c, k, m = pick
+                affordable = cost[k] - cost[k, m] <= leftover + 1e-9
+                gains = np.where(affordable, table[c, k] - table[c, k, m], -np.inf)
+                rate = int(gains.argmax())
+                if gains[rate] > best_gain:
+                    best_gain, best_pick, best_rate = gains[rate], pick, rate
+            if best_pick is None:
+                return
+            best_pick[2] = best_rate
@@ -0,0 +1,82 @@
+import numpy as np
+
+
+def _solve(X, y):
+    """Least-squares (intercept, coef) for one crop's rows"""
+    design = np.column_stack([np.ones(len(X)), X])
+    solution = np.linalg.lstsq(design, y, rcond=None)[0]
+    return solution[0], solution[1:]
+
+
+class PerCropLinearRegression:
+    """One linear model per crop, stored as a single coefficient array.
+
+    Column 0 of X is the label-encoded crop and the last column the area;
+    the rest are the other numeric features. `coef_` is one C-contiguous
+    (n_crops, n_features) array and `intercept_` has shape (n_crops,), so
+    predicting a batch is one gather of each row's coefficients plus a
+    row-wise einsum. Crops without training rows fall back to a pooled
+    fit over all crops.
+
+    With `per_hectare`, each crop's model is fit on yield per hectare
+    without the area feature, and predictions are multiplied by the area,
+    so yield scales with area instead of growing by a fixed amount per
+    hectare. `n_jobs` fits the crops in parallel worker processes.
+
+    NumPy-only so the inference core can load it without scikit-learn;
+    get_params/set_params are all sklearn.base.clone() needs from it.
+    """
+    _estimator_type = 'regressor'
+
+    def __init__(self, n_crops=None, per_hectare=False, n_jobs=None):
+        self.n_crops = n_crops
+        self.per_hectare = per_hectare
+        self.n_jobs = n_jobs
+
+    def get_params(self, deep=True):
+        return {'n_crops': self.n_crops, 'per_hectare': self.per_hectare, 'n_jobs': self.n_jobs}
+
+    def set_params(self, **params):
+        for name, value in params.items():
+            setattr(self, name, value)
+        return self
+
+    def _design(self, X):
+        """Per-crop model inputs, and the area each prediction is scaled by"""
+        if self.per_hectare:
+            return X[:, 1:-1], X[:, -1]
+        return X[:, 1:], None
+
+    def fit(self, X, y):
+        X = np.asarray(X, dtype=np.float64)
+        y = np.asarray(y, dtype=np.float64)
+        codes = X[:, 0].astype(np.intp)
+        n_crops = self.n_crops or int(codes.max()) + 1
+        features, area = self._design(X)
+        if area is not None:
+            y = np.divide(y, area, out=np.zeros_like(y), where=area > 0)
+
+        crops = np.unique(codes)
+        jobs = [(features[codes == code], y[codes == code]) for code in crops]
+        if self.n_jobs not in (None, 1) and len(crops) > 1:
+            # Imported here so the inference path never loads joblib
+            from joblib import Parallel, delayed
+            solutions = Parallel(n_jobs=self.n_jobs)(delayed(_solve)(*job) for job in jobs)
+        else:
+            solutions = [_solve(*job) for job in jobs]
+
+        pooled_intercept, pooled_coef = _solve(features, y)
+        self.coef_ = np.tile(pooled_coef, (n_crops, 1))
+        self.intercept_ = np.full(n_crops, pooled_intercept)
+        for code, (intercept, coef) in zip(crops, solutions):
+            self.intercept_[code], self.coef_[code] = intercept, coef
+
+        self.n_features_in_ = X.shape[1]
+        return self
+
+    def predict(self, X):
+        X = np.asarray(X, dtype=np.float64)
+        codes = np.clip(X[:, 0].astype(np.intp), 0, len(self.intercept_) - 1)
+        features, area = self._design(X)
+        predictions = np.einsum('ij,ij->i', features, self.coef_[codes]) + self.intercept_[codes]
+        return predictions if area is None else predictions * area
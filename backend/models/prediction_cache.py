@@ -0,0 +1,67 @@
+import threading
+from collections import OrderedDict
+
+
+class PredictionCache:
+    """Bounded, thread-safe LRU cache for single-field predictions.
+
+    Keys are the crop plus the numeric features rounded to `precision`
+    decimals, so small slider changes and repeated form defaults map to the
+    same entry. `clear()` bumps a generation counter; values computed
+    against an older model are dropped by `put()` instead of being stored.
+    """
+
+    def __init__(self, max_size=4096, precision=2):
+        self.max_size = max_size
+        self.precision = precision
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def make_key(self, crop, *features):
+        """Quantize the inputs into a cache key"""
+        return (crop,) + tuple(round(float(value), self.precision) for value in features)
+
+    def get(self, key):
+        """Return the cached value for `key`, or None on a miss"""
+        with self._lock:
+            value = self._entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value, generation):
+        """Store `value` unless the cache was cleared since `generation`"""
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            if generation != self.generation:
+                return
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            if len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        """Drop every entry, e.g. after the model has been swapped"""
+        with self._lock:
+            self._entries.clear()
+            self.generation += 1
+
+    def stats(self):
+        """Size and hit/miss counters for reporting"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'max_size': self.max_size,
+                'precision': self.precision,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0
+            }
@@ -0,0 +1,116 @@
+"""Bulk yield forecasts for every registered field in a region.
+
+RegionForecaster selects the fields in a bounding box from a FieldStore,
+joins each one's latest weather and soil observations and scores them
+in one predict_batch() pass. Totals are reported per (region, crop).
+
+Each field's prediction is remembered with the store revision it was
+computed from. A repeat query reads only the (field_id, revision) pairs
+from the grid index and fetches and re-scores just the fields whose
+revision, observation date cut-off or serving model changed.
+"""
+import threading
+import time
+import numpy as np
+
+
+class RegionForecaster:
+    def __init__(self, predictor, store, max_fields=500000, max_cached=1_000_000):
+        self.predictor = predictor
+        self.store = store
+        self.max_fields = max_fields
+        self.max_cached = max_cached
+        # field_id -> (revision, as_of, crop_type, region, area, total_yield);
+        # crop_type is None for fields still missing weather or soil inputs
+        self._cache = {}
+        self._bundle = None
+        self._lock = threading.Lock()
+
+    def forecast(self, bbox, as_of=None, crops=None, include_fields=False):
+        """Forecast every field in `bbox` (see FieldStore.select)
+
+        `as_of` (an ISO date) limits the observations used to those made on
+        or before it. Returns a dict with per-(region, crop) aggregates,
+        overall totals and how many fields were re-scored. Raises
+        ValueError if the box holds more than `max_fields` fields.
+        """
+        started = time.perf_counter()
+        bundle = self.predictor._ensure_model()
+        selected = self.store.select(bbox, crops, limit=self.max_fields + 1)
+        if len(selected) > self.max_fields:
+            raise ValueError(f"Region too large: more than {self.max_fields} fields")
+
+        with self._lock:
+            if bundle is not self._bundle or len(self._cache) > self.max_cached:
+                # A different model makes every remembered prediction stale
+                self._cache.clear()
+                self._bundle = bundle
+            reused, stale = {}, {}
+            for field_id, revision in selected:
+                entry = self._cache.get(field_id)
+                if entry is not None and entry[:2] == (revision, as_of):
+                    reused[field_id] = entry
+                else:
+                    stale[field_id] = revision
+
+        scored = {}
+        if stale:
+            inputs = self.store.latest_inputs(list(stale), as_of)
+            if inputs['field_id']:
+                predictions = self.predictor.predict_batch(inputs)
+                scored = {field_id: (stale[field_id], as_of, crop, region, area, total)
+                          for field_id, crop, region, area, total in zip(
+                              inputs['field_id'], predictions['crop_type'].tolist(), inputs['region'],
+                              inputs['area'], predictions['total_yield'].tolist())}
+            for field_id in stale.keys() - scored.keys():
+                scored[field_id] = (stale[field_id], as_of, None, None, 0.0, 0.0)
+
+        with self._lock:
+            if self._bundle is bundle:
+                self._cache.update(scored)
+        entries = [reused.get(field_id) or scored[field_id] for field_id, _ in selected]
+
+        result = self._aggregate(selected, entries)
+        result.update({
+            'rescored': len(stale),
+            'reused': len(reused),
+            'as_of': as_of,
+            'model_version': bundle.metadata.get('model_version'),
+            'seconds': round(time.perf_counter() - started, 6)
+        })
+        if include_fields:
+            result['field_forecasts'] = [
+                {'field_id': field_id, 'crop_type': crop, 'region': region, 'area': area,
+                 'total_yield': total, 'yield_per_hectare': round(total / area, 2) if area > 0 else 0}
+                for (field_id, _), (_, _, crop, region, area, total) in zip(selected, entries)
+                if crop is not None]
+        return result
+
+    @staticmethod
+    def _aggregate(selected, entries):
+        groups, keys = {}, []
+        for _, _, crop, region, _, _ in entries:
+            if crop is not None:
+                keys.append(groups.setdefault((region, crop), len(groups)))
+        scored = [entry for entry in entries if entry[2] is not None]
+        index = np.array(keys, dtype=np.intp)
+        areas = np.bincount(index, weights=[entry[4] for entry in scored], minlength=len(groups))
+        totals = np.bincount(index, weights=[entry[5] for entry in scored], minlength=len(groups))
+        counts = np.bincount(index, minlength=len(groups))
+
+        aggregates = sorted(({
+            'region': region,
+            'crop_type': crop,
+            'fields': int(counts[i]),
+            'area': round(float(areas[i]), 4),
+            'total_yield': round(float(totals[i]), 2),
+            'yield_per_hectare': round(float(totals[i] / areas[i]), 2) if areas[i] > 0 else 0
+        } for (region, crop), i in groups.items()), key=lambda row: (row['region'], row['crop_type']))
+
+        return {
+            'fields': len(selected),
+            'missing_inputs': len(selected) - len(scored),
+            'total_area': round(float(areas.sum()), 4),
+            'total_yield': round(float(totals.sum()), 2),
+            'aggregates': aggregates
+        }
@@ -0,0 +1,295 @@
+"""Versioned model registry.
+
+Every trained model is published as its own directory:
+
+    registry/
+        v0001/manifest.json       feature order, crop vocabulary, metrics,
+                                  training-data hash, artifact size
+        v0001/coefficients.json   linear and per-crop models: plain arrays, no pickle
+        v0002/model.pkl           other families (trees, pipelines) only
+        current.json              the served version and its predecessors
+
+Linear and per-crop linear models are rebuilt from their arrays, so
+loading never unpickles anything (or imports scikit-learn) for them; the
+label encoder is rebuilt from the manifest's crop list. The arrays are a few dozen floats, so
+they are stored as JSON, which round-trips float64 exactly and parses
+in microseconds, where opening an .npz archive costs a zipfile read.
+Versions are published by writing a temporary directory and renaming
+it, and `current.json` is replaced atomically, so readers never see a
+half-written model. Writers (publish, promote, rollback, and callers that
+read the current version before publishing a child of it) serialize on
+an advisory file lock, `.lock`, so several processes can share a registry.
+
+Run from the backend directory:
+    python -m models.registry list
+    python -m models.registry rollback
+    python -m models.registry promote v0002
+    python -m models.registry import-legacy     # adopt the old .pkl pair
+"""
+import argparse
+import errno
+import hashlib
+import json
+import os
+import pickle
+import re
+import shutil
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+import numpy as np
+from models.inference import CropVocabulary, LinearModel, is_linear_model
+from models.per_crop import PerCropLinearRegression
+
+try:
+    import fcntl
+except ImportError:  # Windows: the lock only covers this process
+    fcntl = None
+
+FORMAT_VERSION = 1
+_VERSION_RE = re.compile(r'^v\d{4,}$')
+
+
+def _atomic_write(path, data):
+    """Write bytes to a temp file in the same directory, then rename over `path`"""
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def dataset_hash(path, block_size=1 << 20):
+    """SHA-256 of a training CSV, or of every file in a columnar store"""
+    if os.path.isdir(path):
+        files = [os.path.join(path, name) for name in sorted(os.listdir(path))]
+    else:
+        files = [path]
+    digest = hashlib.sha256()
+    for file_path in files:
+        with open(file_path, 'rb') as f:
+            while block := f.read(block_size):
+                digest.update(block)
+    return digest.hexdigest()
+
+
+def to_arrays(model):
+    """(model_type, arrays) for models with an array form, else (None, None)"""
+    if is_linear_model(model):
+        return 'linear', {'coef': np.asarray(model.coef_, dtype=np.float64),
+                          'intercept': np.atleast_1d(np.float64(model.intercept_))}
+    if isinstance(model, PerCropLinearRegression):
+        model_type = 'per_crop_per_hectare' if model.per_hectare else 'per_crop_linear'
+        return model_type, {'coef': np.asarray(model.coef_, dtype=np.float64),
+                            'intercept': np.asarray(model.intercept_, dtype=np.float64)}
+    return None, None
+
+
+def from_arrays(model_type, arrays, feature_names):
+    """Rebuild a fitted model from the arrays written by to_arrays()"""
+    if model_type == 'linear':
+        return LinearModel(arrays['coef'], arrays['intercept'][0], feature_names)
+    if model_type in ('per_crop_linear', 'per_crop_per_hectare'):
+        model = PerCropLinearRegression(n_crops=len(arrays['intercept']),
+                                        per_hectare=model_type == 'per_crop_per_hectare')
+        model.coef_ = arrays['coef']
+        model.intercept_ = arrays['intercept']
+        model.n_features_in_ = len(feature_names)
+        return model
+    raise ValueError(f"Unknown array model type: {model_type}")
+
+
+class ModelRegistry:
+    def __init__(self, root, allow_pickle=True):
+        self.root = root
+        # Pickled artifacts (families without an array form) can run
+        # arbitrary code when loaded; turn this off to refuse them
+        self.allow_pickle = allow_pickle
+        self.pointer_path = os.path.join(root, 'current.json')
+        self._thread_lock = threading.RLock()
+        self._lock_depth = 0
+        self._lock_file = None
+
+    @contextmanager
+    def lock(self):
+        """Hold the registry's cross-process write lock (reentrant)"""
+        with self._thread_lock:
+            if self._lock_depth == 0:
+                os.makedirs(self.root, exist_ok=True)
+                self._lock_file = open(os.path.join(self.root, '.lock'), 'a')
+                if fcntl:
+                    fcntl.flock(self._lock_file, fcntl.LOCK_EX)
+            self._lock_depth += 1
+            try:
+                yield
+            finally:
+                self._lock_depth -= 1
+                if self._lock_depth == 0:
+                    # Closing the file releases the flock
+                    self._lock_file.close()
+                    self._lock_file = None
+
+    def versions(self):
+        """Published versions, oldest first"""
+        if not os.path.isdir(self.root):
+            return []
+        return sorted(name for name in os.listdir(self.root)
+                      if _VERSION_RE.match(name) and os.path.isdir(os.path.join(self.root, name)))
+
+    def _read_pointer(self):
+        try:
+            with open(self.pointer_path) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {'version': None, 'previous': []}
+
+    def _write_pointer(self, version, previous):
+        pointer = {'version': version, 'previous': previous, 'updated_at': time.time()}
+        _atomic_write(self.pointer_path, json.dumps(pointer, indent=2).encode())
+
+    def current(self):
+        """The version being served, or None if nothing was promoted yet"""
+        return self._read_pointer()['version']
+
+    def manifest(self, version):
+        with open(os.path.join(self.root, version, 'manifest.json')) as f:
+            return json.load(f)
+
+    def publish(self, model, label_encoder, feature_names, metrics=None, data_hash=None,
+                promote=True, **extra):
+        """Store a fitted model as the next version; returns the version name"""
+        os.makedirs(self.root, exist_ok=True)
+        tmp_dir = tempfile.mkdtemp(dir=self.root, prefix='.publish-')
+        try:
+            model_type, arrays = to_arrays(model)
+            if arrays is not None:
+                artifact = 'coefficients.json'
+                with open(os.path.join(tmp_dir, artifact), 'w') as f:
+                    json.dump({name: values.tolist() for name, values in arrays.items()}, f)
+            else:
+                model_type, artifact = type(model).__name__, 'model.pkl'
+                with open(os.path.join(tmp_dir, artifact), 'wb') as f:
+                    pickle.dump(model, f)
+
+            manifest = dict(extra, **{
+                'format_version': FORMAT_VERSION,
+                'created_at': time.time(),
+                'model_type': model_type,
+                'artifact': artifact,
+                'artifact_bytes': os.path.getsize(os.path.join(tmp_dir, artifact)),
+                'feature_names': list(feature_names),
+                'crops': [str(c) for c in label_encoder.classes_],
+                'metrics': metrics or {},
+                'data_hash': data_hash
+            })
+            with self.lock():
+                version = self._claim_version(tmp_dir, manifest)
+                if promote:
+                    self.promote(version)
+        except BaseException:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            raise
+        return version
+
+    def _claim_version(self, tmp_dir, manifest):
+        """Rename `tmp_dir` to the next free version name and return it
+
+        The lock keeps cooperating writers apart; a name taken anyway (by
+        a writer without it) moves on to the next number.
+        """
+        existing = self.versions()
+        number = int(existing[-1][1:]) + 1 if existing else 1
+        while True:
+            version = f"v{number:04d}"
+            manifest['version'] = version
+            with open(os.path.join(tmp_dir, 'manifest.json'), 'w') as f:
+                json.dump(manifest, f, indent=2)
+            try:
+                os.rename(tmp_dir, os.path.join(self.root, version))
+                return version
+            except OSError as e:
+                if e.errno not in (errno.EEXIST, errno.ENOTEMPTY):
+                    raise
+                number += 1
+
+    def load(self, version=None):
+        """Return (model, label_encoder, manifest) for `version` (default: current)"""
+        version = version or self.current()
+        if version is None:
+            raise FileNotFoundError(f"No model promoted in {self.root}")
+        manifest = self.manifest(version)
+        artifact_path = os.path.join(self.root, version, manifest['artifact'])
+
+        if manifest['artifact'] == 'model.pkl':
+            if not self.allow_pickle:
+                raise ValueError(f"{version} is a pickled {manifest['model_type']} and pickles are disabled")
+            with open(artifact_path, 'rb') as f:
+                model = pickle.load(f)
+        else:
+            with open(artifact_path) as f:
+                arrays = {name: np.array(values, dtype=np.float64) for name, values in json.load(f).items()}
+            model = from_arrays(manifest['model_type'], arrays, manifest['feature_names'])
+
+        return model, CropVocabulary(manifest['crops']), manifest
+
+    def promote(self, version):
+        """Serve `version`; the previously served one can be restored with rollback()"""
+        with self.lock():
+            if version not in self.versions():
+                raise ValueError(f"Unknown model version: {version}")
+            pointer = self._read_pointer()
+            previous = pointer['previous']
+            if pointer['version'] and pointer['version'] != version:
+                previous = previous + [pointer['version']]
+            self._write_pointer(version, previous)
+
+    def rollback(self):
+        """Serve the previously promoted version again; returns it"""
+        with self.lock():
+            pointer = self._read_pointer()
+            if not pointer['previous']:
+                raise ValueError("No earlier version to roll back to")
+            version = pointer['previous'][-1]
+            self._write_pointer(version, pointer['previous'][:-1])
+        return version
+
+    def summary(self):
+        pointer = self._read_pointer()
+        return {
+            'current': pointer['version'],
+            'previous': pointer['previous'],
+            'versions': [{key: manifest.get(key) for key in
+                          ('version', 'created_at', 'model_type', 'artifact_bytes', 'metrics', 'data_hash')}
+                         for manifest in map(self.manifest, self.versions())]
+        }
+
+
+if __name__ == '__main__':
+    from models.crop_model import CropYieldPredictor
+
+    parser = argparse.ArgumentParser(description='Manage published model versions')
+    parser.add_argument('command', choices=['list', 'rollback', 'promote', 'import-legacy'])
+    parser.add_argument('version', nargs='?')
+    args = parser.parse_args()
+
+    predictor = CropYieldPredictor(cache_size=0, auto_train=False)
+    registry = predictor.registry
+    if args.command == 'rollback':
+        print(f"Now serving {registry.rollback()}")
+    elif args.command == 'promote':
+        registry.promote(args.version)
+        print(f"Now serving {args.version}")
+    elif args.command == 'import-legacy':
+        with open(predictor.model_path, 'rb') as f:
+            model = pickle.load(f)
+        with open(predictor.encoder_path, 'rb') as f:
+            label_encoder = pickle.load(f)
+        print(f"Published {registry.publish(model, label_encoder, predictor.feature_names, source='legacy')}")
+    else:
+        print(json.dumps(registry.summary(), indent=2))
@@ -0,0 +1,259 @@
+"""Model training, kept out of the serving import path.
+
+CropYieldPredictor.train_model() imports this module on first use, so
+pandas and scikit-learn are only loaded by processes that actually
+train; a server loading a registry model needs NumPy alone.
+"""
+import os
+import time
+import numpy as np
+import pandas as pd
+from sklearn.preprocessing import LabelEncoder
+from sklearn.linear_model import LinearRegression
+from sklearn.model_selection import train_test_split
+from sklearn.metrics import mean_squared_error, r2_score
+from models.linear_stats import NormalEquations
+from models.model_search import CANDIDATES, print_results, search_models
+from models.per_crop import PerCropLinearRegression
+from models.registry import dataset_hash
+from models.online import fit_statistics, linear_statistics
+from models.uncertainty import estimate_uncertainty, linear_from_stats
+from utils.columnar_store import is_columnar_store, load_columnar
+
+
+class ModelTrainer:
+    """Fits, publishes and (optionally) starts serving a model for a predictor"""
+
+    def __init__(self, predictor):
+        self.predictor = predictor
+        self.feature_names = predictor.feature_names
+        self.crop_types = predictor.crop_types
+
+    def train(self, data_path=None, chunksize=None, search=False, promote=True, family='linear',
+              family_jobs=None, **search_options):
+        """Train a new model
+        
+        `data_path` may be a CSV file or a columnar store directory (see
+        utils/columnar_store.py), which is memory-mapped rather than parsed.
+        By default a CSV is loaded into memory whole. With `chunksize`,
+        it is streamed `chunksize` rows at a time instead, so peak memory
+        is bounded by the chunk size rather than the file size.
+        
+        With `search`, several model families are cross-validated in
+        parallel (see models/model_search.py, which takes `search_options`)
+        and the winner is refit on all the data and saved.
+        
+        With `family='per_crop'`, one linear model per crop is fit on yield
+        per hectare (see models/per_crop.py), on `family_jobs` processes.
+        The per-crop split needs every row, so the data is loaded whole.
+        
+        Interval data (see models/uncertainty.py) is estimated alongside:
+        from the training design for linear and per-crop models, and from
+        hold-out residuals for the rest. Linear and per-crop models also
+        keep their normal-equation statistics, so observed yields can be
+        folded in later without retraining (see models/online.py).
+        
+        The manifest also records how the hold-out rows behind the metrics
+        were drawn ('holdout'), so utils/model_evaluation.py can score the
+        model on the same rows. Search winners are refit on every row and
+        have none.
+        
+        The model is published as a new registry version. Unless `promote`
+        is False it also becomes the served version; otherwise it can be
+        evaluated first and promoted later.
+        """
+        print("Training new model...")
+        started = time.perf_counter()
+        
+        if data_path is None:
+            # Prefer the memory-mapped store when it has been generated
+            data_path = os.path.join(self.predictor.backend_dir, 'data', 'processed', 'clean_crop_data')
+            if not is_columnar_store(data_path):
+                data_path = data_path + '.csv'
+        
+        # Load data
+        if not os.path.exists(data_path):
+            print(f"Data file not found: {data_path}")
+            print("Please run data/sample_data.py first to generate training data")
+            return False
+        
+        search_report = None
+        if search:
+            model, label_encoder, mse, r2, fit_info, search_report = self._fit_search(data_path, **search_options)
+        elif family == 'per_crop':
+            model = PerCropLinearRegression(per_hectare=True, n_jobs=family_jobs)
+            model, label_encoder, mse, r2, fit_info = self._fit_in_memory(data_path, model)
+        elif family != 'linear':
+            raise ValueError(f"Unknown model family: {family}")
+        elif is_columnar_store(data_path):
+            model, label_encoder, mse, r2, fit_info = self._fit_columnar(data_path, chunksize or 1_000_000)
+        elif chunksize:
+            model, label_encoder, mse, r2, fit_info = self._fit_streaming(data_path, chunksize)
+        else:
+            model, label_encoder, mse, r2, fit_info = self._fit_in_memory(data_path)
+        
+        print(f"\nModel Performance:")
+        print(f"Mean Squared Error: {mse:.2f}")
+        print(f"R² Score: {r2:.3f}")
+        print(f"Average Prediction Error: {np.sqrt(mse):.2f} tons")
+        
+        # Save model as a new registry version
+        metrics = {'mse': float(mse), 'r2': float(r2)}
+        train_seconds = time.perf_counter() - started
+        version = self.predictor.registry.publish(model, label_encoder, self.feature_names, metrics=metrics,
+                                        data_hash=dataset_hash(data_path), promote=promote,
+                                        data_path=data_path, train_seconds=train_seconds,
+                                        search=search_report, **fit_info)
+        print(f"Model saved successfully as {version}!")
+        
+        if promote and self.predictor.pinned_version is None:
+            self.predictor._swap_bundle(model, label_encoder, uncertainty=fit_info['uncertainty'],
+                              source='train', model_version=version,
+                              model_family=self.predictor.registry.manifest(version)['model_type'],
+                              data_path=data_path, trained_at=time.time(),
+                              train_seconds=train_seconds, metrics=metrics)
+        return True
+    
+    def _read_frame(self, data_path):
+        """The whole dataset as a DataFrame, from a CSV or a columnar store"""
+        if is_columnar_store(data_path):
+            return load_columnar(data_path).to_dataframe()
+        return pd.read_csv(data_path)
+    
+    def _fit_in_memory(self, data_path, model=None):
+        """Fit `model` (default LinearRegression) with a stratified 80/20 split"""
+        df = self._read_frame(data_path)
+        print(f"Loaded dataset with {len(df)} samples")
+        
+        # Encode categorical variables
+        label_encoder = LabelEncoder()
+        df['crop_type_encoded'] = label_encoder.fit_transform(df['crop_type'].astype(str))
+        
+        # Prepare features and target
+        X = df[self.feature_names]
+        y = df['yield']
+        
+        # Split data
+        X_train, X_test, y_train, y_test = train_test_split(
+            X, y, test_size=0.2, random_state=42, stratify=df['crop_type']
+        )
+        
+        # Train model
+        model = model or LinearRegression()
+        model.fit(X_train, y_train)
+        
+        # Evaluate
+        y_pred = model.predict(X_test)
+        fit_info = {
+            'uncertainty': estimate_uncertainty(model, X_train.to_numpy(), y_train.to_numpy(),
+                                                X_test.to_numpy(), y_test.to_numpy()),
+            'normal_equations': fit_statistics(model, X_train.to_numpy(), y_train.to_numpy()),
+            'holdout': {'method': 'stratified', 'test_size': 0.2, 'random_state': 42, 'rows': len(df)}
+        }
+        return model, label_encoder, mean_squared_error(y_test, y_pred), r2_score(y_test, y_pred), fit_info
+    
+    def _fit_search(self, data_path, **search_options):
+        """Pick a model family by parallel k-fold CV, then refit it on everything
+        
+        Returns (model, label_encoder, mse, r2, fit_info, report); the
+        metrics are the winner's cross-validated means.
+        """
+        df = self._read_frame(data_path)
+        print(f"Loaded dataset with {len(df)} samples")
+        
+        label_encoder = LabelEncoder()
+        df['crop_type_encoded'] = label_encoder.fit_transform(df['crop_type'].astype(str))
+        X = df[self.feature_names].to_numpy(dtype=np.float64)
+        y = df['yield'].to_numpy(dtype=np.float64)
+        
+        winner, results = search_models(X, y, label_encoder, **search_options)
+        print_results(results, winner)
+        
+        best = next(result for result in results if result['name'] == winner)
+        print(f"Refitting {winner} on all {len(y)} samples...")
+        model = CANDIDATES[winner]().fit(X, y)
+        
+        uncertainty = estimate_uncertainty(model, X, y)
+        if uncertainty is None:
+            # Residual quantiles need rows the model hasn't seen: fit a copy on 80%
+            train, test = train_test_split(np.arange(len(y)), test_size=0.2, random_state=42,
+                                           stratify=X[:, 0])
+            holdout_model = CANDIDATES[winner]().fit(X[train], y[train])
+            uncertainty = estimate_uncertainty(holdout_model, X[train], y[train], X[test], y[test])
+        fit_info = {'uncertainty': uncertainty, 'normal_equations': fit_statistics(model, X, y), 'holdout': None}
+        return model, label_encoder, best['mse'], best['r2'], fit_info, {'winner': winner, 'results': results}
+    
+    def _fit_streaming(self, data_path, chunksize):
+        """Fit by streaming the CSV `chunksize` rows at a time"""
+        # The crop vocabulary has to be fixed before the first chunk arrives
+        label_encoder = LabelEncoder().fit(self.crop_types)
+        numeric = self.feature_names[1:]
+        dtypes = {name: np.float32 for name in numeric + ['yield']}
+        dtypes['crop_type'] = str
+        
+        def chunks():
+            skipped = 0
+            for chunk in pd.read_csv(data_path, usecols=list(dtypes), dtype=dtypes, chunksize=chunksize):
+                crops = chunk['crop_type'].str.lower()
+                known = crops.isin(label_encoder.classes_).to_numpy()
+                skipped += int((~known).sum())
+                
+                X = np.column_stack([label_encoder.transform(crops[known])]
+                                    + [chunk[name].to_numpy()[known] for name in numeric])
+                yield X, chunk['yield'].to_numpy()[known]
+            if skipped:
+                print(f"Skipped {skipped} rows with unknown crop types")
+        
+        model, mse, r2, fit_info = self._fit_normal_equations(chunks())
+        return model, label_encoder, mse, r2, fit_info
+    
+    def _fit_columnar(self, store_path, chunksize=1_000_000):
+        """Fit on a memory-mapped columnar store without parsing any text"""
+        dataset = load_columnar(store_path)
+        label_encoder = LabelEncoder().fit(dataset.crops)
+        numeric = self.feature_names[1:]
+        
+        def chunks():
+            for chunk in dataset.iter_chunks(chunksize):
+                # Only this chunk's feature matrix is materialized
+                X = np.column_stack([chunk['crop_code']] + [chunk[name] for name in numeric])
+                yield X, chunk['yield']
+        
+        model, mse, r2, fit_info = self._fit_normal_equations(chunks())
+        return model, label_encoder, mse, r2, fit_info
+    
+    def _fit_normal_equations(self, chunks, test_size=0.2, random_state=42):
+        """Fit a LinearRegression from (X, y) chunks via the normal equations.
+        
+        Each row is assigned to the hold-out set with probability
+        `test_size`; the hold-out set is also kept as sufficient statistics,
+        so MSE and R² are exact without a second pass or buffered rows.
+        Returns (model, mse, r2, fit_info).
+        """
+        rng = np.random.default_rng(random_state)
+        train = NormalEquations(len(self.feature_names))
+        test = NormalEquations(len(self.feature_names))
+        
+        for X, y in chunks:
+            is_test = rng.random(len(y)) < test_size
+            train.update(X[~is_test], y[~is_test])
+            test.update(X[is_test], y[is_test])
+        
+        print(f"Streamed dataset with {train.n + test.n} samples")
+        
+        # Train model
+        intercept, coef = train.solve()
+        model = LinearRegression()
+        model.coef_ = coef
+        model.intercept_ = intercept
+        model.n_features_in_ = len(self.feature_names)
+        model.feature_names_in_ = np.array(self.feature_names, dtype=object)
+        
+        # Evaluate
+        fit_info = {'uncertainty': linear_from_stats(train, intercept, coef),
+                    'normal_equations': linear_statistics(train),
+                    'holdout': {'method': 'bernoulli', 'test_size': test_size, 'random_state': random_state,
+                                'rows': int(train.n + test.n)}}
+        if not test.n:
+            return model, float('nan'), float('nan'), fit_info
+        return model, test.sse(intercept, coef) / test.n, test.r2(intercept, coef), fit_info
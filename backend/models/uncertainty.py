@@ -0,0 +1,169 @@
+"""Prediction intervals for served models.
+
+The interval inputs are estimated when a model is trained and stored in
+its registry manifest under 'uncertainty'. There are three methods:
+
+    linear               residual variance σ² and (XᵀX)⁻¹ of the training
+                         design; var(y - ŷ) = σ²(1 + xᵀ(XᵀX)⁻¹x)
+    per_crop_linear      the same per crop, stacked into (n_crops, p, p)
+    residual_quantiles   quantiles of hold-out residuals per hectare, for
+                         models without a closed form (trees, pipelines)
+
+At serving time the quadratic forms are evaluated for a whole batch at
+once: (D @ V * D).sum(axis=1) for design rows D, grouped by crop for the
+per-crop models. No matrix is inverted per row. NumPy-only, like the
+rest of the inference core.
+"""
+from functools import lru_cache
+from statistics import NormalDist
+import numpy as np
+from models.inference import is_linear_model
+from models.per_crop import PerCropLinearRegression
+
+# Residual quantiles stored for models without a closed form
+QUANTILE_GRID = np.linspace(0, 1, 201)
+
+
+def _design(X):
+    return np.column_stack([np.ones(len(X)), X])
+
+
+def _variance(design, y, beta):
+    """((DᵀD)⁻¹, σ²) of a least-squares fit over `design`"""
+    residuals = y - design @ beta
+    dof = max(len(y) - design.shape[1], 1)
+    return np.linalg.pinv(design.T @ design), float(residuals @ residuals) / dof
+
+
+def linear_from_stats(stats, intercept, coef):
+    """Linear-model uncertainty straight from NormalEquations statistics"""
+    dof = max(stats.n - len(stats.xty), 1)
+    return {'method': 'linear', 'xtx_inv': np.linalg.pinv(stats.xtx).tolist(),
+            'sigma2': stats.sse(intercept, coef) / dof}
+
+
+def estimate_uncertainty(model, X, y, X_holdout=None, y_holdout=None):
+    """Interval inputs for `model`, fit on (X, y), as a JSON-able dict
+
+    Linear and per-crop models use their training rows; other models need
+    a hold-out set the model hasn't seen and return None without one.
+    """
+    X = np.asarray(X, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+
+    if is_linear_model(model):
+        beta = np.concatenate([np.ravel(model.intercept_)[:1], model.coef_])
+        xtx_inv, sigma2 = _variance(_design(X), y, beta)
+        return {'method': 'linear', 'xtx_inv': xtx_inv.tolist(), 'sigma2': sigma2}
+
+    if isinstance(model, PerCropLinearRegression):
+        features, area = model._design(X)
+        if area is not None:
+            y = np.divide(y, area, out=np.zeros_like(y), where=area > 0)
+        codes = X[:, 0].astype(np.intp)
+        design = _design(features)
+        betas = np.column_stack([model.intercept_, model.coef_])
+
+        # Crops without enough rows of their own share the pooled estimate
+        pooled_inv, pooled_sigma2 = _variance(design, y, np.linalg.lstsq(design, y, rcond=None)[0])
+        xtx_inv = np.tile(pooled_inv, (len(betas), 1, 1))
+        sigma2 = np.full(len(betas), pooled_sigma2)
+        for code in np.unique(codes):
+            rows = codes == code
+            if rows.sum() > design.shape[1]:
+                xtx_inv[code], sigma2[code] = _variance(design[rows], y[rows], betas[code])
+        return {'method': 'per_crop_linear', 'xtx_inv': xtx_inv.tolist(), 'sigma2': sigma2.tolist(),
+                'per_hectare': bool(model.per_hectare)}
+
+    if X_holdout is None or not len(X_holdout):
+        return None
+    X_holdout = np.asarray(X_holdout, dtype=np.float64)
+    area = X_holdout[:, -1]
+    residuals = (np.asarray(y_holdout, dtype=np.float64) - np.maximum(model.predict(X_holdout), 0))[area > 0]
+    return {'method': 'residual_quantiles',
+            'quantiles': np.quantile(residuals / area[area > 0], QUANTILE_GRID).tolist()}
+
+
+@lru_cache(maxsize=64)
+def _z(level):
+    return NormalDist().inv_cdf((1 + level) / 2)
+
+
+def z_scores(level):
+    """Two-sided normal quantile for one coverage level or an array of them"""
+    if np.ndim(level) == 0:
+        return _z(float(level))
+    unique, inverse = np.unique(np.asarray(level, dtype=np.float64), return_inverse=True)
+    return np.array([_z(float(l)) for l in unique])[inverse]
+
+
+def _clipped(lower, upper):
+    # Bounds are clipped at zero like the predictions they surround
+    return np.maximum(lower, 0), np.maximum(upper, 0)
+
+
+class LinearIntervals:
+    __slots__ = ('xtx_inv', 'sigma2')
+
+    def __init__(self, xtx_inv, sigma2):
+        self.xtx_inv = np.asarray(xtx_inv, dtype=np.float64)
+        self.sigma2 = float(sigma2)
+
+    def bounds(self, features, predictions, level):
+        """(lower, upper) prediction-interval bounds for a batch
+
+        `predictions` are the served predictions of the (n, 7) `features`;
+        `level` is the coverage, one value or one per row.
+        """
+        design = _design(features)
+        leverage = (design @ self.xtx_inv * design).sum(axis=1)
+        width = z_scores(level) * np.sqrt(self.sigma2 * (1 + leverage))
+        return _clipped(predictions - width, predictions + width)
+
+
+class PerCropIntervals:
+    __slots__ = ('xtx_inv', 'sigma2', 'per_hectare')
+
+    def __init__(self, xtx_inv, sigma2, per_hectare):
+        self.xtx_inv = np.asarray(xtx_inv, dtype=np.float64)
+        self.sigma2 = np.asarray(sigma2, dtype=np.float64)
+        self.per_hectare = per_hectare
+
+    def bounds(self, features, predictions, level):
+        codes = np.clip(features[:, 0].astype(np.intp), 0, len(self.sigma2) - 1)
+        design = _design(features[:, 1:-1] if self.per_hectare else features[:, 1:])
+        variance = np.empty(len(features))
+        for code in np.unique(codes):
+            rows = codes == code
+            leverage = (design[rows] @ self.xtx_inv[code] * design[rows]).sum(axis=1)
+            variance[rows] = self.sigma2[code] * (1 + leverage)
+        width = z_scores(level) * np.sqrt(variance)
+        if self.per_hectare:
+            width = width * features[:, -1]
+        return _clipped(predictions - width, predictions + width)
+
+
+class ResidualIntervals:
+    __slots__ = ('quantiles',)
+
+    def __init__(self, quantiles):
+        self.quantiles = np.asarray(quantiles, dtype=np.float64)
+
+    def bounds(self, features, predictions, level):
+        area = features[:, -1]
+        tail = (1 - np.asarray(level, dtype=np.float64)) / 2
+        return _clipped(predictions + area * np.interp(tail, QUANTILE_GRID, self.quantiles),
+                        predictions + area * np.interp(1 - tail, QUANTILE_GRID, self.quantiles))
+
+
+def compile_intervals(spec):
+    """Interval calculator for a manifest's 'uncertainty' entry, or None"""
+    if not spec:
+        return None
+    if spec['method'] == 'linear':
+        return LinearIntervals(spec['xtx_inv'], spec['sigma2'])
+    if spec['method'] == 'per_crop_linear':
+        return PerCropIntervals(spec['xtx_inv'], spec['sigma2'], spec['per_hectare'])
+    if spec['method'] == 'residual_quantiles':
+        return ResidualIntervals(spec['quantiles'])
+    raise ValueError(f"Unknown uncertainty method: {spec['method']}")
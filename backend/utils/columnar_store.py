@@ -0,0 +1,161 @@
+"""Compact columnar store for the processed training data.
+
+A store is a directory holding one raw little-endian binary file per
+column plus a meta.json describing them:
+
+    clean_crop_data/
+        meta.json        row count, column dtypes, crop vocabulary
+        crop_code.bin    uint8 index into the sorted crop vocabulary
+        temperature.bin  float32
+        ...
+        yield.bin        float32
+
+Columns are opened with np.memmap, so loading a multi-GB store is
+instant and rows are only paged in when they are read. CSV remains the
+import/export format (csv_to_columnar / columnar_to_csv).
+"""
+import json
+import os
+import numpy as np
+import pandas as pd
+
+FORMAT_VERSION = 1
+NUMERIC_COLUMNS = ['temperature', 'rainfall', 'humidity', 'soil_ph', 'fertilizer', 'area', 'yield']
+COLUMN_DTYPES = dict({'crop_code': '<u1'}, **{name: '<f4' for name in NUMERIC_COLUMNS})
+
+
+def is_columnar_store(path):
+    """True if `path` is a directory written by save_columnar"""
+    return os.path.isfile(os.path.join(path, 'meta.json'))
+
+
+class ColumnarDataset:
+    """Read-only, memory-mapped view of a columnar store"""
+
+    def __init__(self, path):
+        with open(os.path.join(path, 'meta.json')) as f:
+            meta = json.load(f)
+        if meta.get('version') != FORMAT_VERSION:
+            raise ValueError(f"Unsupported columnar store version: {meta.get('version')}")
+
+        self.path = path
+        self.n_rows = meta['n_rows']
+        self.crops = meta['crops']
+        self.columns = {}
+        for name, dtype in meta['columns'].items():
+            column_path = os.path.join(path, f'{name}.bin')
+            if self.n_rows:
+                self.columns[name] = np.memmap(column_path, dtype=dtype, mode='r', shape=(self.n_rows,))
+            else:
+                self.columns[name] = np.empty(0, dtype=dtype)
+
+    def __len__(self):
+        return self.n_rows
+
+    def __getitem__(self, name):
+        return self.columns[name]
+
+    def iter_chunks(self, chunksize=1_000_000):
+        """Yield dicts of column slices (views, not copies) of `chunksize` rows"""
+        for start in range(0, self.n_rows, chunksize):
+            yield {name: column[start:start + chunksize] for name, column in self.columns.items()}
+
+    def to_dataframe(self, start=0, stop=None):
+        """Materialize rows [start, stop) as a DataFrame with crop names"""
+        chunk = {name: np.asarray(column[start:stop]) for name, column in self.columns.items()}
+        crop_type = pd.Categorical.from_codes(chunk.pop('crop_code'), self.crops)
+        return pd.DataFrame(dict({'crop_type': crop_type}, **chunk))
+
+
+class ColumnarWriter:
+    """Append DataFrame chunks to a new columnar store"""
+
+    def __init__(self, path, crops):
+        if list(crops) != sorted(crops):
+            # Codes must line up with LabelEncoder, which sorts its classes
+            raise ValueError("Crop vocabulary must be sorted")
+        if len(crops) > 255:
+            raise ValueError("At most 255 crops fit in a uint8 code")
+
+        self.path = path
+        self.crops = list(crops)
+        self.n_rows = 0
+        self.skipped = 0
+        os.makedirs(path, exist_ok=True)
+
+        # A stale meta.json would describe the wrong files while we write
+        if is_columnar_store(path):
+            os.remove(os.path.join(path, 'meta.json'))
+        self._files = {name: open(os.path.join(path, f'{name}.bin'), 'wb') for name in COLUMN_DTYPES}
+
+    def append(self, df):
+        """Write a chunk; rows whose crop is not in the vocabulary are skipped"""
+        codes = pd.Categorical(df['crop_type'].astype(str).str.lower(), categories=self.crops).codes
+        known = codes >= 0
+        self.skipped += int((~known).sum())
+
+        self._files['crop_code'].write(codes[known].astype(COLUMN_DTYPES['crop_code']).tobytes())
+        for name in NUMERIC_COLUMNS:
+            values = df[name].to_numpy(dtype=np.float64)[known]
+            self._files[name].write(values.astype(COLUMN_DTYPES[name]).tobytes())
+        self.n_rows += int(known.sum())
+
+    def close(self):
+        """Flush the columns and write meta.json last, marking the store complete"""
+        for f in self._files.values():
+            f.close()
+
+        meta = {
+            'version': FORMAT_VERSION,
+            'n_rows': self.n_rows,
+            'crops': self.crops,
+            'columns': COLUMN_DTYPES
+        }
+        with open(os.path.join(self.path, 'meta.json'), 'w') as f:
+            json.dump(meta, f, indent=2)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            for f in self._files.values():
+                f.close()
+
+
+def save_columnar(df, path, crops=None):
+    """Write a DataFrame with crop_type and the numeric columns to a store"""
+    if crops is None:
+        crops = sorted(df['crop_type'].astype(str).str.lower().unique())
+    with ColumnarWriter(path, crops) as writer:
+        writer.append(df)
+    return path
+
+
+def load_columnar(path):
+    """Open a store written by save_columnar; no data is read yet"""
+    return ColumnarDataset(path)
+
+
+def csv_to_columnar(csv_path, path, crops, chunksize=1_000_000):
+    """Import a CSV into a store chunk by chunk (bounded memory)"""
+    dtypes = {name: np.float32 for name in NUMERIC_COLUMNS}
+    dtypes['crop_type'] = str
+    with ColumnarWriter(path, sorted(crops)) as writer:
+        for chunk in pd.read_csv(csv_path, usecols=list(dtypes), dtype=dtypes, chunksize=chunksize):
+            writer.append(chunk)
+    if writer.skipped:
+        print(f"Skipped {writer.skipped} rows with unknown crop types")
+    return path
+
+
+def columnar_to_csv(path, csv_path, chunksize=1_000_000):
+    """Export a store back to CSV chunk by chunk"""
+    dataset = load_columnar(path)
+    with open(csv_path, 'w', newline='') as f:
+        for i, start in enumerate(range(0, max(len(dataset), 1), chunksize)):
+            dataset.to_dataframe(start, start + chunksize).to_csv(
+                f, index=False, header=(i == 0), float_format='%.6g')
+    return csv_path
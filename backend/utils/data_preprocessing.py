@@ -0,0 +1,115 @@
+"""Data cleaning stages for the crop training data.
+
+Outliers are judged against per-crop statistics (a yield that is normal
+for tomato is an outlier for barley), and every rule is evaluated on the
+same rows in one pass, so the result doesn't depend on column order. The
+same filter runs out-of-core: compute_group_stats() makes one pass over
+the chunks, then outlier_mask() is applied to each chunk in a second pass.
+"""
+import numpy as np
+import pandas as pd
+
+OUTLIER_COLUMNS = ['temperature', 'rainfall', 'humidity', 'fertilizer', 'yield']
+
+
+def compute_group_stats(chunks, columns=OUTLIER_COLUMNS, group_col='crop_type'):
+    """Per-group mean and sample std of `columns` over an iterable of chunks
+
+    Only count, sum and sum of squares are kept per group, so memory does
+    not grow with the number of rows. Returns {'mean': df, 'std': df}
+    indexed by group.
+    """
+    count = total = total_sq = None
+    for chunk in chunks:
+        values = chunk[columns].astype(np.float64)
+        groups = chunk[group_col].astype(str)
+        grouped = values.groupby(groups)
+        parts = (grouped.count(), grouped.sum(), (values ** 2).groupby(groups).sum())
+        if count is None:
+            count, total, total_sq = parts
+        else:
+            count = count.add(parts[0], fill_value=0)
+            total = total.add(parts[1], fill_value=0)
+            total_sq = total_sq.add(parts[2], fill_value=0)
+
+    if count is None:
+        empty = pd.DataFrame(columns=columns, dtype=np.float64)
+        return {'mean': empty, 'std': empty}
+
+    mean = total / count
+    variance = (total_sq - count * mean ** 2) / (count - 1)
+    return {'mean': mean, 'std': np.sqrt(variance.clip(lower=0))}
+
+
+def outlier_mask(df, columns=OUTLIER_COLUMNS, n_std=3.0, group_col='crop_type', stats=None):
+    """Flag rows beyond `n_std` standard deviations of their group's mean
+
+    With `stats` (from compute_group_stats) the precomputed statistics are
+    used; otherwise they come from `df` itself via groupby-transform.
+    Returns (keep, dropped) where `keep` is a boolean array and `dropped`
+    maps each column to the number of rows that column's rule flagged.
+    """
+    values = df[columns].astype(np.float64)
+    groups = df[group_col].astype(str)
+
+    if stats is None:
+        grouped = values.groupby(groups)
+        mean = grouped.transform('mean')
+        std = grouped.transform('std')
+    else:
+        mean = stats['mean'].reindex(groups.to_numpy()).set_axis(df.index)
+        std = stats['std'].reindex(groups.to_numpy()).set_axis(df.index)
+
+    # NaN stats (single-row groups, unseen groups) never flag a row
+    flagged = (values - mean[columns]).abs().to_numpy() > n_std * std[columns].to_numpy()
+    dropped = dict(zip(columns, flagged.sum(axis=0).tolist()))
+    return ~flagged.any(axis=1), dropped
+
+
+def remove_outliers(df, columns=OUTLIER_COLUMNS, n_std=3.0, group_col='crop_type'):
+    """Return (clean_df, report) with per-group outliers removed"""
+    keep, dropped = outlier_mask(df, columns, n_std, group_col)
+    clean = df[keep]
+    return clean, _make_report(len(df), len(clean), dropped)
+
+
+def clean_csv_chunked(src_path, dst_path, chunksize=1_000_000, columns=OUTLIER_COLUMNS,
+                      n_std=3.0, group_col='crop_type'):
+    """Remove outliers from a CSV too large for memory
+
+    The first pass collects per-group statistics, the second filters each
+    chunk and appends it to `dst_path`. Returns the same report as
+    remove_outliers.
+    """
+    stats = compute_group_stats(pd.read_csv(src_path, chunksize=chunksize), columns, group_col)
+
+    rows_in = rows_out = 0
+    dropped = dict.fromkeys(columns, 0)
+    with open(dst_path, 'w', newline='') as f:
+        for i, chunk in enumerate(pd.read_csv(src_path, chunksize=chunksize)):
+            keep, chunk_dropped = outlier_mask(chunk, columns, n_std, group_col, stats)
+            chunk[keep].to_csv(f, index=False, header=(i == 0))
+            rows_in += len(chunk)
+            rows_out += int(keep.sum())
+            for column, count in chunk_dropped.items():
+                dropped[column] += count
+
+    return _make_report(rows_in, rows_out, dropped)
+
+
+def _make_report(rows_in, rows_out, dropped):
+    """Summary of a cleaning run; a row can be flagged by several rules"""
+    return {
+        'rows_in': rows_in,
+        'rows_out': rows_out,
+        'dropped_total': rows_in - rows_out,
+        'dropped_by_rule': dropped
+    }
+
+
+def print_report(report):
+    """Print a cleaning report in the style of the data scripts"""
+    print(f"Outlier removal: kept {report['rows_out']} of {report['rows_in']} rows "
+          f"({report['dropped_total']} dropped)")
+    for column, count in report['dropped_by_rule'].items():
+        print(f"  {column}: {count} rows beyond range")
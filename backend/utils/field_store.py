@@ -0,0 +1,199 @@
+"""SQLite field registry with a spatial grid index.
+
+Registered fields (crop, region, location, area, planned fertilizer rate)
+live in one table. The weather and soil feeds add dated observations per
+field:
+
+    fields   field_id, crop_type, region, latitude, longitude,
+             cell_y, cell_x, area, fertilizer, revision
+    weather  field_id, observed_on, temperature, rainfall, humidity
+    soil     field_id, observed_on, soil_ph
+
+Each field is assigned to a square grid cell `cell_degrees` on a side. A
+bounding-box query first narrows to the cells the box overlaps through
+the (cell_y, cell_x) index, then tests exact coordinates. The latest
+observation on or before a date is one primary-key probe per field.
+
+Every write stamps the affected fields with a new store-wide `revision`.
+A reader that remembers revisions can tell which fields changed since
+it last looked without reading their inputs again (see
+models/region_forecast.py).
+"""
+import json
+import math
+import os
+import sqlite3
+import threading
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value);
+CREATE TABLE IF NOT EXISTS fields (
+    field_id TEXT PRIMARY KEY,
+    crop_type TEXT NOT NULL,
+    region TEXT NOT NULL,
+    latitude REAL NOT NULL,
+    longitude REAL NOT NULL,
+    cell_y INTEGER NOT NULL,
+    cell_x INTEGER NOT NULL,
+    area REAL NOT NULL,
+    fertilizer REAL NOT NULL,
+    revision INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS fields_cell ON fields (cell_y, cell_x);
+CREATE TABLE IF NOT EXISTS weather (
+    field_id TEXT NOT NULL,
+    observed_on TEXT NOT NULL,
+    temperature REAL NOT NULL,
+    rainfall REAL NOT NULL,
+    humidity REAL NOT NULL,
+    PRIMARY KEY (field_id, observed_on)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS soil (
+    field_id TEXT NOT NULL,
+    observed_on TEXT NOT NULL,
+    soil_ph REAL NOT NULL,
+    PRIMARY KEY (field_id, observed_on)
+) WITHOUT ROWID;
+'''
+
+# Columns of latest_inputs(), in the order predict_batch() reads them
+INPUT_COLUMNS = ('field_id', 'crop_type', 'region', 'temperature', 'rainfall', 'humidity',
+                 'soil_ph', 'fertilizer', 'area')
+
+# ISO dates compare correctly as text; this one is after any real date
+LATEST = '9999-12-31'
+
+
+class FieldStore:
+    def __init__(self, path, cell_degrees=0.1):
+        self.path = path
+        self.cell_degrees = cell_degrees
+        # One connection per thread; WAL lets readers run during writes.
+        # The file is only created on first use, not when the app imports
+        self._local = threading.local()
+        self._initialized = False
+        self._init_lock = threading.Lock()
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            with self._init_lock:
+                if not self._initialized:
+                    self._initialize()
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def _initialize(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with sqlite3.connect(self.path, timeout=30) as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.executescript(SCHEMA)
+            conn.execute("INSERT OR IGNORE INTO meta VALUES ('revision', 0)")
+            # The index is built for one cell size, so an existing store keeps its own
+            conn.execute("INSERT OR IGNORE INTO meta VALUES ('cell_degrees', ?)", (self.cell_degrees,))
+            self.cell_degrees = conn.execute("SELECT value FROM meta WHERE key = 'cell_degrees'").fetchone()[0]
+        conn.close()
+        self._initialized = True
+
+    def _cell(self, degrees):
+        return math.floor(degrees / self.cell_degrees)
+
+    def _next_revision(self, conn):
+        # fetchall() finishes the statement so the transaction can commit
+        return conn.execute("UPDATE meta SET value = value + 1 WHERE key = 'revision' "
+                            "RETURNING value").fetchall()[0][0]
+
+    def revision(self):
+        """The store-wide revision; it grows with every write"""
+        return self._connection().execute("SELECT value FROM meta WHERE key = 'revision'").fetchone()[0]
+
+    def upsert_fields(self, records):
+        """Register fields, or update the ones already registered; returns the revision"""
+        with self._connection() as conn:
+            revision = self._next_revision(conn)
+            conn.executemany('''
+                INSERT INTO fields VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (field_id) DO UPDATE SET
+                    crop_type = excluded.crop_type, region = excluded.region,
+                    latitude = excluded.latitude, longitude = excluded.longitude,
+                    cell_y = excluded.cell_y, cell_x = excluded.cell_x, area = excluded.area,
+                    fertilizer = excluded.fertilizer, revision = excluded.revision
+            ''', [(str(r['field_id']), r['crop_type'].lower(), str(r.get('region', '')),
+                   r['latitude'], r['longitude'], self._cell(r['latitude']), self._cell(r['longitude']),
+                   r['area'], r['fertilizer'], revision) for r in records])
+        return revision
+
+    def add_observations(self, weather=(), soil=()):
+        """Record dated weather and soil observations; returns the revision
+
+        An observation for a date that already has one replaces it.
+        Observations may arrive before their field is registered.
+        """
+        with self._connection() as conn:
+            revision = self._next_revision(conn)
+            conn.executemany('INSERT OR REPLACE INTO weather VALUES (?, ?, ?, ?, ?)',
+                             [(str(r['field_id']), r['date'], r['temperature'], r['rainfall'], r['humidity'])
+                              for r in weather])
+            conn.executemany('INSERT OR REPLACE INTO soil VALUES (?, ?, ?)',
+                             [(str(r['field_id']), r['date'], r['soil_ph']) for r in soil])
+            field_ids = sorted({str(r['field_id']) for r in weather} | {str(r['field_id']) for r in soil})
+            conn.execute('UPDATE fields SET revision = ? WHERE field_id IN (SELECT value FROM json_each(?))',
+                         (revision, json.dumps(field_ids)))
+        return revision
+
+    def select(self, bbox, crops=None, limit=None):
+        """(field_id, revision) of the fields inside `bbox`
+
+        `bbox` is (min_longitude, min_latitude, max_longitude,
+        max_latitude); `crops` optionally restricts the crop types and
+        `limit` the number of rows returned.
+        """
+        conn = self._connection()
+        min_lon, min_lat, max_lon, max_lat = bbox
+        query = '''
+            SELECT field_id, revision FROM fields
+            WHERE cell_y BETWEEN ? AND ? AND cell_x BETWEEN ? AND ?
+              AND latitude BETWEEN ? AND ? AND longitude BETWEEN ? AND ?
+        '''
+        params = [self._cell(min_lat), self._cell(max_lat), self._cell(min_lon), self._cell(max_lon),
+                  min_lat, max_lat, min_lon, max_lon]
+        if crops:
+            query += ' AND crop_type IN (SELECT value FROM json_each(?))'
+            params.append(json.dumps([crop.lower() for crop in crops]))
+        if limit is not None:
+            query += ' LIMIT ?'
+            params.append(limit)
+        return conn.execute(query, params).fetchall()
+
+    def latest_inputs(self, field_ids, as_of=None):
+        """Model inputs of `field_ids` from their latest observations on or before `as_of`
+
+        Returns a dict mapping INPUT_COLUMNS to lists. Fields without both
+        a weather and a soil observation by then are left out.
+        """
+        rows = self._connection().execute('''
+            SELECT f.field_id, f.crop_type, f.region, w.temperature, w.rainfall, w.humidity,
+                   s.soil_ph, f.fertilizer, f.area
+            FROM json_each(?) AS ids
+            JOIN fields f ON f.field_id = ids.value
+            JOIN weather w ON w.field_id = f.field_id AND w.observed_on = (
+                SELECT MAX(observed_on) FROM weather WHERE field_id = f.field_id AND observed_on <= ?)
+            JOIN soil s ON s.field_id = f.field_id AND s.observed_on = (
+                SELECT MAX(observed_on) FROM soil WHERE field_id = f.field_id AND observed_on <= ?)
+        ''', (json.dumps(list(field_ids)), as_of or LATEST, as_of or LATEST)).fetchall()
+        columns = list(zip(*rows)) if rows else [()] * len(INPUT_COLUMNS)
+        return {name: list(values) for name, values in zip(INPUT_COLUMNS, columns)}
+
+    def stats(self):
+        conn = self._connection()
+        return {
+            'fields': conn.execute('SELECT COUNT(*) FROM fields').fetchone()[0],
+            'weather_observations': conn.execute('SELECT COUNT(*) FROM weather').fetchone()[0],
+            'soil_observations': conn.execute('SELECT COUNT(*) FROM soil').fetchone()[0],
+            'revision': self.revision(),
+            'cell_degrees': self.cell_degrees
+        }
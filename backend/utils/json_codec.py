@@ -0,0 +1,95 @@
+"""Optional fast JSON codec for request parsing and responses.
+
+Uses orjson or msgspec when installed and falls back to the standard
+library otherwise, so neither is a hard dependency. FastJSONProvider
+plugs the codec into Flask, so request.get_json() and jsonify() both use
+it without touching the routes.
+"""
+import json
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgspec
+except ImportError:
+    msgspec = None
+
+
+def available_codec(preferred='auto'):
+    """Name of the codec to use: 'orjson', 'msgspec' or 'stdlib'"""
+    if preferred in ('auto', 'orjson') and orjson is not None:
+        return 'orjson'
+    if preferred in ('auto', 'msgspec') and msgspec is not None:
+        return 'msgspec'
+    return 'stdlib'
+
+
+def _stdlib_default(obj):
+    # NumPy scalars and arrays, which the stdlib encoder rejects
+    if hasattr(obj, 'tolist'):
+        return obj.tolist()
+    return DefaultJSONProvider.default(obj)
+
+
+def make_codec(name, sort_keys=False):
+    """Return (loads, dumps) where dumps produces bytes"""
+    if name == 'orjson':
+        option = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+        if sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        return orjson.loads, lambda obj: orjson.dumps(obj, default=_stdlib_default, option=option)
+
+    if name == 'msgspec':
+        encoder = msgspec.json.Encoder(enc_hook=_stdlib_default, order='sorted' if sort_keys else None)
+
+        def loads(s):
+            try:
+                return msgspec.json.decode(s)
+            except msgspec.DecodeError as e:
+                # Callers (werkzeug's get_json included) expect ValueError
+                raise ValueError(str(e)) from e
+        return loads, encoder.encode
+
+    def dumps(obj):
+        return json.dumps(obj, default=_stdlib_default, sort_keys=sort_keys,
+                          separators=(',', ':')).encode()
+    return json.loads, dumps
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """Flask JSON provider backed by make_codec()
+
+    Keys stay sorted like Flask's default provider so responses don't
+    change shape; pretty-printing in debug mode is dropped.
+    """
+    codec = 'stdlib'
+
+    def __init__(self, app):
+        super().__init__(app)
+        self._loads, self._dumps = make_codec(self.codec, sort_keys=self.sort_keys)
+
+    def loads(self, s, **kwargs):
+        return self._loads(s)
+
+    def dumps(self, obj, **kwargs):
+        return self._dumps(obj).decode()
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(self._dumps(obj) + b'\n', mimetype=self.mimetype)
+
+
+def install(app, preferred='auto'):
+    """Switch `app` to the fastest available codec; returns its name
+
+    With 'auto' and no fast codec installed, Flask's own provider is kept.
+    """
+    name = available_codec(preferred)
+    if name != 'stdlib' or preferred == 'stdlib':
+        app.json_provider_class = type('FastJSONProvider', (FastJSONProvider,), {'codec': name})
+        app.json = app.json_provider_class(app)
+    return name
@@ -0,0 +1,143 @@
+"""Low-overhead in-process metrics with Prometheus text exposition.
+
+Histograms use fixed exponential buckets: an observation is one bisect
+and two additions under a lock, and p50/p95/p99 are estimated from the
+bucket counts by linear interpolation, so nothing grows with traffic.
+"""
+import threading
+from bisect import bisect_left
+
+# 10µs .. ~42s, each bucket 1.5x the previous one
+DEFAULT_BUCKETS = tuple(1e-5 * 1.5 ** i for i in range(38))
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{key}="{value}"' for key, value in labels) + '}'
+
+
+class Counter:
+    def __init__(self):
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1.0):
+        with self._lock:
+            self.value += amount
+
+
+class Histogram:
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # last slot is +Inf
+        self.count = 0
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.count += 1
+            self.sum += value
+
+    def quantile(self, q):
+        """Estimate the q-quantile (0..1) from the bucket counts"""
+        with self._lock:
+            counts = list(self.counts)
+            total = self.count
+        if not total:
+            return 0.0
+
+        rank = q * total
+        seen = 0
+        for index, bucket_count in enumerate(counts):
+            if seen + bucket_count >= rank and bucket_count:
+                lower = self.buckets[index - 1] if index > 0 else 0.0
+                upper = self.buckets[index] if index < len(self.buckets) else self.buckets[-1]
+                return lower + (upper - lower) * (rank - seen) / bucket_count
+            seen += bucket_count
+        return self.buckets[-1]
+
+    def summary(self):
+        return {
+            'count': self.count,
+            'mean': self.sum / self.count if self.count else 0.0,
+            'p50': self.quantile(0.50),
+            'p95': self.quantile(0.95),
+            'p99': self.quantile(0.99)
+        }
+
+
+class MetricsRegistry:
+    """Named counters, histograms and gauges, each optionally labelled"""
+
+    def __init__(self, prefix='agriconnect'):
+        self.prefix = prefix
+        self._families = {}  # name -> (kind, help, {labels: metric})
+        self._gauges = {}    # name -> (help, callback returning {labels: value})
+        self._lock = threading.Lock()
+
+    def _get(self, kind, factory, name, help_text, labels):
+        key = tuple(sorted(labels.items()))
+        family = self._families.get(name)
+        if family is None or key not in family[2]:
+            with self._lock:
+                family = self._families.setdefault(name, (kind, help_text, {}))
+                family[2].setdefault(key, factory())
+        return family[2][key]
+
+    def counter(self, name, help_text='', **labels):
+        return self._get('counter', Counter, name, help_text, labels)
+
+    def histogram(self, name, help_text='', **labels):
+        return self._get('histogram', Histogram, name, help_text, labels)
+
+    def gauge(self, name, help_text, callback):
+        """Register a gauge whose values are read from `callback()` at scrape time
+
+        The callback returns a number, or a dict mapping label dicts (as
+        tuples of pairs) to numbers; None skips the gauge.
+        """
+        self._gauges[name] = (help_text, callback)
+
+    def summaries(self, name):
+        """p50/p95/p99 for every labelled histogram in a family"""
+        family = self._families.get(name)
+        if not family:
+            return {}
+        return {','.join(f'{k}={v}' for k, v in labels) or name: metric.summary()
+                for labels, metric in list(family[2].items())}
+
+    def render_prometheus(self):
+        """Prometheus text exposition format (version 0.0.4)"""
+        lines = []
+        for name, (kind, help_text, metrics) in sorted(self._families.items()):
+            full_name = f'{self.prefix}_{name}'
+            lines.append(f'# HELP {full_name} {help_text}')
+            lines.append(f'# TYPE {full_name} {kind}')
+            for labels, metric in sorted(metrics.items()):
+                if kind == 'counter':
+                    lines.append(f'{full_name}{_format_labels(labels)} {metric.value:g}')
+                    continue
+                cumulative = 0
+                for bound, bucket_count in zip(metric.buckets + (float('inf'),), metric.counts):
+                    cumulative += bucket_count
+                    le = '+Inf' if bound == float('inf') else f'{bound:.6g}'
+                    lines.append(f'{full_name}_bucket{_format_labels(labels + (("le", le),))} {cumulative}')
+                lines.append(f'{full_name}_sum{_format_labels(labels)} {metric.sum:.9g}')
+                lines.append(f'{full_name}_count{_format_labels(labels)} {metric.count}')
+
+        for name, (help_text, callback) in sorted(self._gauges.items()):
+            values = callback()
+            if values is None:
+                continue
+            full_name = f'{self.prefix}_{name}'
+            lines.append(f'# HELP {full_name} {help_text}')
+            lines.append(f'# TYPE {full_name} gauge')
+            if not isinstance(values, dict):
+                values = {(): values}
+            for labels, value in sorted(values.items()):
+                lines.append(f'{full_name}{_format_labels(labels)} {float(value):g}')
+        return '\n'.join(lines) + '\n'
@@ -0,0 +1,326 @@
+"""Evaluation harness for the persisted model.
+
+Scores a published model (see models/registry.py) on the rows it was
+held out from during training, in one vectorized pass, reports MAE/RMSE/R² overall and per crop, benchmarks
+single-row vs batch inference, model load time and memory footprint,
+and emits everything as JSON so runs can be diffed. Against a stored
+baseline report it flags accuracy or latency regressions, so a retrained
+model can be checked before it is promoted.
+
+The hold-out rows are rebuilt from the 'holdout' entry of the model's
+manifest and the training data it was hashed from, which is also the
+default dataset. Models without one
+(search winners refit on every row, online updates) are scored on every
+row and the report labels the result in-sample.
+
+Run from the backend directory:
+    python -m utils.model_evaluation --output report.json
+    python -m utils.model_evaluation --version v0004 --baseline   # gate an unpromoted version
+    python -m utils.model_evaluation --save-baseline      # accept the current model
+    python -m utils.model_evaluation --baseline            # exit 1 on regressions, 2 on errors
+"""
+import argparse
+import contextlib
+import json
+import os
+import sys
+import time
+import tracemalloc
+import numpy as np
+import pandas as pd
+from sklearn.model_selection import train_test_split
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from models.crop_model import CropYieldPredictor
+from models.registry import dataset_hash
+from utils.columnar_store import is_columnar_store, load_columnar
+
+NUMERIC_FEATURES = ['temperature', 'rainfall', 'humidity', 'soil_ph', 'fertilizer', 'area']
+
+# Largest tolerated change vs the baseline before a model is flagged
+DEFAULT_THRESHOLDS = {
+    'max_r2_drop': 0.01,              # absolute, overall and per crop
+    'max_rmse_increase': 0.05,        # relative
+    'max_latency_increase': 0.5,      # relative, single-row and batch
+    'latency_slack_us': 2.0           # absolute; sub-microsecond timings are noisy
+}
+
+
+def load_dataset(data_path):
+    """Read a CSV file or columnar store into a DataFrame"""
+    if is_columnar_store(data_path):
+        return load_columnar(data_path).to_dataframe()
+    return pd.read_csv(data_path)
+
+
+# The legacy .pkl pair was fit on the stratified 80/20 split
+LEGACY_HOLDOUT = {'method': 'stratified', 'test_size': 0.2, 'random_state': 42}
+
+
+def holdout_rows(df, holdout, crops=None):
+    """The rows of the training data that a manifest's `holdout` entry held out
+
+    'stratified' is the train_test_split of an in-memory fit; 'bernoulli'
+    replays the per-row draws of a streaming or columnar fit, over the
+    rows whose crop is in `crops` (the others were skipped).
+    """
+    if holdout['method'] == 'bernoulli' and crops is not None:
+        df = df[df['crop_type'].str.lower().isin(crops)]
+    if holdout.get('rows') not in (None, len(df)):
+        raise ValueError(f"The hold-out was drawn from {holdout['rows']} rows, not {len(df)}")
+
+    if holdout['method'] == 'stratified':
+        _, test = train_test_split(df, test_size=holdout['test_size'], random_state=holdout['random_state'],
+                                   stratify=df['crop_type'])
+        return test.reset_index(drop=True)
+    if holdout['method'] == 'bernoulli':
+        rng = np.random.default_rng(holdout['random_state'])
+        return df[rng.random(len(df)) < holdout['test_size']].reset_index(drop=True)
+    raise ValueError(f"Unknown hold-out method: {holdout['method']}")
+
+
+def select_rows(predictor, df, data_path):
+    """(rows, evaluation): the model's hold-out rows, or every row labelled 'in_sample'"""
+    version = predictor.bundle.metadata.get('model_version')
+    if version is None:
+        return holdout_rows(df, LEGACY_HOLDOUT), 'holdout'
+
+    manifest = predictor.registry.manifest(version)
+    if not manifest.get('holdout'):
+        print(f"{version} has no hold-out set; scoring every row, in-sample")
+        return df, 'in_sample'
+    if manifest.get('data_hash') != dataset_hash(data_path):
+        raise ValueError(f"{version} was trained on different data than {data_path}, so its "
+                         "hold-out rows can't be rebuilt; pass --no-holdout to score every row")
+    return holdout_rows(df, manifest['holdout'], manifest['crops']), 'holdout'
+
+
+def regression_metrics(y_true, y_pred, groups=None, n_groups=None):
+    """MAE, RMSE and R², overall or per group code in one bincount pass each
+
+    With `groups`, returns a dict of arrays indexed by group code.
+    """
+    error = y_pred - y_true
+    if groups is None:
+        groups = np.zeros(len(y_true), dtype=np.intp)
+        n_groups = 1
+
+    count = np.bincount(groups, minlength=n_groups).astype(float)
+    abs_sum = np.bincount(groups, weights=np.abs(error), minlength=n_groups)
+    sq_sum = np.bincount(groups, weights=error ** 2, minlength=n_groups)
+    y_sum = np.bincount(groups, weights=y_true, minlength=n_groups)
+    y_sq_sum = np.bincount(groups, weights=y_true ** 2, minlength=n_groups)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        total_ss = y_sq_sum - y_sum ** 2 / count
+        return {
+            'count': count.astype(int),
+            'mae': abs_sum / count,
+            'rmse': np.sqrt(sq_sum / count),
+            'r2': 1 - sq_sum / total_ss
+        }
+
+
+def _as_dict(metrics, index=0):
+    return {name: (int(values[index]) if name == 'count' else round(float(values[index]), 6))
+            for name, values in metrics.items()}
+
+
+def score_accuracy(predictor, df):
+    """Overall and per-crop metrics from a single vectorized model call"""
+    y_true = df['yield'].to_numpy(dtype=float)
+    # Scored unrounded, so metrics don't depend on the response rounding
+    features = np.column_stack([predictor._encode_crops(df['crop_type'], predictor.label_encoder)[0]]
+                               + [df[name].to_numpy(dtype=float) for name in NUMERIC_FEATURES])
+    y_pred = np.maximum(predictor.inference.predict(features), 0)
+
+    classes = [str(c) for c in predictor.label_encoder.classes_]
+    codes = features[:, 0].astype(np.intp)
+    per_crop = regression_metrics(y_true, y_pred, codes, len(classes))
+
+    accuracy = {
+        'overall': _as_dict(regression_metrics(y_true, y_pred)),
+        'per_crop': {crop: _as_dict(per_crop, i) for i, crop in enumerate(classes) if per_crop['count'][i]}
+    }
+    intervals = predictor.bundle.intervals
+    if intervals:
+        # Share of actual yields inside the nominal 90% prediction interval
+        lower, upper = intervals.bounds(features, y_pred, 0.9)
+        accuracy['interval_coverage_90'] = float(np.mean((y_true >= lower) & (y_true <= upper)))
+    return accuracy
+
+
+def measure_load(version=None, model_path=None, encoder_path=None):
+    """Load time, retained memory and on-disk size of the persisted model
+
+    Loads a registry version (default: the promoted one), or a legacy
+    pickle pair when its paths are given.
+    """
+    tracing = tracemalloc.is_tracing()
+    if not tracing:
+        tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+
+    predictor = CropYieldPredictor(cache_size=0, auto_train=False)
+    started = time.perf_counter()
+    if not predictor.load_model(model_path, encoder_path, version=version):
+        raise FileNotFoundError(f"No trained model in {predictor.model_dir}")
+    load_seconds = time.perf_counter() - started
+
+    retained, peak = tracemalloc.get_traced_memory()
+    if not tracing:
+        tracemalloc.stop()
+
+    return predictor, {
+        'load_seconds': round(load_seconds, 6),
+        'memory_bytes': retained - before,
+        'peak_memory_bytes': peak - before,
+        'artifact_bytes': predictor.bundle.metadata['artifact_bytes']
+    }
+
+
+def benchmark_inference(predictor, df, n_single=2000, repeat=5):
+    """Throughput of predict_yield() row by row vs one predict_batch() call"""
+    rows = df[['crop_type'] + NUMERIC_FEATURES].itertuples(index=False, name=None)
+    rows = list(rows)[:n_single] or [('wheat', 20.0, 500.0, 60.0, 6.5, 100.0, 10.0)]
+
+    single = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for row in rows:
+            predictor.predict_yield(*row)
+        single.append((time.perf_counter() - started) / len(rows))
+
+    batch = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        predictor.predict_batch(df)
+        batch.append((time.perf_counter() - started) / len(df))
+
+    single_seconds, batch_seconds = min(single), min(batch)
+    return {
+        'single_row_latency_us': round(single_seconds * 1e6, 3),
+        'single_row_per_second': round(1 / single_seconds),
+        'batch_row_latency_us': round(batch_seconds * 1e6, 4),
+        'batch_rows_per_second': round(1 / batch_seconds),
+        'batch_size': len(df)
+    }
+
+
+def evaluate_model(version=None, data_path=None, holdout=True, n_single=2000,
+                   model_path=None, encoder_path=None):
+    """Full report for the persisted model as a JSON-serializable dict"""
+    predictor, footprint = measure_load(version, model_path, encoder_path)
+    model_version = predictor.bundle.metadata.get('model_version')
+    if data_path is None and model_version:
+        # Score on the data the model was trained from, where its hold-out is
+        data_path = predictor.registry.manifest(model_version).get('data_path')
+        if data_path and not os.path.exists(data_path):
+            data_path = None
+    if data_path is None:
+        data_path = os.path.join(predictor.backend_dir, 'data', 'processed', 'clean_crop_data')
+        if not is_columnar_store(data_path):
+            data_path = data_path + '.csv'
+
+    df = load_dataset(data_path)
+    df['crop_type'] = df['crop_type'].astype(str)
+    evaluation = 'all_rows'
+    if holdout:
+        df, evaluation = select_rows(predictor, df, data_path)
+
+    metadata = predictor.bundle.metadata
+    return {
+        'created_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'model': {
+            'version': metadata.get('model_version'),
+            'source': metadata['source'],
+            'type': type(predictor.model).__name__,
+            'inference': type(predictor.inference).__name__
+        },
+        'dataset': {'path': data_path, 'rows': len(df), 'holdout': evaluation == 'holdout',
+                    'evaluation': evaluation},
+        'accuracy': score_accuracy(predictor, df),
+        'performance': dict(footprint, **benchmark_inference(predictor, df, n_single))
+    }
+
+
+def compare_to_baseline(report, baseline, thresholds=None):
+    """List the accuracy and latency regressions of `report` vs `baseline`"""
+    limits = dict(DEFAULT_THRESHOLDS, **(thresholds or {}))
+    regressions = []
+
+    # Hold-out metrics can't be compared with in-sample ones
+    evaluations = [scored['dataset'].get('evaluation', 'holdout' if scored['dataset']['holdout'] else 'all_rows')
+                   for scored in (report, baseline)]
+    if evaluations[0] != evaluations[1]:
+        regressions.append(f"scored on {evaluations[0]} rows, the baseline on {evaluations[1]} rows")
+
+    scopes = [('overall', report['accuracy']['overall'], baseline['accuracy']['overall'])]
+    for crop, metrics in report['accuracy']['per_crop'].items():
+        if crop in baseline['accuracy']['per_crop']:
+            scopes.append((crop, metrics, baseline['accuracy']['per_crop'][crop]))
+
+    for scope, new, old in scopes:
+        if new['r2'] < old['r2'] - limits['max_r2_drop']:
+            regressions.append(f"{scope}: R² dropped from {old['r2']:.4f} to {new['r2']:.4f}")
+        if new['rmse'] > old['rmse'] * (1 + limits['max_rmse_increase']):
+            regressions.append(f"{scope}: RMSE rose from {old['rmse']:.4f} to {new['rmse']:.4f}")
+
+    for key in ('single_row_latency_us', 'batch_row_latency_us'):
+        new, old = report['performance'][key], baseline['performance'][key]
+        if new > old * (1 + limits['max_latency_increase']) + limits['latency_slack_us']:
+            regressions.append(f"{key} rose from {old} to {new}")
+
+    return regressions
+
+
+def main(argv=None):
+    default_baseline = os.path.join(CropYieldPredictor(cache_size=0).model_dir, 'evaluation_baseline.json')
+
+    parser = argparse.ArgumentParser(description='Evaluate the persisted crop yield model')
+    parser.add_argument('--data', default=None, help='CSV file or columnar store to score on')
+    parser.add_argument('--version', default=None, help='registry version (default: the promoted one)')
+    parser.add_argument('--model', default=None, help='legacy model pickle instead of the registry')
+    parser.add_argument('--encoder', default=None, help='legacy label encoder pickle')
+    parser.add_argument('--no-holdout', action='store_true', help='score on every row of --data')
+    parser.add_argument('--single-rows', type=int, default=2000, help='rows for the single-row benchmark')
+    parser.add_argument('--output', default=None, help='write the JSON report here (default: stdout)')
+    parser.add_argument('--baseline', nargs='?', const=default_baseline, default=None,
+                        help='compare against this baseline report and exit 1 on regressions')
+    parser.add_argument('--save-baseline', nargs='?', const=default_baseline, default=None,
+                        help='store this report as the new baseline')
+    args = parser.parse_args(argv)
+
+    # Keep the model's progress prints out of a report written to stdout
+    try:
+        with contextlib.redirect_stdout(sys.stderr):
+            report = evaluate_model(args.version, args.data, not args.no_holdout, args.single_rows,
+                                    args.model, args.encoder)
+    except (ValueError, FileNotFoundError) as e:
+        print(f"Evaluation failed: {e}", file=sys.stderr)
+        return 2
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            report['regressions'] = compare_to_baseline(report, json.load(f))
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text + '\n')
+    else:
+        print(text)
+
+    if args.save_baseline:
+        with open(args.save_baseline, 'w') as f:
+            f.write(text + '\n')
+
+    if report.get('regressions'):
+        for regression in report['regressions']:
+            print(f"REGRESSION: {regression}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
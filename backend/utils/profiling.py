@@ -0,0 +1,96 @@
+"""Opt-in sampling profiler for the request path.
+
+Every `sample_rate`-th request runs under cProfile and its stats are
+merged into one aggregate; tracemalloc can be switched on alongside to
+see where request-path allocations come from. Both read their settings
+from a config mapping on every request, so they can be toggled on a
+running app without a restart.
+"""
+import cProfile
+import io
+import itertools
+import pstats
+import threading
+import tracemalloc
+
+
+class SamplingProfiler:
+    def __init__(self, config):
+        self.config = config
+        self.sampled = 0
+        self._counter = itertools.count()
+        self._stats = None
+        self._active = threading.Lock()  # one profiled request at a time
+        self._stats_lock = threading.Lock()
+
+    @property
+    def enabled(self):
+        return bool(self.config.get('PROFILER_ENABLED'))
+
+    def sync_tracemalloc(self):
+        """Start or stop tracemalloc to match the config"""
+        wanted = bool(self.config.get('PROFILER_TRACEMALLOC'))
+        if wanted and not tracemalloc.is_tracing():
+            tracemalloc.start()
+        elif not wanted and tracemalloc.is_tracing():
+            tracemalloc.stop()
+
+    def start(self):
+        """Return a running profiler if this request is sampled, else None"""
+        if not self.enabled:
+            return None
+        sample_rate = max(1, int(self.config.get('PROFILER_SAMPLE_RATE', 100)))
+        if next(self._counter) % sample_rate:
+            return None
+        if not self._active.acquire(blocking=False):
+            return None
+
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            # Another profiler (e.g. a debugger) already owns the hook
+            self._active.release()
+            return None
+        return profile
+
+    def stop(self, profile):
+        """Stop a profiler returned by start() and merge its stats"""
+        profile.disable()
+        self._active.release()
+        with self._stats_lock:
+            if self._stats is None:
+                self._stats = pstats.Stats(profile)
+            else:
+                self._stats.add(profile)
+            self.sampled += 1
+
+    def reset(self):
+        with self._stats_lock:
+            self._stats = None
+            self.sampled = 0
+
+    def report(self, limit=25):
+        """Top functions by cumulative time, plus top allocation sites"""
+        with self._stats_lock:
+            if self._stats is None:
+                profile_text = ''
+            else:
+                out = io.StringIO()
+                self._stats.stream = out
+                self._stats.sort_stats('cumulative').print_stats(limit)
+                profile_text = out.getvalue()
+
+        allocations = []
+        if tracemalloc.is_tracing():
+            snapshot = tracemalloc.take_snapshot()
+            allocations = [str(stat) for stat in snapshot.statistics('lineno')[:limit]]
+
+        return {
+            'enabled': self.enabled,
+            'sample_rate': self.config.get('PROFILER_SAMPLE_RATE'),
+            'sampled_requests': self.sampled,
+            'profile': profile_text,
+            'tracemalloc': tracemalloc.is_tracing(),
+            'top_allocations': allocations
+        }
@@ -0,0 +1,124 @@
+"""Request logging that stays off the hot path.
+
+Records are handed to a queue and written by a QueueListener thread, so
+the request thread never blocks on handler I/O. Messages use %-style
+arguments and the queue handler passes records through unformatted, so
+a payload is only turned into text on the listener thread, and only if
+the record is written at all. Request/response bodies are sampled
+(LOG_BODY_SAMPLE_RATE) and can be emitted as JSON lines (LOG_FORMAT).
+"""
+import atexit
+import json
+import logging
+import logging.handlers
+import queue
+import random
+import numpy as np
+
+# Attributes every LogRecord has; anything else came in through `extra`
+_RECORD_ATTRS = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+_handler = None
+_listener = None
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line, with `extra` fields as top-level keys"""
+
+    def format(self, record):
+        entry = {
+            'ts': round(record.created, 6),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage()
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS:
+                entry[key] = value
+        if record.exc_info:
+            entry['exc_info'] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class LazyQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that leaves formatting to the listener thread
+
+    The stock prepare() renders the message in the calling thread so the
+    record can be pickled; our queue never leaves the process, so the
+    record can travel as-is.
+    """
+
+    def prepare(self, record):
+        return record
+
+
+class BodySampler:
+    """Decide whether a request's full body gets logged"""
+
+    def __init__(self, rate):
+        self.rate = rate
+
+    def sample(self):
+        return self.rate >= 1 or (self.rate > 0 and random.random() < self.rate)
+
+
+def setup_logging(config):
+    """Configure the root logger from LOG_LEVEL, LOG_FORMAT and LOG_ASYNC"""
+    global _handler, _listener
+
+    level = getattr(logging, str(config.get('LOG_LEVEL', 'INFO')).upper(), logging.INFO)
+    stream_handler = logging.StreamHandler()
+    if config.get('LOG_FORMAT') == 'json':
+        stream_handler.setFormatter(JsonFormatter())
+    else:
+        stream_handler.setFormatter(logging.Formatter('%(levelname)s:%(name)s:%(message)s'))
+
+    root = logging.getLogger()
+    root.setLevel(level)
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+
+    if not config.get('LOG_ASYNC', True):
+        root.addHandler(stream_handler)
+        return None
+
+    _handler = LazyQueueHandler(queue.SimpleQueue())
+    root.addHandler(_handler)
+    _listener = logging.handlers.QueueListener(_handler.queue, stream_handler, respect_handler_level=True)
+    _listener.start()
+    atexit.register(stop_logging)
+    return _listener
+
+
+def restart_after_fork():
+    """Give a forked worker its own queue and listener thread
+
+    Threads don't survive fork(), so a worker forked after setup_logging()
+    would otherwise queue records that nothing ever writes.
+    """
+    global _listener
+    if _handler is None:
+        return
+    handlers = _listener.handlers
+    _handler.queue = queue.SimpleQueue()
+    _listener = logging.handlers.QueueListener(_handler.queue, *handlers, respect_handler_level=True)
+    _listener.start()
+
+
+def stop_logging():
+    """Flush queued records and stop the listener thread"""
+    global _listener
+    if _listener is not None and _listener._thread is not None:
+        _listener.stop()
+    _listener = None
+
+
+def summarize_batch(crop_types, total_yield):
+    """Summary fields for logging a batch instead of every record"""
+    crops, counts = np.unique(np.asarray(crop_types, dtype=str), return_counts=True)
+    summary = {'crops': dict(zip(crops.tolist(), counts.tolist()))}
+    if len(total_yield):
+        summary.update(total_yield_sum=round(float(total_yield.sum()), 2),
+                       total_yield_mean=round(float(total_yield.mean()), 2),
+                       total_yield_max=round(float(total_yield.max()), 2))
+    return summary
@@ -0,0 +1,267 @@
+"""Request validation compiled once from Config.
+
+InputValidator precomputes everything validate_input_data used to
+rebuild per request: the required-field tuple, the crop frozenset, the
+range bounds (as tuples for single records and as arrays for batches)
+and every error message string.
+"""
+import datetime
+import math
+import numpy as np
+
+REQUIRED_FIELDS = ('crop_type', 'temperature', 'rainfall', 'humidity', 'soil_ph', 'fertilizer', 'area')
+COORDINATE_RANGES = {'latitude': (-90, 90), 'longitude': (-180, 180)}
+
+
+def numeric_column(column, strict):
+    """Convert a column to floats, returning the values and a mask of valid entries.
+
+    JSON payloads are strict (only real numbers pass, like validate());
+    CSV payloads are text, so numeric strings are accepted there.
+    """
+    import pandas as pd  # callers already hold a DataFrame, so this is free
+    if strict and column.dtype == object:
+        is_number = column.map(lambda v: isinstance(v, (int, float))).to_numpy(dtype=bool)
+        column = column.where(is_number)
+    values = pd.to_numeric(column, errors='coerce').to_numpy(dtype=float)
+    return values, ~np.isnan(values)
+
+
+def is_iso_date(value):
+    try:
+        datetime.date.fromisoformat(value)
+        return True
+    except (TypeError, ValueError):
+        return False
+
+
+def interval_level(value):
+    """Coverage level from a request's "interval" value
+
+    A number strictly between 0 and 1 is the level; false, null, 0 or
+    "none" ask for no interval. Returns (level or None, error or None).
+    """
+    if value is None or value is False or value == 0 or value == 'none':
+        return None, None
+    if isinstance(value, str):
+        try:
+            value = float(value)
+        except ValueError:
+            pass
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or not 0 < value < 1:
+        return None, "interval must be a coverage level between 0 and 1 (exclusive), or false"
+    return float(value), None
+
+
+def grid_axis_length(spec):
+    """Number of values grid_axis_values() would build for `spec`; 1 if malformed"""
+    if isinstance(spec, dict) and 'values' in spec:
+        spec = spec['values']
+    if isinstance(spec, list):
+        return max(len(spec), 1)
+    steps = spec.get('steps') if isinstance(spec, dict) else None
+    return steps if isinstance(steps, int) and not isinstance(steps, bool) and steps > 1 else 1
+
+
+def grid_size(specs):
+    """Points in the grid over `specs`, as an exact Python int
+
+    Checked against the size limit before any axis is built, so a huge
+    "steps" is rejected without allocating it.
+    """
+    if not isinstance(specs, dict):
+        return 0
+    return math.prod(grid_axis_length(spec) for spec in specs.values())
+
+
+def grid_axis_values(spec):
+    """Values of one grid axis: {"min", "max", "steps"} or a list of values"""
+    if isinstance(spec, dict) and 'values' in spec:
+        spec = spec['values']
+    if isinstance(spec, list):
+        if not spec or not all(isinstance(v, (int, float)) and not isinstance(v, bool) for v in spec):
+            raise ValueError("values must be a non-empty list of numbers")
+        return np.array(spec, dtype=float)
+    if not isinstance(spec, dict) or not all(key in spec for key in ('min', 'max', 'steps')):
+        raise ValueError("expected {min, max, steps} or a list of values")
+    low, high, steps = spec['min'], spec['max'], spec['steps']
+    if not all(isinstance(v, (int, float)) for v in (low, high)) or not isinstance(steps, int) or steps < 1:
+        raise ValueError("min and max must be numbers and steps a positive integer")
+    if low > high:
+        raise ValueError("min must not exceed max")
+    return np.linspace(low, high, steps)
+
+
+class InputValidator:
+    def __init__(self, feature_ranges, supported_crops, required_fields=REQUIRED_FIELDS):
+        self.required_fields = tuple(required_fields)
+        self.supported_crops = frozenset(crop.lower() for crop in supported_crops)
+
+        # (field, min, max, type message, range message) in config order
+        self.range_rules = tuple(
+            (field, limits['min'], limits['max'], f"{field} must be a number",
+             f"{field} must be between {limits['min']} and {limits['max']}")
+            for field, limits in feature_ranges.items()
+        )
+        self.range_fields = tuple(rule[0] for rule in self.range_rules)
+        self.range_min = np.array([rule[1] for rule in self.range_rules], dtype=float)
+        self.range_max = np.array([rule[2] for rule in self.range_rules], dtype=float)
+
+        self.missing_messages = {field: f"Missing required field: {field}" for field in self.required_fields}
+        self.crop_message = f"Supported crops: {', '.join(supported_crops)}"
+
+    @classmethod
+    def from_config(cls, config):
+        if isinstance(config, dict):
+            return cls(config['FEATURE_RANGES'], config['SUPPORTED_CROPS'])
+        return cls(config.FEATURE_RANGES, config.SUPPORTED_CROPS)
+
+    def is_supported_crop(self, crop_type):
+        return isinstance(crop_type, str) and crop_type.lower() in self.supported_crops
+
+    def validate(self, data):
+        """Validate one record; returns a list of error messages"""
+        errors = [self.missing_messages[field] for field in self.required_fields if field not in data]
+        if errors:
+            return errors
+
+        # Validate ranges
+        for field, low, high, type_message, range_message in self.range_rules:
+            if field in data:
+                value = data[field]
+                if not isinstance(value, (int, float)):
+                    errors.append(type_message)
+                elif value < low or value > high:
+                    errors.append(range_message)
+
+        # Validate crop type
+        if not self.is_supported_crop(data.get('crop_type', '')):
+            errors.append(self.crop_message)
+
+        return errors
+
+    def validate_fields(self, data, fields):
+        """Check that each of `fields` is present, a number and within its range"""
+        errors = []
+        for field, low, high, type_message, range_message in self.range_rules:
+            if field not in fields:
+                continue
+            if field not in data:
+                errors.append(self.missing_messages.get(field, f"Missing required field: {field}"))
+            elif not isinstance(data[field], (int, float)):
+                errors.append(type_message)
+            elif data[field] < low or data[field] > high:
+                errors.append(range_message)
+        return errors
+    
+    def validate_grid(self, data):
+        """Validate a grid sweep request
+        
+        Returns (axes, errors): axes maps each swept feature to its values
+        in request order. Every feature that isn't swept must be in
+        data['fixed'] and is checked like validate() checks a record.
+        """
+        errors = []
+        if not self.is_supported_crop(data.get('crop_type', '')):
+            errors.append(self.crop_message)
+        
+        specs = data.get('axes')
+        if not isinstance(specs, dict) or not specs:
+            return {}, errors + ["axes must map at least one feature to a range"]
+        
+        rules = {rule[0]: rule for rule in self.range_rules}
+        axes = {}
+        for field, spec in specs.items():
+            if field not in rules:
+                errors.append(f"Unknown grid axis: {field}")
+                continue
+            try:
+                values = grid_axis_values(spec)
+            except ValueError as e:
+                errors.append(f"{field}: {e}")
+                continue
+            _, low, high, _, range_message = rules[field]
+            if values.min() < low or values.max() > high:
+                errors.append(range_message)
+            axes[field] = values
+        
+        fixed = data.get('fixed')
+        if fixed is not None and not isinstance(fixed, dict):
+            errors.append("fixed must be an object mapping features to values")
+        if not isinstance(fixed, dict):
+            fixed = {}
+        errors += self.validate_fields(fixed, [field for field in self.range_fields if field not in specs])
+        return axes, errors
+    
+    def validate_records(self, records, fields):
+        """Validate field registry and feed records
+        
+        Every record needs a field_id. Feature `fields` are checked like
+        validate_fields(); 'date' must be an ISO date, 'crop_type' a
+        supported crop and latitude/longitude real coordinates. Returns
+        (errors, message): a dict mapping record index -> errors, and a
+        message when `records` isn't a list of objects at all.
+        """
+        if not isinstance(records, list) or not all(isinstance(record, dict) for record in records):
+            return {}, "Expected a list of records"
+        errors = {}
+        for i, record in enumerate(records):
+            record_errors = self.validate_fields(record, fields)
+            if not isinstance(record.get('field_id'), (str, int)) or record.get('field_id') == '':
+                record_errors.append("field_id must be a string or integer")
+            if 'date' in fields and not is_iso_date(record.get('date')):
+                record_errors.append("date must be an ISO date (YYYY-MM-DD)")
+            if 'crop_type' in fields and not self.is_supported_crop(record.get('crop_type')):
+                record_errors.append(self.crop_message)
+            for name, (low, high) in COORDINATE_RANGES.items():
+                value = record.get(name)
+                if name in fields and not (isinstance(value, (int, float)) and low <= value <= high):
+                    record_errors.append(f"{name} must be between {low} and {high}")
+            if record_errors:
+                errors[i] = record_errors
+        return errors, None
+    
+    def validate_columns(self, df, strict=True):
+        """Validate a batch of records column-wise
+
+        Returns a dict mapping row index -> list of errors for the rows that
+        failed; the messages match validate().
+        """
+        n_rows = len(df)
+        missing = {field: np.ones(n_rows, dtype=bool) if field not in df.columns else df[field].isna().to_numpy()
+                   for field in self.required_fields}
+        any_missing = np.logical_or.reduce(list(missing.values()))
+
+        # Validate all ranges in one comparison against the bound arrays
+        present = [i for i, field in enumerate(self.range_fields) if field in df.columns]
+        values = np.empty((n_rows, len(present)))
+        is_number = np.empty((n_rows, len(present)), dtype=bool)
+        for j, i in enumerate(present):
+            values[:, j], is_number[:, j] = numeric_column(df[self.range_fields[i]], strict)
+        with np.errstate(invalid='ignore'):
+            out_of_range = is_number & ((values < self.range_min[present]) | (values > self.range_max[present]))
+
+        checks = []
+        for j, i in enumerate(present):
+            _, _, _, type_message, range_message = self.range_rules[i]
+            checks.append((~is_number[:, j] & ~missing[self.range_fields[i]], type_message))
+            checks.append((out_of_range[:, j], range_message))
+
+        # Validate crop type
+        if 'crop_type' in df.columns:
+            crops = df['crop_type'].astype(str).str.lower()
+            checks.append((~crops.isin(list(self.supported_crops)).to_numpy(), self.crop_message))
+
+        # Only rows that failed something are expanded into per-row messages
+        failed = any_missing.copy()
+        for mask, _ in checks:
+            failed |= mask
+
+        errors = {}
+        for row in np.flatnonzero(failed):
+            if any_missing[row]:
+                errors[int(row)] = [self.missing_messages[field] for field in self.required_fields
+                                    if missing[field][row]]
+            else:
+                errors[int(row)] = [message for mask, message in checks if mask[row]]
+        return errors
@@ -0,0 +1,31 @@
+"""Production entry point for the Crop Yield Predictor API.
+
+The model is loaded once when this module is imported. With gunicorn's
+preload_app (see gunicorn.conf.py) that happens in the master process
+before the workers fork, so every worker shares the same read-only
+coefficient pages and none of them loads, let alone trains, a model:
+
+    gunicorn -c gunicorn.conf.py wsgi:application
+
+Startup fails if no trained model exists; train one offline first
+(python models/crop_model.py) instead of inside a request.
+"""
+import sys
+from app import app, predictor
+
+# Never train inside the request path, and never serve with the debugger
+predictor.auto_train = False
+app.debug = False
+
+try:
+    loaded = predictor.load_model()
+except ValueError as e:
+    sys.exit(f"Model not loaded: {e}")
+if not loaded:
+    sys.exit("No trained model found. Train one before starting the server.")
+
+# MODEL_WATCH's watcher thread is started in each worker after the fork
+# (post_fork in gunicorn.conf.py); a thread started here, in the master,
+# would not exist in any worker
+
+application = app